@@ -41,10 +41,16 @@ def create_app(config_class=None):
     app.jinja_env.globals['datetime'] = datetime
     app.jinja_env.globals['now'] = datetime.datetime.now
     
-    # 设置SQLite数据库连接
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
+    # 设置数据库连接：DATABASE_URL环境变量优先，其次是配置中的SQLALCHEMY_DATABASE_URI
+    app.config['SQLALCHEMY_DATABASE_URI'] = (
+        os.environ.get('DATABASE_URL') or app.config.get('SQLALCHEMY_DATABASE_URI') or 'sqlite:///app.db'
+    )
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     
+    # 设置数据库引擎参数（SQLite连接PRAGMA、连接池）
+    from app import engine
+    engine.init_app(app)
+    
     # 确保上传目录存在
     os.makedirs(app.config.get('UPLOAD_FOLDER', 'static/uploads'), exist_ok=True)
     
@@ -53,6 +59,42 @@ def create_app(config_class=None):
     migrate.init_app(app, db)
     login_manager.init_app(app)
     
+    # 注册全文检索的SQLite分词函数和索引维护命令（在任何组件建立数据库连接之前注册）
+    from app.warehouse import search
+    search.init_app(app)
+    
+    # 初始化搜索结果缓存
+    from app.crawler.cache import result_cache
+    result_cache.init_app(app)
+    
+    # 初始化采集结果写入队列
+    from app.crawler.writer import crawl_writer
+    crawl_writer.init_app(app)
+    
+    # 初始化按主机限速器（首次请求时加载采集规则的站点速率）
+    from app.crawler.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+    
+    # 初始化后台采集任务队列
+    from app.crawler.jobs import job_queue
+    job_queue.init_app(app)
+    
+    # 初始化定时采集任务调度器（CRAWLER_SCHEDULER_ENABLED为真时自动启动）
+    from app.crawler.scheduler import task_scheduler
+    task_scheduler.init_app(app)
+    
+    # 注册统计汇总表维护命令
+    from app.warehouse import stats
+    stats.init_app(app)
+    
+    # 注册近似重复检测段表维护命令
+    from app.warehouse import dedup
+    dedup.init_app(app)
+    
+    # 注册链接和媒体索引维护命令
+    from app.warehouse import links
+    links.init_app(app)
+    
     # 注册蓝图
     from app.auth import bp as auth_bp
     app.register_blueprint(auth_bp)
@@ -0,0 +1,110 @@
+"""
+大文本列压缩
+
+CompressedText列在写入时把文本压缩为带格式标记的二进制，读取时自动解压，ORM和Core语句中与普通文本列用法相同。
+格式标记（首字节）：
+    0x01 - 未压缩的UTF-8文本（短文本或压缩后不会变小的文本）
+    0x02 - zlib压缩
+    0x03 - 使用预置字典PRESET_DICTIONARY的zlib压缩
+读取时str类型或没有格式标记的值视为未压缩的旧数据，迁移重写之前的记录也能正常读取。
+预置字典收录了链接列表、页面元数据、原始数据JSON中常见的键名、URL片段和中文新闻常用词，
+短小的JSON值也能获得较好的压缩率。字典一经使用就不能修改，需要调整时应增加新的格式标记。
+SQLite中沿用原有的TEXT列（SQLite按值保存类型，修改列类型需要重建表并会丢失触发器），其他数据库使用二进制列。
+"""
+import zlib
+
+from sqlalchemy.types import LargeBinary, Text, TypeDecorator
+
+FORMAT_RAW = b'\x01'
+FORMAT_ZLIB = b'\x02'
+FORMAT_ZLIB_DICT = b'\x03'
+
+# 短于此字节数的文本不压缩
+MIN_COMPRESS_SIZE = 64
+
+COMPRESS_LEVEL = 6
+
+# 预置字典，越常见的片段越靠后
+PRESET_DICTIONARY = ''.join([
+    '<div class="content"><p></p></div><br/>&nbsp;',
+    'width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no',
+    'text/html; charset=utf-8', 'IE=edge,chrome=1', 'renderer', 'webkit', 'format-detection', 'telephone=no',
+    '"og:title": "', '"og:description": "', '"og:url": "', '"og:image": "', '"og:type": "article"',
+    '"author": "', '"publishdate": "', '"ContentSource": "', '"source": "', '"applicable-device": "pc,mobile"',
+    '"viewport": "', '"X-UA-Compatible": "IE=edge", "referrer": "always", ',
+    '"keywords": "', '"description": "',
+    '.html', '.shtml', '.htm', '.jpg', '.png', '.gif', '.js', '.css',
+    'index', 'detail', 'article', 'content', 'news', 'list', 'static',
+    '.gov.cn/', '.com.cn/', '.org.cn/', '.net/', '.cn/', '.com/',
+    'http://www.news.cn/', 'http://www.xinhuanet.com/', 'https://www.xinhuanet.com/',
+    'https://baijiahao.baidu.com/s?id=', 'http://www.baidu.com/link?url=', 'https://www.baidu.com/s?',
+    'https://www.bing.com/ck/a?', 'https://www.', 'http://www.',
+    '\\u897f\\u660c', '\\u51c9\\u5c71', '\\u65b0\\u95fb', '\\u9996\\u9875', '\\u66f4\\u591a',
+    '西昌市', '凉山州', '凉山彝族自治州', '四川省', '记者', '通讯员', '来源：', '责任编辑：', '编辑：', '发布时间：',
+    '新华社', '新华网', '人民网', '央视网', '中国', '发展', '工作', '建设', '项目', '活动', '群众', '全国', '我们',
+    '年', '月', '日', '的', '了', '和', '在', '是', '，', '。', '、', '：', '“', '”', '（', '）',
+    '", "cover": "', '", "source": "', '", "summary": "', '", "original_url": "', '{"title": "',
+    '"}, {"text": "', '", "href": "https://', '", "href": "http://', '[{"text": "',
+]).encode('utf-8')
+
+
+def compress_text(value):
+    """
+    压缩文本
+    参数：
+        value - 文本，None原样返回
+    返回：带格式标记的二进制
+    """
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value
+    data = value.encode('utf-8')
+    if len(data) >= MIN_COMPRESS_SIZE:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=PRESET_DICTIONARY)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return FORMAT_ZLIB_DICT + compressed
+    return FORMAT_RAW + data
+
+
+def decompress_text(value):
+    """
+    解压文本
+    参数：
+        value - compress_text的结果或未压缩的旧数据，None原样返回
+    返回：文本
+    """
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, data = value[:1], value[1:]
+    if marker == FORMAT_RAW:
+        return data.decode('utf-8')
+    if marker == FORMAT_ZLIB_DICT:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+    if marker == FORMAT_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    return value.decode('utf-8', 'ignore')
+
+
+class CompressedText(TypeDecorator):
+    """自动压缩的文本列"""
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'sqlite':
+            return dialect.type_descriptor(Text())
+        return dialect.type_descriptor(LargeBinary(length=2 ** 32 - 1))
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
+
+    @property
+    def python_type(self):
+        return str
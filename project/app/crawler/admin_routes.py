@@ -1,16 +1,33 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, Response, stream_with_context
 from datetime import datetime
 from flask_login import login_required, current_user
 from app import db
-from app.models import CrawlResult, DepthCrawlResult
-from app.crawler.crawler import crawl_baidu_search, CrawlerConfig, crawl_data
-import requests
-from bs4 import BeautifulSoup
+from app.models import CrawlResult, DepthCrawlResult, CrawlJob
+from app.crawler.crawler import crawl_baidu_search, CrawlerConfig, crawl_data, SOURCES
+from app.crawler.fetcher import fetch
+from app.crawler.executor import BoundedExecutor
+from app.crawler.http_cache import content_fingerprint
+from app.crawler.jobs import job_queue, wants_async
+from app.crawler.parser import parse_html
+from app.crawler.ratelimit import configure_site_rate_limits
+from app.crawler.site_crawl import crawl_site
+from app.crawler.writer import crawl_writer
+from app.crawler.rules import CompiledRule, RULE_TYPE_XPATH, RULE_TYPES
+from app.warehouse.search import apply_search
+from app.warehouse.stats import get_crawl_stats
+from app.warehouse.dedup import text_minhash
+from app.warehouse.links import delete_page_links, index_pages
+from app.warehouse.pagination import cached_count, clear_count_cache, keyset_paginate, offset_paginate
+from app.warehouse.projection import parse_fields, project, serialize
 import json
 import time
 
 admin_crawler_bp = Blueprint('admin_crawler', __name__)
 
+# 采集结果列表可返回的字段
+RESULT_LIST_FIELDS = ('id', 'keyword', 'title', 'summary', 'cover', 'original_url', 'source',
+                      'depth_crawled', 'is_stored', 'created_at')
+
 
 @admin_crawler_bp.route('/crawler', methods=['GET'])
 def data_collection_page():
@@ -18,57 +35,83 @@ def data_collection_page():
     return render_template('crawler/admin/index.html')
 
 
+def crawl_and_store(keyword, source, report=None):
+    """
+    执行关键词采集并批量保存结果
+    参数：
+        keyword - 采集关键词
+        source - 数据源
+        report - 进度上报函数（可选）
+    返回：保存后的结果列表
+    """
+    # 创建爬虫配置
+    config = CrawlerConfig(max_results=10, timeout=15)
+    
+    if report:
+        report(0, 1, f'正在采集关键词：{keyword}')
+    
+    # 执行采集
+    results = crawl_data(keyword, source=source, page=1, config=config)
+    
+    if report:
+        report(1, 1, f'采集到 {len(results)} 条结果，正在保存')
+    
+    # 批量保存到数据库临时表，已采集过的URL只更新最后采集时间
+    rows = [CrawlResult.build_row(result, keyword=keyword) for result in results]
+    ids = crawl_writer.upsert_rows(rows)
+    clear_count_cache()
+    
+    # 已采集过的URL沿用已有记录，读取其深度采集和存储状态
+    flags = {
+        row_id: (depth_crawled, is_stored)
+        for row_id, depth_crawled, is_stored in db.session.query(
+            CrawlResult.id, CrawlResult.depth_crawled, CrawlResult.is_stored
+        ).filter(CrawlResult.id.in_(ids))
+    } if ids else {}
+    
+    return [{
+        'id': row_id,
+        'title': row['title'],
+        'summary': row['summary'],
+        'cover': row['cover'],
+        'original_url': row['original_url'],
+        'source': row['source'],
+        'depth_crawled': bool(flags.get(row_id, (False, False))[0]),
+        'is_stored': bool(flags.get(row_id, (False, False))[1])
+    } for row_id, row in zip(ids, rows)]
+
+
+@job_queue.register('crawl')
+def run_crawl_job(params, report):
+    """后台执行关键词采集任务"""
+    crawl_results = crawl_and_store(params['keyword'], params['source'], report)
+    return {'results': crawl_results, 'total': len(crawl_results)}
+
+
 @admin_crawler_bp.route('/api/crawl', methods=['POST'])
 def api_crawl_data():
-    """数据采集API接口"""
+    """
+    数据采集API接口
+    参数：
+        keyword - 采集关键词
+        source - 数据源，all为同时采集全部数据源
+        async - 为1时提交后台任务并立即返回任务ID
+    """
     try:
         keyword = request.form.get('keyword', '').strip()
         source = request.form.get('source', 'baidu').strip()  # 新增数据源参数
         if not keyword:
             return jsonify({'success': False, 'message': '请输入采集关键词'})
         
-        # 验证数据源
-        if source not in ['baidu', 'bing', 'xinhua']:
+        # 验证数据源，all为同时采集全部数据源
+        if source != 'all' and source not in SOURCES:
             return jsonify({'success': False, 'message': '不支持的数据源'})
         
-        # 创建爬虫配置
-        config = CrawlerConfig(max_results=10, timeout=15)
+        if wants_async(request.form):
+            job = job_queue.submit('crawl', {'keyword': keyword, 'source': source})
+            return jsonify({'success': True, 'message': '采集任务已提交', 'job_id': job.id})
         
-        # 执行采集
-        results = crawl_data(keyword, source=source, page=1, config=config)
-        
-        # 保存到数据库临时表
-        crawl_results = []
-        for i, result in enumerate(results):
-            # 模拟进度
-            progress = int((i + 1) / len(results) * 100)
-            
-            # 保存到数据库
-            crawl_result = CrawlResult(
-                keyword=keyword,
-                title=result.get('title', ''),
-                summary=result.get('summary', ''),
-                cover=result.get('cover', ''),
-                original_url=result.get('original_url', ''),
-                source=result.get('source', ''),
-                raw_data=json.dumps(result, ensure_ascii=False)
-            )
-            db.session.add(crawl_result)
-            db.session.commit()
-            
-            crawl_results.append({
-                'id': crawl_result.id,
-                'title': result.get('title', ''),
-                'summary': result.get('summary', ''),
-                'cover': result.get('cover', ''),
-                'original_url': result.get('original_url', ''),
-                'source': result.get('source', ''),
-                'depth_crawled': False,
-                'is_stored': False
-            })
-            
-            # 模拟延迟，让用户看到进度
-            time.sleep(0.2)
+        crawl_results = crawl_and_store(keyword, source)
         
         return jsonify({
             'success': True,
@@ -82,6 +125,162 @@ def api_crawl_data():
         return jsonify({'success': False, 'message': f'采集失败: {str(e)}'})
 
 
+def depth_crawl(url):
+    """深度采集指定URL"""
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    response = fetch(url, headers=headers, timeout=10)
+    response.raise_for_status()
+    response.encoding = 'utf-8'
+    
+    soup = parse_html(response.text, name='depth_crawl')
+    
+    # 提取正文内容
+    content = ''
+    content_tags = soup.find_all(['article', 'div', 'section'], class_=lambda x: x and ('content' in x or 'article' in x or 'main' in x))
+    if content_tags:
+        for tag in content_tags:
+            # 过滤掉导航、侧边栏等非正文内容
+            if any(skip in tag.get('class', []) for skip in ['nav', 'sidebar', 'header', 'footer', 'comment']):
+                continue
+            content += tag.get_text(separator='\n', strip=True)
+            if len(content) > 1000:
+                break
+    
+    # 如果没有找到合适的内容，尝试获取所有段落
+    if not content or len(content) < 200:
+        paragraphs = soup.find_all('p')
+        content = '\n'.join([p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 20])
+    
+    # 提取图片
+    images = []
+    img_tags = soup.find_all('img', src=True)
+    for img in img_tags:
+        src = img.get('src', '')
+        if src and len(src) > 5:
+            if not src.startswith('http'):
+                if src.startswith('//'):
+                    src = 'http:' + src
+                elif src.startswith('/'):
+                    src = '/'.join(url.split('/')[:3]) + src
+            images.append(src)
+    images = list(set(images))  # 去重
+    
+    # 提取视频
+    videos = []
+    video_tags = soup.find_all(['video', 'iframe'], src=True)
+    for video in video_tags:
+        src = video.get('src', '')
+        if src and ('video' in src or 'embed' in src):
+            videos.append(src)
+    videos = list(set(videos))  # 去重
+    
+    # 提取链接
+    links = []
+    a_tags = soup.find_all('a', href=True)
+    for a in a_tags:
+        href = a.get('href', '')
+        text = a.get_text(strip=True)
+        if href and len(href) > 5 and href != '#':
+            if not href.startswith('http'):
+                if href.startswith('//'):
+                    href = 'http:' + href
+                elif href.startswith('/'):
+                    href = '/'.join(url.split('/')[:3]) + href
+            links.append({'text': text, 'href': href})
+    
+    # 提取元数据
+    meta_data = {}
+    meta_tags = soup.find_all('meta')
+    for meta in meta_tags:
+        name = meta.get('name', '') or meta.get('property', '') or meta.get('http-equiv', '')
+        content = meta.get('content', '')
+        if name and content:
+            meta_data[name] = content
+    
+    return {
+        'content': content,
+        'images': images,
+        'videos': videos,
+        'links': links,
+        'meta_data': meta_data
+    }
+
+
+def depth_crawl_ids(crawl_ids, report=None):
+    """
+    并发深度采集指定的采集结果
+    参数：
+        crawl_ids - 采集结果ID列表
+        report - 进度上报函数（可选）
+    返回：(成功数量, 失败数量)
+    """
+    configure_site_rate_limits()
+    
+    # 跳过不存在或已经深度采集的结果
+    crawl_results = [
+        crawl_result for crawl_result in CrawlResult.query.filter(CrawlResult.id.in_(crawl_ids)).all()
+        if not crawl_result.depth_crawled
+    ]
+    
+    config = CrawlerConfig()
+    executor = BoundedExecutor(max_workers=config.max_workers, max_per_host=config.max_per_host)
+    callback = None
+    if report:
+        report(0, len(crawl_results), '正在深度采集')
+        callback = lambda done, total: report(done, total)
+    outcomes = executor.map(
+        depth_crawl,
+        [crawl_result.original_url for crawl_result in crawl_results],
+        callback=callback
+    )
+    
+    success_count = 0
+    pages = []
+    for crawl_result, (depth_data, error) in zip(crawl_results, outcomes):
+        if error:
+            current_app.logger.error(f"深度采集ID {crawl_result.id} 失败: {str(error)}")
+            continue
+        
+        # 保存深度采集结果
+        depth_result = DepthCrawlResult(
+            crawl_result_id=crawl_result.id,
+            content=depth_data.get('content', ''),
+            content_minhash=text_minhash(depth_data.get('content', '')),
+            content_hash=content_fingerprint(depth_data),
+            meta_data=json.dumps(depth_data.get('meta_data', {}), ensure_ascii=False)
+        )
+        depth_result.set_images(depth_data.get('images', []))
+        depth_result.set_videos(depth_data.get('videos', []))
+        depth_result.set_links(depth_data.get('links', []))
+        
+        db.session.add(depth_result)
+        pages.append((crawl_result.id, depth_data))
+        crawl_result.depth_crawled = True
+        # 深度采集完成后，将数据加入仓库
+        crawl_result.is_stored = True
+        success_count += 1
+    
+    # 批量写入页面链接和媒体，提交所有更改
+    index_pages(pages)
+    db.session.commit()
+    
+    return success_count, len(crawl_ids) - success_count
+
+
+@job_queue.register('depth_crawl')
+def run_depth_crawl_job(params, report):
+    """后台执行深度采集任务"""
+    success_count, fail_count = depth_crawl_ids(params['crawl_ids'], report)
+    return {
+        'total': len(params['crawl_ids']),
+        'success_count': success_count,
+        'fail_count': fail_count
+    }
+
+
 @admin_crawler_bp.route('/api/depth_crawl', methods=['POST'])
 def api_depth_crawl():
     """深度采集API接口"""
@@ -105,133 +304,12 @@ def api_depth_crawl():
         else:
             return jsonify({'success': False, 'message': '请选择要深度采集的内容'})
         
-        # 执行深度采集
-        def depth_crawl(url):
-            """深度采集指定URL"""
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # 提取正文内容
-            content = ''
-            content_tags = soup.find_all(['article', 'div', 'section'], class_=lambda x: x and ('content' in x or 'article' in x or 'main' in x))
-            if content_tags:
-                for tag in content_tags:
-                    # 过滤掉导航、侧边栏等非正文内容
-                    if any(skip in tag.get('class', []) for skip in ['nav', 'sidebar', 'header', 'footer', 'comment']):
-                        continue
-                    content += tag.get_text(separator='\n', strip=True)
-                    if len(content) > 1000:
-                        break
-            
-            # 如果没有找到合适的内容，尝试获取所有段落
-            if not content or len(content) < 200:
-                paragraphs = soup.find_all('p')
-                content = '\n'.join([p.get_text(strip=True) for p in paragraphs if len(p.get_text(strip=True)) > 20])
-            
-            # 提取图片
-            images = []
-            img_tags = soup.find_all('img', src=True)
-            for img in img_tags:
-                src = img.get('src', '')
-                if src and len(src) > 5:
-                    if not src.startswith('http'):
-                        if src.startswith('//'):
-                            src = 'http:' + src
-                        elif src.startswith('/'):
-                            src = '/'.join(url.split('/')[:3]) + src
-                    images.append(src)
-            images = list(set(images))  # 去重
-            
-            # 提取视频
-            videos = []
-            video_tags = soup.find_all(['video', 'iframe'], src=True)
-            for video in video_tags:
-                src = video.get('src', '')
-                if src and ('video' in src or 'embed' in src):
-                    videos.append(src)
-            videos = list(set(videos))  # 去重
-            
-            # 提取链接
-            links = []
-            a_tags = soup.find_all('a', href=True)
-            for a in a_tags:
-                href = a.get('href', '')
-                text = a.get_text(strip=True)
-                if href and len(href) > 5 and href != '#':
-                    if not href.startswith('http'):
-                        if href.startswith('//'):
-                            href = 'http:' + href
-                        elif href.startswith('/'):
-                            href = '/'.join(url.split('/')[:3]) + href
-                    links.append({'text': text, 'href': href})
-            
-            # 提取元数据
-            meta_data = {}
-            meta_tags = soup.find_all('meta')
-            for meta in meta_tags:
-                name = meta.get('name', '') or meta.get('property', '') or meta.get('http-equiv', '')
-                content = meta.get('content', '')
-                if name and content:
-                    meta_data[name] = content
-            
-            return {
-                'content': content,
-                'images': images,
-                'videos': videos,
-                'links': links,
-                'meta_data': meta_data
-            }
-        
-        # 初始化结果统计
-        success_count = 0
-        fail_count = 0
-        
-        # 循环处理每个要深度采集的ID
-        for crawl_id in crawl_ids:
-            try:
-                # 获取要深度采集的结果
-                crawl_result = CrawlResult.query.get(crawl_id)
-                if not crawl_result:
-                    fail_count += 1
-                    continue
-                
-                # 检查是否已经深度采集
-                if crawl_result.depth_crawled:
-                    fail_count += 1
-                    continue
-                
-                # 执行深度采集
-                depth_data = depth_crawl(crawl_result.original_url)
-                
-                # 保存深度采集结果
-                depth_result = DepthCrawlResult(
-                    crawl_result_id=crawl_result.id,
-                    content=depth_data.get('content', ''),
-                    meta_data=json.dumps(depth_data.get('meta_data', {}), ensure_ascii=False)
-                )
-                depth_result.set_images(depth_data.get('images', []))
-                depth_result.set_videos(depth_data.get('videos', []))
-                depth_result.set_links(depth_data.get('links', []))
-                
-                db.session.add(depth_result)
-                crawl_result.depth_crawled = True
-                # 深度采集完成后，将数据加入仓库
-                crawl_result.is_stored = True
-                success_count += 1
-                
-            except Exception as e:
-                current_app.logger.error(f"深度采集ID {crawl_id} 失败: {str(e)}")
-                fail_count += 1
+        if wants_async(request.form):
+            job = job_queue.submit('depth_crawl', {'crawl_ids': crawl_ids})
+            return jsonify({'success': True, 'message': '深度采集任务已提交', 'job_id': job.id})
         
-        # 提交所有更改
-        db.session.commit()
+        # 执行深度采集
+        success_count, fail_count = depth_crawl_ids(crawl_ids)
         
         # 返回结果
         if len(crawl_ids) == 1:
@@ -263,6 +341,104 @@ def api_depth_crawl():
         return jsonify({'success': False, 'message': f'深度采集失败: {str(e)}'})
 
 
+@job_queue.register('site_crawl')
+def run_site_crawl_job(params, report):
+    """后台执行站点广度优先采集任务"""
+    from app.models import SiteRule
+    
+    site_rule = db.session.get(SiteRule, params['rule_id'])
+    if site_rule is None:
+        raise ValueError('采集规则不存在')
+    return crawl_site(site_rule, params.get('max_depth'), params.get('max_pages'), params.get('resume', False), report)
+
+
+@admin_crawler_bp.route('/api/site_crawl', methods=['POST'])
+def api_site_crawl():
+    """
+    站点广度优先采集API接口
+    参数：
+        rule_id - 采集规则ID，从规则的站点URL开始采集
+        max_depth - 最大深度（可选），起始页为0
+        max_pages - 最多采集的页面数（可选）
+        resume - 为1时从上次未完成的检查点继续
+        async - 为1时提交后台任务并立即返回任务ID
+    """
+    try:
+        from app.models import SiteRule
+        
+        rule_id = request.form.get('rule_id', type=int)
+        site_rule = db.session.get(SiteRule, rule_id) if rule_id else None
+        if site_rule is None:
+            return jsonify({'success': False, 'message': '采集规则不存在'})
+        if not site_rule.is_active:
+            return jsonify({'success': False, 'message': '采集规则未启用'})
+        
+        max_depth = request.form.get('max_depth', type=int)
+        max_pages = request.form.get('max_pages', type=int)
+        if (max_depth is not None and max_depth < 0) or (max_pages is not None and max_pages < 1):
+            return jsonify({'success': False, 'message': '最大深度或页面数无效'})
+        resume = str(request.form.get('resume', '')).lower() in ('1', 'true', 'yes')
+        
+        params = {'rule_id': site_rule.id, 'max_depth': max_depth, 'max_pages': max_pages, 'resume': resume}
+        if wants_async(request.form):
+            job = job_queue.submit('site_crawl', params)
+            return jsonify({'success': True, 'message': '站点采集任务已提交', 'job_id': job.id})
+        
+        result = crawl_site(site_rule, max_depth, max_pages, resume)
+        return jsonify({
+            'success': True,
+            'message': f"站点采集完成，采集{result['pages']}个页面，保存{result['stored']}条",
+            'data': result
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"站点采集失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'站点采集失败: {str(e)}'})
+
+
+@admin_crawler_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """查询后台任务进度"""
+    try:
+        job = db.session.get(CrawlJob, job_id)
+        if not job:
+            return jsonify({'success': False, 'message': '任务不存在'})
+        
+        return jsonify({'success': True, 'data': job.to_dict()})
+        
+    except Exception as e:
+        current_app.logger.error(f"查询任务失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'查询任务失败: {str(e)}'})
+
+
+@admin_crawler_bp.route('/api/jobs/<int:job_id>/stream', methods=['GET'])
+def api_job_stream(job_id):
+    """以Server-Sent Events方式推送后台任务进度，任务结束后关闭连接"""
+    def generate():
+        last_payload = None
+        while True:
+            # 结束上一次读事务，读取工作线程写入的最新进度
+            db.session.rollback()
+            job = db.session.get(CrawlJob, job_id)
+            if not job:
+                yield 'event: error\ndata: {"message": "任务不存在"}\n\n'
+                return
+            
+            payload = json.dumps(job.to_dict(), ensure_ascii=False)
+            if payload != last_payload:
+                yield f'data: {payload}\n\n'
+                last_payload = payload
+            if job.is_finished:
+                return
+            time.sleep(0.5)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @admin_crawler_bp.route('/api/store_data', methods=['POST'])
 def api_store_data():
     """存储数据到数据库"""
@@ -315,43 +491,43 @@ def api_store_data():
 
 @admin_crawler_bp.route('/api/crawl_results', methods=['GET'])
 def api_crawl_results():
-    """获取采集结果列表"""
+    """获取采集结果列表（传入cursor参数时按游标分页，传入fields参数时只返回并查询指定字段）"""
     try:
         keyword = request.args.get('keyword', '').strip()
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 10))
+        cursor = request.args.get('cursor')
+        try:
+            fields = parse_fields(request.args.get('fields'), RESULT_LIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
         
         # 构建查询
-        query = CrawlResult.query
-        if keyword:
-            query = query.filter(CrawlResult.keyword.like(f'%{keyword}%') | CrawlResult.title.like(f'%{keyword}%'))
-        
-        # 分页查询
-        total = query.count()
-        offset = (page - 1) * limit
-        results = query.order_by(CrawlResult.created_at.desc()).offset(offset).limit(limit).all()
+        query, score = apply_search(CrawlResult.query, keyword, [CrawlResult.keyword, CrawlResult.title])
+        
+        # 分页查询，全文检索时按相关度排序
+        total = cached_count(query)
+        query = project(query, CrawlResult, fields)
+        next_cursor = None
+        if score is not None:
+            results = query.order_by(score, CrawlResult.created_at.desc()).offset((page - 1) * limit).limit(limit).all()
+        elif cursor is not None:
+            try:
+                results, next_cursor = keyset_paginate(query, CrawlResult, limit, cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)})
+        else:
+            results, next_cursor = offset_paginate(query, CrawlResult, page, limit)
         
         # 转换为JSON格式
-        data = []
-        for result in results:
-            data.append({
-                'id': result.id,
-                'keyword': result.keyword,
-                'title': result.title,
-                'summary': result.summary,
-                'cover': result.cover,
-                'original_url': result.original_url,
-                'source': result.source,
-                'depth_crawled': result.depth_crawled,
-                'is_stored': result.is_stored,
-                'created_at': result.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        data = [serialize(result, fields) for result in results]
         
         return jsonify({
             'code': 0,
             'msg': '',
             'count': total,
-            'data': data
+            'data': data,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -369,11 +545,13 @@ def api_delete_result():
         
         # 删除关联的深度采集结果
         DepthCrawlResult.query.filter_by(crawl_result_id=result_id).delete()
+        delete_page_links([result_id])
         
         # 删除采集结果
         CrawlResult.query.filter_by(id=result_id).delete()
         
         db.session.commit()
+        clear_count_cache()
         
         return jsonify({'success': True, 'message': '删除成功'})
         
@@ -395,11 +573,13 @@ def api_delete_selected():
         
         # 删除关联的深度采集结果
         DepthCrawlResult.query.filter(DepthCrawlResult.crawl_result_id.in_(result_ids)).delete()
+        delete_page_links(result_ids)
         
         # 删除采集结果
         CrawlResult.query.filter(CrawlResult.id.in_(result_ids)).delete()
         
         db.session.commit()
+        clear_count_cache()
         
         return jsonify({
             'success': True,
@@ -415,56 +595,46 @@ def api_delete_selected():
 def api_get_stats():
     """获取采集统计数据"""
     try:
-        from datetime import datetime, timedelta
-        
-        # 计算时间范围（最近7天）
-        today = datetime.utcnow().date()
-        seven_days_ago = today - timedelta(days=7)
-        
-        # 总采集数量
-        total_count = CrawlResult.query.count()
-        
-        # 已深度采集数量
-        depth_crawled_count = CrawlResult.query.filter_by(depth_crawled=True).count()
-        
-        # 已存储数量
-        stored_count = CrawlResult.query.filter_by(is_stored=True).count()
-        
-        # 按关键词统计
-        keywords_stats = db.session.query(
-            CrawlResult.keyword,
-            db.func.count(CrawlResult.id).label('count')
-        ).group_by(CrawlResult.keyword).order_by(db.func.count(CrawlResult.id).desc()).limit(10).all()
-        
-        # 按日期统计（最近7天）
-        date_stats = []
-        for i in range(7):
-            date = seven_days_ago + timedelta(days=i)
-            next_date = date + timedelta(days=1)
-            count = CrawlResult.query.filter(
-                CrawlResult.created_at >= datetime.combine(date, datetime.min.time()),
-                CrawlResult.created_at < datetime.combine(next_date, datetime.min.time())
-            ).count()
-            date_stats.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'count': count
-            })
-        
         return jsonify({
             'success': True,
-            'data': {
-                'total_count': total_count,
-                'depth_crawled_count': depth_crawled_count,
-                'stored_count': stored_count,
-                'keywords_stats': [{'keyword': item.keyword, 'count': item.count} for item in keywords_stats],
-                'date_stats': date_stats
-            }
+            'data': get_crawl_stats()
         })
         
     except Exception as e:
         current_app.logger.error(f"获取统计数据失败: {str(e)}")
         return jsonify({'success': False, 'message': f'获取统计数据失败: {str(e)}'})
 
+@admin_crawler_bp.route('/api/crawl_cache/stats', methods=['GET'])
+def api_crawl_cache_stats():
+    """获取搜索结果缓存的命中统计"""
+    try:
+        from app.crawler.cache import result_cache
+        return jsonify({
+            'success': True,
+            'data': result_cache.stats()
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"获取缓存统计失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'获取缓存统计失败: {str(e)}'})
+
+
+@admin_crawler_bp.route('/api/rate_limits', methods=['GET'])
+def api_rate_limits():
+    """获取各主机的限速和熔断状态"""
+    try:
+        from app.crawler.breaker import circuit_breaker
+        from app.crawler.ratelimit import rate_limiter
+        return jsonify({
+            'success': True,
+            'data': rate_limiter.stats(),
+            'circuits': circuit_breaker.stats()
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"获取限速状态失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'获取限速状态失败: {str(e)}'})
+
 
 # 采集规则库路由
 @admin_crawler_bp.route('/rules', methods=['GET'])
@@ -502,7 +672,9 @@ def api_get_rules():
                 'site_url': rule.site_url,
                 'title_xpath': rule.title_xpath,
                 'content_xpath': rule.content_xpath,
+                'rule_type': rule.rule_type,
                 'request_headers': rule.get_request_headers(),
+                'rate_limit': rule.rate_limit,
                 'is_active': rule.is_active,
                 'created_at': rule.created_at.strftime('%Y-%m-%d %H:%M:%S')
             })
@@ -550,6 +722,17 @@ def parse_request_headers(headers_str):
                 headers[key.strip()] = value.strip()
         return headers
 
+def parse_rate_limit(value):
+    """解析站点请求速率（每秒请求数），为空时返回None"""
+    value = (value or '').strip()
+    if not value:
+        return None
+    rate = float(value)
+    if not rate > 0:
+        raise ValueError(value)
+    return rate
+
+
 @admin_crawler_bp.route('/api/rules', methods=['POST'])
 def api_add_rule():
     """新增采集规则"""
@@ -561,8 +744,13 @@ def api_add_rule():
         site_url = request.form.get('site_url', '').strip()
         title_xpath = request.form.get('title_xpath', '').strip()
         content_xpath = request.form.get('content_xpath', '').strip()
+        rule_type = request.form.get('rule_type', RULE_TYPE_XPATH).strip() or RULE_TYPE_XPATH
         request_headers = request.form.get('request_headers', '').strip()
         is_active = request.form.get('is_active', '1') == '1'
+        try:
+            rate_limit = parse_rate_limit(request.form.get('rate_limit', ''))
+        except ValueError:
+            return jsonify({'success': False, 'message': '请求速率必须是正数'})
         
         # 验证参数
         if not site_name:
@@ -573,6 +761,12 @@ def api_add_rule():
             return jsonify({'success': False, 'message': '请输入标题XPATH'})
         if not content_xpath:
             return jsonify({'success': False, 'message': '请输入详细内容XPATH'})
+        if rule_type not in RULE_TYPES:
+            return jsonify({'success': False, 'message': '规则类型无效'})
+        try:
+            CompiledRule(title_xpath, content_xpath, rule_type)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
         
         # 检查站点名称是否已存在
         existing_rule = SiteRule.query.filter_by(site_name=site_name).first()
@@ -585,6 +779,8 @@ def api_add_rule():
             site_url=site_url,
             title_xpath=title_xpath,
             content_xpath=content_xpath,
+            rule_type=rule_type,
+            rate_limit=rate_limit,
             is_active=is_active
         )
         
@@ -598,6 +794,7 @@ def api_add_rule():
         
         db.session.add(rule)
         db.session.commit()
+        configure_site_rate_limits()
         
         return jsonify({
             'success': True,
@@ -608,7 +805,9 @@ def api_add_rule():
                 'site_url': rule.site_url,
                 'title_xpath': rule.title_xpath,
                 'content_xpath': rule.content_xpath,
+                'rule_type': rule.rule_type,
                 'request_headers': rule.get_request_headers(),
+                'rate_limit': rule.rate_limit,
                 'is_active': rule.is_active
             }
         })
@@ -635,8 +834,13 @@ def api_update_rule(rule_id):
         site_url = request.form.get('site_url', '').strip()
         title_xpath = request.form.get('title_xpath', '').strip()
         content_xpath = request.form.get('content_xpath', '').strip()
+        rule_type = request.form.get('rule_type', RULE_TYPE_XPATH).strip() or RULE_TYPE_XPATH
         request_headers = request.form.get('request_headers', '').strip()
         is_active = request.form.get('is_active', '1') == '1'
+        try:
+            rate_limit = parse_rate_limit(request.form.get('rate_limit', ''))
+        except ValueError:
+            return jsonify({'success': False, 'message': '请求速率必须是正数'})
         
         # 验证参数
         if not site_name:
@@ -647,6 +851,12 @@ def api_update_rule(rule_id):
             return jsonify({'success': False, 'message': '请输入标题XPATH'})
         if not content_xpath:
             return jsonify({'success': False, 'message': '请输入详细内容XPATH'})
+        if rule_type not in RULE_TYPES:
+            return jsonify({'success': False, 'message': '规则类型无效'})
+        try:
+            CompiledRule(title_xpath, content_xpath, rule_type)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
         
         # 检查站点名称是否已存在（排除当前规则）
         existing_rule = SiteRule.query.filter_by(site_name=site_name).filter(SiteRule.id != rule_id).first()
@@ -658,6 +868,8 @@ def api_update_rule(rule_id):
         rule.site_url = site_url
         rule.title_xpath = title_xpath
         rule.content_xpath = content_xpath
+        rule.rule_type = rule_type
+        rule.rate_limit = rate_limit
         rule.is_active = is_active
         
         # 设置请求头
@@ -671,6 +883,7 @@ def api_update_rule(rule_id):
             rule.request_headers = None
         
         db.session.commit()
+        configure_site_rate_limits()
         
         return jsonify({
             'success': True,
@@ -681,7 +894,9 @@ def api_update_rule(rule_id):
                 'site_url': rule.site_url,
                 'title_xpath': rule.title_xpath,
                 'content_xpath': rule.content_xpath,
+                'rule_type': rule.rule_type,
                 'request_headers': rule.get_request_headers(),
+                'rate_limit': rule.rate_limit,
                 'is_active': rule.is_active
             }
         })
@@ -705,6 +920,7 @@ def api_delete_rule(rule_id):
         # 删除规则
         db.session.delete(rule)
         db.session.commit()
+        configure_site_rate_limits()
         
         return jsonify({
             'success': True,
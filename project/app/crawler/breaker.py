@@ -0,0 +1,120 @@
+"""
+按主机的熔断器
+
+主机连续失败（连接错误、超时或500/502/504）达到阈值后熔断：在reset_timeout秒内该主机的请求直接抛出CircuitOpenError，
+不再等待超时。熔断期过后进入半开状态，只放行一个试探请求：成功则恢复，失败则重新熔断。
+试探请求在reset_timeout秒内没有结果（如抛出了与主机无关的异常）时允许再次试探。
+"""
+import threading
+import time
+
+import requests
+
+from app.crawler.executor import get_host
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """主机处于熔断状态，请求未发送"""
+
+
+class _HostCircuit:
+    """单个主机的熔断状态"""
+    __slots__ = ('state', 'failures', 'opened_at', 'trial_at', 'trips', 'rejected')
+
+    def __init__(self):
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+
+class CircuitBreaker:
+    """按主机的熔断器"""
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, url, config):
+        """
+        请求前检查主机状态
+        参数：
+            url - 请求URL
+            config - 爬虫配置对象，使用breaker_threshold和breaker_reset
+        异常：主机熔断时抛出CircuitOpenError
+        """
+        if not config.breaker_threshold:
+            return
+        host = get_host(url)
+        with self._lock:
+            circuit = self._hosts.get(host)
+            if circuit is None or circuit.state == STATE_CLOSED:
+                return
+            now = time.monotonic()
+            if circuit.state == STATE_OPEN and now - circuit.opened_at >= config.breaker_reset:
+                circuit.state = STATE_HALF_OPEN
+                circuit.trial_at = now
+                return
+            if circuit.state == STATE_HALF_OPEN and now - circuit.trial_at >= config.breaker_reset:
+                circuit.trial_at = now
+                return
+            circuit.rejected += 1
+        raise CircuitOpenError(f'主机 {host} 连续请求失败，已暂停请求')
+
+    def record(self, url, success, config):
+        """
+        记录请求结果
+        参数：
+            url - 请求URL
+            success - 请求是否成功
+            config - 爬虫配置对象
+        """
+        if not config.breaker_threshold:
+            return
+        host = get_host(url)
+        with self._lock:
+            circuit = self._hosts.get(host)
+            if circuit is None:
+                if success:
+                    return
+                circuit = self._hosts[host] = _HostCircuit()
+            if success:
+                circuit.state = STATE_CLOSED
+                circuit.failures = 0
+                return
+            circuit.failures += 1
+            if circuit.state == STATE_HALF_OPEN or circuit.failures >= config.breaker_threshold:
+                if circuit.state != STATE_OPEN:
+                    circuit.trips += 1
+                circuit.state = STATE_OPEN
+                circuit.opened_at = time.monotonic()
+
+    def stats(self):
+        """
+        各主机的熔断状态
+        返回：{主机: {'state', 'failures', 'trips', 'rejected'}}
+        """
+        with self._lock:
+            return {
+                host: {
+                    'state': circuit.state,
+                    'failures': circuit.failures,
+                    'trips': circuit.trips,
+                    'rejected': circuit.rejected
+                }
+                for host, circuit in self._hosts.items()
+            }
+
+    def reset(self):
+        """清除所有主机状态"""
+        with self._lock:
+            self._hosts.clear()
+
+
+# 全局熔断器
+circuit_breaker = CircuitBreaker()
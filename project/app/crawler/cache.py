@@ -0,0 +1,221 @@
+"""
+搜索结果缓存
+
+按(数据源, 关键词, 页码, 分页参数)缓存crawl_data抓取到的单页结果，热门关键词在有效期内不再重复请求搜索引擎。
+进程内为LRU缓存；配置CRAWLER_CACHE_PATH后增加一个SQLite持久层，多个工作进程共享。
+结果过期后的一段时间内（CRAWLER_CACHE_STALE秒）先返回旧结果，同时在后台线程重新抓取（stale-while-revalidate）。
+同一个键同时只有一个线程在抓取，其余请求等待其结果。
+缓存中保存结果的副本，每次读取也返回副本，调用方修改返回的结果（如补充字段）不会影响缓存和其他请求。
+"""
+import copy
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# 各数据源的缓存有效期（秒），可通过CRAWLER_CACHE_TTL配置
+DEFAULT_TTL = {'baidu': 300, 'bing': 300, 'xinhua': 120}
+
+
+class ResultCache:
+    """
+    搜索结果缓存
+    参数：
+        ttl - {数据源: 有效期秒数}，未列出的数据源不缓存
+        stale - 过期后仍可返回旧结果并后台刷新的时间（秒）
+        max_entries - 进程内最多缓存的条目数
+        path - SQLite持久层文件路径（可选）
+    """
+    def __init__(self, ttl=None, stale=600, max_entries=1000, path=None):
+        self.ttl = dict(DEFAULT_TTL if ttl is None else ttl)
+        self.stale = stale
+        self.max_entries = max_entries
+        self.path = path
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._stats = {}
+        self.reset_stats()
+
+    def init_app(self, app):
+        """按Flask配置设置缓存参数"""
+        self.enabled = app.config.get('CRAWLER_CACHE_ENABLED', True)
+        self.ttl = dict(DEFAULT_TTL, **app.config.get('CRAWLER_CACHE_TTL', {}))
+        self.stale = app.config.get('CRAWLER_CACHE_STALE', self.stale)
+        self.max_entries = app.config.get('CRAWLER_CACHE_MAX_ENTRIES', self.max_entries)
+        self.path = app.config.get('CRAWLER_CACHE_PATH', self.path)
+        if self.path:
+            self._init_store()
+
+    def get_or_fetch(self, source, key, fetch):
+        """
+        读取缓存，未命中时调用fetch()抓取并写入缓存
+        空结果视为抓取失败，不写入缓存。
+        参数：
+            source - 数据源，决定有效期
+            key - 缓存键（可JSON序列化的元组）
+            fetch - 抓取函数，返回结果列表
+        返回：结果列表（缓存命中时为副本）
+        """
+        ttl = self.ttl.get(source)
+        if not self.enabled or not ttl:
+            return fetch()
+
+        cache_key = json.dumps([source, *key], ensure_ascii=False)
+        entry, tier = self._lookup(cache_key)
+        if entry is not None:
+            age = time.time() - entry[0]
+            if age < ttl:
+                self._count('persistent_hits' if tier == 'persistent' else 'hits')
+                return copy.deepcopy(entry[1])
+            if age < ttl + self.stale:
+                self._count('stale_hits')
+                self._refresh_in_background(cache_key, fetch)
+                return copy.deepcopy(entry[1])
+
+        self._count('misses')
+        return self._load(cache_key, fetch)
+
+    def _lookup(self, cache_key):
+        """依次查找进程内缓存和持久层，返回((写入时间, 结果), 所在层)"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+                return entry, 'memory'
+        entry = self._store_get(cache_key)
+        if entry is not None:
+            self._remember(cache_key, entry)
+            return entry, 'persistent'
+        return None, None
+
+    def _load(self, cache_key, fetch):
+        """抓取并写入缓存，同一个键同时只抓取一次"""
+        with self._lock:
+            event = self._loading.get(cache_key)
+            owner = event is None
+            if owner:
+                event = self._loading[cache_key] = threading.Event()
+        if not owner:
+            event.wait()
+            with self._lock:
+                entry = self._entries.get(cache_key)
+            return copy.deepcopy(entry[1]) if entry is not None else fetch()
+
+        try:
+            results = fetch()
+            if results:
+                entry = (time.time(), copy.deepcopy(results))
+                self._remember(cache_key, entry)
+                self._store_put(cache_key, entry)
+            return results
+        finally:
+            with self._lock:
+                del self._loading[cache_key]
+            event.set()
+
+    def _refresh_in_background(self, cache_key, fetch):
+        """后台重新抓取过期的结果"""
+        with self._lock:
+            if cache_key in self._loading:
+                return
+        self._count('refreshes')
+        threading.Thread(target=self._load, args=(cache_key, fetch), daemon=True).start()
+
+    def _remember(self, cache_key, entry):
+        """写入进程内LRU缓存"""
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _connect(self):
+        """打开持久层连接"""
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def _init_store(self):
+        """创建持久层表"""
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS crawl_cache ('
+                'cache_key TEXT PRIMARY KEY, stored_at REAL NOT NULL, results TEXT NOT NULL)'
+            )
+
+    def _store_get(self, cache_key):
+        """从持久层读取"""
+        if not self.path:
+            return None
+        try:
+            connection = self._connect()
+            try:
+                row = connection.execute(
+                    'SELECT stored_at, results FROM crawl_cache WHERE cache_key = ?', (cache_key,)
+                ).fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning(f"读取采集缓存失败: {e}")
+            return None
+        return (row[0], json.loads(row[1])) if row else None
+
+    def _store_put(self, cache_key, entry):
+        """写入持久层，并清理超过最长保留时间的条目"""
+        if not self.path:
+            return
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute(
+                        'INSERT OR REPLACE INTO crawl_cache(cache_key, stored_at, results) VALUES (?, ?, ?)',
+                        (cache_key, entry[0], json.dumps(entry[1], ensure_ascii=False))
+                    )
+                    connection.execute(
+                        'DELETE FROM crawl_cache WHERE stored_at < ?',
+                        (time.time() - max(self.ttl.values(), default=0) - self.stale,)
+                    )
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.warning(f"写入采集缓存失败: {e}")
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """
+        缓存统计
+        返回：包含命中、过期命中、持久层命中、未命中、后台刷新次数、命中率和条目数的字典
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['stale_hits'] + stats['persistent_hits'] + stats['misses']
+        stats['hit_ratio'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        """重置统计"""
+        with self._lock:
+            self._stats = {'hits': 0, 'stale_hits': 0, 'persistent_hits': 0, 'misses': 0, 'refreshes': 0}
+
+    def clear(self):
+        """清空进程内缓存和持久层"""
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as connection:
+                connection.execute('DELETE FROM crawl_cache')
+
+
+# 全局结果缓存
+result_cache = ResultCache()
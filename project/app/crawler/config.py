@@ -0,0 +1,46 @@
+class CrawlerConfig:
+    """
+    爬虫配置类，用于配置爬虫参数
+
+    连接池参数：
+        pool_connections - 连接池缓存的主机数量
+        pool_maxsize - 每个主机保持的最大连接数
+        keep_alive - 是否复用连接（False时每次请求后关闭连接）
+
+    并发参数：
+        max_workers - 批量采集的全局最大并发数
+        max_per_host - 批量采集时单个主机的最大并发数
+
+    限速参数（见ratelimit模块）：
+        rate_limit - 单个主机每秒的请求数，0或None时不限速
+        burst - 单个主机可连续发送的请求数
+        host_rate_limits - 按主机名（含子域名）覆盖rate_limit的字典，默认百度每秒1次
+
+    重试和熔断参数（见fetcher和breaker模块）：
+        retries - GET/HEAD请求失败后的最大重试次数
+        retry_backoff - 首次重试的退避上限（秒），之后每次翻倍
+        retry_backoff_max - 退避上限的最大值（秒）
+        breaker_threshold - 主机连续失败多少次后熔断，0时不熔断
+        breaker_reset - 熔断持续的秒数，之后放行一个试探请求
+    """
+    def __init__(self, max_results=10, timeout=10, retries=3, user_agent=None,
+                 pool_connections=20, pool_maxsize=10, keep_alive=True,
+                 max_workers=8, max_per_host=4,
+                 rate_limit=2.0, burst=4, host_rate_limits=None,
+                 retry_backoff=0.5, retry_backoff_max=8.0, breaker_threshold=5, breaker_reset=30):
+        self.max_results = max_results
+        self.timeout = timeout
+        self.retries = retries
+        self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0"
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.host_rate_limits = {'baidu.com': 1.0} if host_rate_limits is None else host_rate_limits
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
@@ -1,18 +1,21 @@
+import logging
 import requests
 import urllib.parse
-from bs4 import BeautifulSoup
 import re
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.crawler.cache import result_cache
+from app.crawler.config import CrawlerConfig
+from app.crawler.executor import BoundedExecutor
+from app.crawler.fetcher import fetch
+from app.crawler.parser import parse_html
+from app.crawler.rules import CompiledRule
+from app.crawler.urls import url_fingerprint
+
+logger = logging.getLogger(__name__)
 
-class CrawlerConfig:
-    """
-    爬虫配置类，用于配置爬虫参数
-    """
-    def __init__(self, max_results=10, timeout=10, retries=3, user_agent=None):
-        self.max_results = max_results
-        self.timeout = timeout
-        self.retries = retries
-        self.user_agent = user_agent or "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0"
 
 def crawl_baidu_search(keyword, page=0, config=None):
     """
@@ -72,9 +75,9 @@ def crawl_baidu_search(keyword, page=0, config=None):
     
     try:
         # 发送请求，让requests自动处理压缩的响应
-        response = requests.get(base_url, params=params, headers=headers, timeout=config.timeout, 
-                              allow_redirects=True, 
-                              stream=False)  # stream=False让requests自动处理压缩
+        response = fetch(base_url, config=config, params=params, headers=headers,
+                         allow_redirects=True,
+                         stream=False)  # stream=False让requests自动处理压缩
         response.raise_for_status()  # 检查请求是否成功
         
         # 强制使用utf-8编码，处理中文乱码问题
@@ -84,8 +87,11 @@ def crawl_baidu_search(keyword, page=0, config=None):
         print(f"响应编码: {response.encoding}")
         print(f"响应头: {dict(response.headers)}")
         
-        # 解析HTML
-        soup = BeautifulSoup(html_text, 'html.parser')
+        # 解析HTML，只保留 #content_left 结果容器；页面结构不同（如验证页）时解析整个文档
+        soup = parse_html(html_text, name='baidu')
+        strained = soup.find() is not None
+        if not strained:
+            soup = parse_html(html_text, name='baidu_full')
         
         # 查找搜索结果
         results = []
@@ -195,6 +201,9 @@ def crawl_baidu_search(keyword, page=0, config=None):
         # 如果还是没有找到结果，尝试使用更通用的方式
         if not results:
             print("使用备选方式查找结果")
+            # 结果可能不在 #content_left 中，备选方式扫描整个文档的链接
+            if strained:
+                soup = parse_html(html_text, name='baidu_full')
             # 查找所有包含链接的元素
             all_links = soup.find_all('a')
             for link in all_links:
@@ -301,11 +310,11 @@ def crawl_bing_search(keyword, page=0, config=None):
     
     try:
         # 发送请求
-        response = requests.get(base_url, params=params, headers=headers, timeout=config.timeout)
+        response = fetch(base_url, config=config, params=params, headers=headers)
         response.raise_for_status()
         
-        # 解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
+        # 解析HTML，只保留 li.b_algo 结果节点
+        soup = parse_html(response.text, name='bing')
         results = []
         
         # 查找搜索结果
@@ -406,15 +415,15 @@ def crawl_xinhua_news(keyword='', page=0, limit=None, config=None):
     
     try:
         # 发送请求
-        response = requests.get(base_url, headers=headers, timeout=config.timeout)
+        response = fetch(base_url, config=config, headers=headers)
         response.raise_for_status()
         
         # 强制使用utf-8编码
         response.encoding = 'utf-8'
         html_text = response.text.encode('utf-8').decode('utf-8', 'ignore')
         
-        # 解析HTML
-        soup = BeautifulSoup(html_text, 'html.parser')
+        # 解析HTML，只保留带链接的 a 标签
+        soup = parse_html(html_text, name='xinhua')
         results = []
         
         # 方式1: 直接查找所有包含新闻链接的a标签
@@ -525,40 +534,252 @@ def crawl_xinhua_news(keyword='', page=0, limit=None, config=None):
         print(f"处理响应失败: {e}")
         return []
 
-def crawl_data(keyword, source='baidu', page=1, limit=20, config=None):
+# 支持的数据源，合并多个数据源的结果时按此顺序交替排列
+SOURCES = ('baidu', 'bing', 'xinhua')
+
+
+def resolve_sources(source):
+    """
+    解析数据源参数
+    参数：
+        source - 单个数据源、'all'、逗号分隔的数据源或数据源列表
+    返回：去重后的数据源列表，忽略不支持的数据源
+    """
+    if isinstance(source, str):
+        source = SOURCES if source.strip() == 'all' else source.split(',')
+    sources = []
+    for name in source or []:
+        name = name.strip()
+        if name in SOURCES and name not in sources:
+            sources.append(name)
+    return sources
+
+
+def _title_key(title):
+    """标题去重键：去掉空白和标点并转为小写"""
+    return re.sub(r'[\W_]+', '', title or '').lower()
+
+
+def merge_results(results_by_source, sources, limit=None):
+    """
+    合并多个数据源的结果
+    按排名交替排列（各数据源第1条、第2条……，同一排名按sources顺序），
+    URL指纹或标题相同的结果只保留排名最靠前的一条，并在engines中记录返回该结果的全部数据源。
+    参数：
+        results_by_source - {数据源: 结果列表}
+        sources - 数据源顺序
+        limit - 最多返回的数量（可选）
+    返回：合并后的结果列表，每条结果的engine为首个返回该结果的数据源
+    """
+    merged = []
+    seen = {}
+    lists = [(source, results_by_source.get(source) or []) for source in sources]
+    for rank in range(max((len(results) for _, results in lists), default=0)):
+        for source, results in lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            keys = [key for key in (url_fingerprint(result.get('original_url')), _title_key(result.get('title'))) if key]
+            item = next((seen[key] for key in keys if key in seen), None)
+            if item is None:
+                item = dict(result, engine=source, engines=[source])
+                merged.append(item)
+            elif source not in item['engines']:
+                item['engines'].append(source)
+            # 重复结果的URL和标题也指向保留的结果，便于识别后续数据源的同一条结果
+            for key in keys:
+                seen.setdefault(key, item)
+    return merged[:limit] if limit is not None else merged
+
+
+def federated_search(crawl_source, sources, limit=None, timeout=10, source_timeouts=None):
+    """
+    并发采集多个数据源并合并结果
+    各数据源从开始计时，超过各自的超时时间仍未返回的数据源被放弃，只合并已返回的结果，
+    总耗时取决于最慢的数据源（不超过超时时间），而不是各数据源耗时之和。
+    参数：
+        crawl_source - 采集单个数据源的函数 crawl_source(数据源) -> 结果列表
+        sources - 数据源列表
+        limit - 合并后最多返回的数量（可选）
+        timeout - 默认超时时间（秒）
+        source_timeouts - 各数据源的超时时间 {数据源: 秒数}（可选）
+    返回：(合并后的结果列表, {数据源: {'status': 'ok'/'timeout'/'error', 'count': 结果数, 'elapsed': 耗时}})
+    """
+    start = time.monotonic()
+    source_timeouts = source_timeouts or {}
+    deadlines = {source: start + source_timeouts.get(source, timeout) for source in sources}
+    results_by_source = {}
+    statuses = {}
+
+    def finish(source, status, results=None):
+        results_by_source[source] = results or []
+        statuses[source] = {
+            'status': status,
+            'count': len(results or []),
+            'elapsed': round(time.monotonic() - start, 3)
+        }
+
+    pool = ThreadPoolExecutor(max_workers=max(len(sources), 1))
+    try:
+        futures = {pool.submit(crawl_source, source): source for source in sources}
+        pending = set(futures)
+        while pending:
+            next_deadline = min(deadlines[futures[future]] for future in pending)
+            done, pending = wait(pending, timeout=max(next_deadline - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                source = futures[future]
+                try:
+                    finish(source, 'ok', future.result())
+                except Exception as e:
+                    print(f"数据源 {source} 采集失败: {e}")
+                    finish(source, 'error')
+            now = time.monotonic()
+            for future in [future for future in pending if deadlines[futures[future]] <= now]:
+                print(f"数据源 {futures[future]} 采集超时")
+                finish(futures[future], 'timeout')
+                pending.discard(future)
+    finally:
+        # 不等待超时的数据源结束
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return merge_results(results_by_source, sources, limit), statuses
+
+
+def crawl_data(keyword, source='baidu', page=1, limit=20, config=None, use_cache=True):
     """
     统一的数据采集接口，支持多种数据源
     
     Args:
         keyword: 搜索关键字
-        source: 数据源，支持 'baidu'、'bing' 和 'xinhua'
+        source: 数据源，支持 'baidu'、'bing' 和 'xinhua'；
+                'all'、逗号分隔的多个数据源或数据源列表时并发采集并合并去重
         page: 页码（1-based）
         limit: 最大返回结果数量
         config: 爬虫配置对象
+        use_cache: 是否使用搜索结果缓存
     
     Returns:
         list: 包含抓取结果的列表
     """
     config = config or CrawlerConfig()
     
+    sources = [source] if isinstance(source, str) and source in SOURCES else resolve_sources(source)
+    if sources and sources != [source]:
+        # 多个数据源并发采集，超时的数据源被放弃
+        results, _ = federated_search(
+            lambda name: crawl_data(keyword, source=name, page=page, limit=limit, config=config, use_cache=use_cache),
+            sources, limit=limit, timeout=config.timeout
+        )
+        return results
+    
     # 转换为0-based页码
     actual_page = page - 1
     
-    # 根据不同的数据源调用不同的爬取函数
+    # 根据不同的数据源调用不同的爬取函数，page_param为影响单页内容的分页参数
     if source == 'baidu':
         # 百度搜索引擎的特殊处理（针对分页反爬）
-        results = crawl_baidu_search(keyword, page=actual_page, config=config)
+        fetch_page = lambda: crawl_baidu_search(keyword, page=actual_page, config=config)
+        page_param = None
     elif source == 'bing':
-        results = crawl_bing_search(keyword, page=actual_page, config=config)
+        fetch_page = lambda: crawl_bing_search(keyword, page=actual_page, config=config)
+        page_param = config.max_results
     elif source == 'xinhua':
-        results = crawl_xinhua_news(keyword, page=actual_page, limit=limit, config=config)
+        fetch_page = lambda: crawl_xinhua_news(keyword, page=actual_page, limit=limit, config=config)
+        page_param = limit
     else:
-        results = []
+        return []
+    
+    if use_cache:
+        results = result_cache.get_or_fetch(source, (keyword, actual_page, page_param), fetch_page)
+    else:
+        results = fetch_page()
     
     # 返回指定数量的结果
     return results[:limit]
 
-def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=None, config=None):
+# 各数据源每页的结果数；Bing按config.max_results翻页，新华网按limit切分频道页
+BAIDU_PAGE_SIZE = 10
+
+# 没有真正分页的数据源：每页都请求同一个频道页再切分，一次请求就能取得全部结果
+SINGLE_PAGE_SOURCES = ('xinhua',)
+
+
+def estimate_pages(source, limit, config=None, max_pages=5):
+    """
+    估算采集limit条结果需要的页数
+    参数：
+        source - 数据源
+        limit - 需要的结果数量
+        config - 爬虫配置（可选）
+        max_pages - 最多采集的页数
+    返回：页数，至少为1
+    """
+    config = config or CrawlerConfig()
+    if source == 'baidu':
+        page_size = BAIDU_PAGE_SIZE
+    elif source == 'bing':
+        page_size = config.max_results
+    else:
+        page_size = limit
+    page_size = max(page_size, 1)
+    return min(max(-(-limit // page_size), 1), max_pages)
+
+
+def crawl_pages(keyword, source='baidu', limit=20, config=None, max_pages=5, concurrent=True):
+    """
+    多页采集，直到取得limit条结果
+    并发模式下按估算的页数同时请求各页，并多预取一页以应对某页结果不足；
+    结果按页码顺序拼接，取得足够结果或某页没有结果时停止，尚未开始的后续页请求被取消。
+    没有真正分页的数据源（新华网）只请求第一页，第一页已包含前limit条结果，后续页请求的是同一个频道页。
+    参数：
+        keyword - 搜索关键字
+        source - 数据源
+        limit - 需要的结果数量
+        config - 爬虫配置（可选），max_per_host限制同时请求的页数
+        max_pages - 最多采集的页数
+        concurrent - 是否并发请求各页，False时逐页请求
+    返回：按页码顺序排列的结果列表，最多limit条
+    """
+    config = config or CrawlerConfig()
+    if source in SINGLE_PAGE_SOURCES:
+        return crawl_data(keyword, source=source, page=1, limit=limit, config=config)[:limit]
+    pages = list(range(1, max_pages + 1))
+
+    def crawl_page(page):
+        return crawl_data(keyword, source=source, page=page, limit=limit, config=config)
+
+    if concurrent:
+        workers = estimate_pages(source, limit, config, max_pages)
+        if source in ('baidu', 'bing'):
+            # 搜索结果经过过滤后单页常不足一整页，多预取一页
+            workers += 1
+        workers = max(min(workers, max_pages, config.max_per_host), 1)
+        # 各页请求同一主机，并发数由workers统一限制
+        outcomes = BoundedExecutor(max_workers=workers, max_per_host=workers).imap(
+            crawl_page, pages, url_getter=lambda page: source
+        )
+    else:
+        outcomes = ((crawl_page(page), None) for page in pages)
+
+    results = []
+    try:
+        for page_results, error in outcomes:
+            if error:
+                print(f"分页采集失败: {error}")
+            # 当前页没有结果，后续页也不会有
+            if error or not page_results:
+                break
+            results.extend(page_results)
+            if len(results) >= limit:
+                break
+    finally:
+        outcomes.close()
+
+    return results[:limit]
+
+def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=None, config=None, rule=None,
+                           validators=None):
     """
     详细内容采集函数
     参数：
@@ -567,11 +788,22 @@ def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=No
         content_xpath - 内容XPATH（可选）
         headers - 请求头（可选）
         config - 爬虫配置（可选）
-    返回：解析后的详细内容
+        rule - 编译后的采集规则CompiledRule（可选），提供时忽略title_xpath和content_xpath
+        validators - 上次响应的缓存校验值（可选，见http_cache.load_validators），提供时发送条件请求
+    返回：解析后的详细内容，fingerprint为内容指纹，content_minhash为正文的MinHash签名；
+         包含http_cache键时为要保存的缓存信息。
+         页面未变化且没有缓存的页面内容时只返回{'not_modified': True, 'http_cache': ...}
+    异常：请求或解析失败时抛出原异常
     """
+    from app.crawler.http_cache import content_fingerprint, conditional_headers, decompress_body, response_cache_info
+    from app.warehouse.dedup import text_minhash
+    
     config = config or CrawlerConfig()
     
     try:
+        if rule is None and (title_xpath or content_xpath):
+            rule = CompiledRule(title_xpath, content_xpath)
+        
         # 构建请求头
         request_headers = {
             'user-agent': config.user_agent
@@ -579,24 +811,34 @@ def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=No
         
         if headers:
             request_headers.update(headers)
+        if validators:
+            request_headers.update(conditional_headers(validators))
         
         # 发送请求
-        response = requests.get(url, headers=request_headers, timeout=config.timeout)
-        response.raise_for_status()
-        
-        # 强制使用utf-8编码
-        response.encoding = 'utf-8'
-        html_text = response.text.encode('utf-8').decode('utf-8', 'ignore')
+        response = fetch(url, config=config, headers=request_headers)
+        
+        if validators and response.status_code == 304:
+            # 页面未变化：没有缓存的页面内容时由调用方沿用已有结果，不再解析
+            cache_info = {'status': 304}
+            if not validators.get('body'):
+                return {'not_modified': True, 'http_cache': cache_info}
+            html_text = decompress_body(validators['body'])
+        else:
+            response.raise_for_status()
+            
+            # 强制使用utf-8编码
+            response.encoding = 'utf-8'
+            html_text = response.text.encode('utf-8').decode('utf-8', 'ignore')
+            cache_info = response_cache_info(response, html_text)
         
         # 解析HTML
-        soup = BeautifulSoup(html_text, 'html.parser')
-        result = {}
+        soup = parse_html(html_text, name='detail')
+        
+        # 按规则解析标题和内容
+        result = rule.extract(html_text, soup) if rule else {}
         
         # 解析标题
-        if title_xpath:
-            title_element = soup.select_one(title_xpath)
-            result['title'] = title_element.get_text(strip=True) if title_element else ''
-        else:
+        if 'title' not in result:
             # 默认标题解析
             title = ''
             title_elements = soup.find_all(['h1', 'h2', 'h3'])
@@ -605,10 +847,7 @@ def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=No
             result['title'] = title
         
         # 解析详细内容
-        if content_xpath:
-            content_element = soup.select_one(content_xpath)
-            result['content'] = content_element.get_text(separator='\n', strip=True) if content_element else ''
-        else:
+        if 'content' not in result:
             # 默认内容解析
             content = ''
             content_tags = soup.find_all(['article', 'div', 'section'], class_=lambda x: x and ('content' in x or 'article' in x or 'main' in x))
@@ -673,19 +912,18 @@ def crawl_detailed_content(url, title_xpath=None, content_xpath=None, headers=No
             if name and content:
                 meta_data[name] = content
         result['meta_data'] = meta_data
+        result['fingerprint'] = content_fingerprint(result)
+        # 正文签名在采集线程中计算，写入时不再占用调用线程
+        result['content_minhash'] = text_minhash(result['content'])
         
+        if cache_info:
+            result['http_cache'] = cache_info
         return result
         
     except Exception as e:
-        print(f"详细内容采集失败 {url}: {e}")
-        return {
-            'title': '',
-            'content': '',
-            'images': [],
-            'videos': [],
-            'links': [],
-            'meta_data': {}
-        }
+        # 请求失败（包括熔断和重试耗尽）时抛出异常，由调用方计为失败，不能当作空白页面覆盖已有内容
+        logger.warning(f"详细内容采集失败 {url}: {e}")
+        raise
 
 if __name__ == "__main__":
     # 测试代码
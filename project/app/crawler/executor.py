@@ -0,0 +1,122 @@
+"""
+有界并发执行器
+
+在全局并发上限之外，按URL主机限制同时进行的请求数。
+任务按主机调度：某主机达到上限时先派发其他主机的任务，避免线程空等。
+imap按输入顺序流式返回结果，调用方拿到足够结果后停止迭代即可放弃尚未开始的任务。
+"""
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+
+def get_host(url):
+    """获取URL的主机名"""
+    try:
+        return (urlsplit(url).hostname or '').lower()
+    except ValueError:
+        return ''
+
+
+class BoundedExecutor:
+    """
+    有界并发执行器
+    参数：
+        max_workers - 全局最大并发数
+        max_per_host - 单个主机最大并发数
+    """
+    def __init__(self, max_workers=8, max_per_host=4):
+        self.max_workers = max(1, max_workers)
+        self.max_per_host = max(1, max_per_host)
+
+    def _iter_completed(self, func, items, url_getter=None, dispatch_limit=None):
+        """
+        并发执行func(item)，按完成顺序产出 (序号, (结果, 异常))
+        生成器提前关闭时不再派发剩余任务，也不等待正在执行的任务
+        参数：
+            dispatch_limit - 返回当前允许派发的最大序号（不含）的函数（可选）
+        """
+        url_getter = url_getter or (lambda item: item)
+        hosts = [get_host(url_getter(item)) for item in items]
+
+        pending = deque(range(len(items)))
+        in_flight = {}
+        host_active = Counter()
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or in_flight:
+                # 在全局和主机上限内尽可能多地派发任务
+                deferred = deque()
+                while pending and len(in_flight) < self.max_workers:
+                    if dispatch_limit and pending[0] >= dispatch_limit():
+                        break
+                    index = pending.popleft()
+                    host = hosts[index]
+                    if host_active[host] >= self.max_per_host:
+                        deferred.append(index)
+                        continue
+                    host_active[host] += 1
+                    in_flight[pool.submit(func, items[index])] = index
+                deferred.extend(pending)
+                pending = deferred
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = in_flight.pop(future)
+                    host_active[hosts[index]] -= 1
+                    try:
+                        outcome = (future.result(), None)
+                    except Exception as e:
+                        outcome = (None, e)
+                    yield index, outcome
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def map(self, func, items, url_getter=None, callback=None):
+        """
+        并发执行func(item)
+        参数：
+            func - 任务函数
+            items - 任务参数列表
+            url_getter - 从任务参数中取URL的函数，默认任务参数本身就是URL
+            callback - 每完成一个任务后在调用线程中执行 callback(已完成数, 总数)
+        返回：与items顺序一致的 (结果, 异常) 列表，成功时异常为None
+        """
+        items = list(items)
+        outcomes = [None] * len(items)
+        done_count = 0
+        for index, outcome in self._iter_completed(func, items, url_getter):
+            outcomes[index] = outcome
+            done_count += 1
+            if callback:
+                callback(done_count, len(items))
+        return outcomes
+
+    def imap(self, func, items, url_getter=None, window=None):
+        """
+        并发执行func(item)，按输入顺序逐个产出结果
+        前面的任务完成后立即产出，不等待全部完成；调用方停止迭代（关闭生成器）后剩余任务不再执行。
+        参数：
+            func - 任务函数
+            items - 任务参数列表，靠前的任务先派发
+            url_getter - 从任务参数中取URL的函数，默认任务参数本身就是URL
+            window - 最多领先尚未产出的第一个任务多少个派发，默认max_workers
+        返回：(结果, 异常) 的生成器，成功时异常为None
+        """
+        window = window or self.max_workers
+        buffered = {}
+        next_index = 0
+        completed = self._iter_completed(func, list(items), url_getter,
+                                         dispatch_limit=lambda: next_index + window)
+        try:
+            for index, outcome in completed:
+                buffered[index] = outcome
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            completed.close()
@@ -0,0 +1,124 @@
+"""
+共享的HTTP请求层
+
+所有采集函数都通过这里发送请求。会话按连接池参数缓存，
+同一主机的请求复用已建立的TCP/TLS连接，避免每次请求都重新做DNS解析和握手。
+每次请求前按主机限速，响应为429/503或验证码页面时降低该主机的速率（见ratelimit模块）。
+GET/HEAD请求遇到连接错误、超时、5xx或限流时按config.retries重试，重试间隔为带随机抖动的指数退避；
+连续失败的主机由熔断器暂停请求（见breaker模块）。
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.crawler.breaker import circuit_breaker
+from app.crawler.config import CrawlerConfig
+from app.crawler.ratelimit import rate_limiter
+
+# 可以安全重试的请求方法
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+# 计为主机故障并重试的状态码；429/503由限速器处理退避，只重试不计为故障
+FAILURE_STATUS = (500, 502, 504)
+
+# 按连接池参数缓存的会话
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _session_key(config):
+    """根据配置生成会话缓存键"""
+    return (config.pool_connections, config.pool_maxsize, config.keep_alive)
+
+
+def _create_session(config):
+    """创建带连接池的会话"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.pool_connections,
+        pool_maxsize=config.pool_maxsize
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not config.keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def get_session(config=None):
+    """
+    获取与配置匹配的共享会话
+    参数：
+        config - 爬虫配置对象（可选）
+    返回：requests.Session对象
+    """
+    config = config or CrawlerConfig()
+    key = _session_key(config)
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _create_session(config)
+                _sessions[key] = session
+    return session
+
+
+def fetch(url, config=None, method='GET', **kwargs):
+    """
+    通过共享连接池发送请求，请求前按主机限速，GET/HEAD请求失败时重试
+    参数：
+        url - 目标URL
+        config - 爬虫配置对象（可选），未指定timeout时使用config.timeout
+        method - 请求方法，默认GET
+        kwargs - 透传给requests的其他参数（headers、params等）
+    返回：requests.Response对象；重试用尽时返回最后一次响应或抛出最后一次异常，
+         主机熔断时抛出CircuitOpenError
+    """
+    config = config or CrawlerConfig()
+    kwargs.setdefault('timeout', config.timeout)
+    attempts = 1 + (max(0, config.retries or 0) if method.upper() in IDEMPOTENT_METHODS else 0)
+    
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        circuit_breaker.before_request(url, config)
+        rate_limiter.acquire(url, config)
+        try:
+            response = get_session(config).request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            circuit_breaker.record(url, False, config)
+            if last_attempt:
+                raise
+            time.sleep(retry_delay(attempt, config))
+            continue
+        
+        throttled = rate_limiter.report(url, response)
+        failed = response.status_code in FAILURE_STATUS
+        circuit_breaker.record(url, not failed, config)
+        if last_attempt or not (failed or throttled):
+            return response
+        # 限流时由限速器在下次请求前等待，不再额外退避
+        if not throttled:
+            time.sleep(retry_delay(attempt, config))
+    return response
+
+
+def retry_delay(attempt, config):
+    """
+    计算第attempt次失败后的重试间隔（full jitter：0到指数退避上限之间的随机值）
+    参数：
+        attempt - 已失败的次数减一
+        config - 爬虫配置对象，使用retry_backoff和retry_backoff_max
+    返回：秒数
+    """
+    return random.uniform(0, min(config.retry_backoff_max, config.retry_backoff * 2 ** attempt))
+
+
+def close_sessions():
+    """关闭所有缓存的会话，释放连接"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,152 @@
+"""
+深度采集的HTTP条件请求缓存
+
+http_cache表按URL保存上次响应的ETag、Last-Modified和zlib压缩的页面内容。
+重新采集时带上If-None-Match/If-Modified-Since请求头，服务器返回304时：
+已有深度采集结果的页面直接跳过解析，沿用已有结果；没有结果的页面用缓存的页面内容解析，不再下载。
+服务器不支持条件请求时，按提取结果计算内容指纹（content_fingerprint），与深度采集结果上保存的指纹相同
+说明页面内容未变化，只更新确认时间，不再重写内容、图片、链接等字段。
+采集线程只接收和返回普通字典，读写数据库都在调用线程中完成。
+"""
+import hashlib
+import json
+import zlib
+from datetime import datetime
+
+from sqlalchemy.orm import load_only
+
+from app import db
+from app.crawler.urls import url_fingerprint
+from app.models import HttpCacheEntry
+
+
+def compress_body(text):
+    """压缩页面内容"""
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress_body(body):
+    """解压页面内容"""
+    return zlib.decompress(body).decode('utf-8', 'ignore')
+
+
+def conditional_headers(validators):
+    """
+    生成条件请求头
+    参数：
+        validators - load_validators返回的单个URL的校验值字典
+    返回：请求头字典
+    """
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+
+def response_cache_info(response, html_text):
+    """
+    从200响应中提取要缓存的校验值和页面内容
+    参数：
+        response - requests.Response对象
+        html_text - 解码后的页面内容
+    返回：缓存信息字典；响应没有ETag和Last-Modified时服务器无法返回304，返回None
+    """
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    if not etag and not last_modified:
+        return None
+    return {
+        'status': 200,
+        'etag': etag,
+        'last_modified': last_modified,
+        'body': compress_body(html_text)
+    }
+
+
+def content_fingerprint(detailed_content):
+    """
+    计算提取结果的内容指纹
+    只包含DepthCrawlResult保存的字段，图片和视频列表与顺序无关。
+    参数：
+        detailed_content - crawl_detailed_content返回的结果
+    返回：SHA-1十六进制字符串
+    """
+    canonical = json.dumps([
+        detailed_content.get('content') or '',
+        sorted(detailed_content.get('images') or []),
+        sorted(detailed_content.get('videos') or []),
+        detailed_content.get('links') or [],
+        detailed_content.get('meta_data') or {},
+    ], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def load_validators(urls, with_body=()):
+    """
+    读取多个URL的缓存校验值
+    参数：
+        urls - URL列表
+        with_body - 需要同时读取缓存页面内容的URL集合（304时要重新解析的页面）
+    返回：{URL: {'etag', 'last_modified', 'body'}}，没有缓存的URL不在结果中
+    """
+    hashes = {}
+    for url in urls:
+        url_hash = url_fingerprint(url)
+        if url_hash:
+            hashes.setdefault(url_hash, []).append(url)
+    if not hashes:
+        return {}
+
+    with_body = set(with_body)
+    columns = [HttpCacheEntry.url_hash, HttpCacheEntry.etag, HttpCacheEntry.last_modified]
+    if with_body:
+        columns.append(HttpCacheEntry.body)
+    entries = HttpCacheEntry.query.options(load_only(*columns)) \
+        .filter(HttpCacheEntry.url_hash.in_(list(hashes))).all()
+
+    validators = {}
+    for entry in entries:
+        for url in hashes[entry.url_hash]:
+            validators[url] = {
+                'etag': entry.etag,
+                'last_modified': entry.last_modified,
+                'body': entry.body if url in with_body else None
+            }
+    return validators
+
+
+def save_cache_info(items):
+    """
+    保存采集后的缓存信息（调用方负责提交事务）
+    参数：
+        items - (URL, 缓存信息字典)列表；304只更新确认时间，200更新校验值和页面内容
+    """
+    items = [(url, url_fingerprint(url), info) for url, info in items if info]
+    items = [item for item in items if item[1]]
+    if not items:
+        return
+
+    entries = {
+        entry.url_hash: entry
+        for entry in HttpCacheEntry.query.filter(
+            HttpCacheEntry.url_hash.in_([url_hash for _, url_hash, _ in items])
+        ).all()
+    }
+    now = datetime.utcnow()
+    for url, url_hash, info in items:
+        entry = entries.get(url_hash)
+        if info['status'] == 304:
+            if entry is not None:
+                entry.validated_at = now
+            continue
+        if entry is None:
+            entry = entries[url_hash] = HttpCacheEntry(url_hash=url_hash)
+            db.session.add(entry)
+        entry.url = url
+        entry.etag = info.get('etag')
+        entry.last_modified = info.get('last_modified')
+        entry.body = info.get('body')
+        entry.fetched_at = now
+        entry.validated_at = now
@@ -0,0 +1,204 @@
+"""
+后台采集任务队列
+
+任务记录保存在crawl_jobs表中，由进程内的工作线程执行。
+提交任务后立即返回任务ID，进度通过轮询接口或SSE推送获取。
+服务进程处理第一个请求前恢复上次进程遗留的任务：长时间没有进度更新的执行中任务已随进程退出而中断，标记为失败；
+等待中的任务重新排队并启动工作线程。创建应用（包括flask命令行和测试）时不访问数据库、不启动线程，
+避免短暂运行的命令行进程认领任务后退出，或把其他进程正在执行的任务标记为失败。
+"""
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.models import CrawlJob
+
+# 两次进度写入之间的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+# 执行中的任务超过此秒数没有更新才视为中断，远大于进度写入间隔，其他进程正在执行的任务不会被误判
+STALE_JOB_TIMEOUT = 300
+
+
+def wants_async(values):
+    """判断请求是否要求以后台任务方式执行（async=1）"""
+    return str(values.get('async', '')).lower() in ('1', 'true', 'yes')
+
+
+class JobQueue:
+    """
+    后台任务队列
+    参数：
+        num_workers - 工作线程数量，可通过CRAWL_JOB_WORKERS配置
+        stale_timeout - 启动时判断执行中任务已中断的秒数，可通过CRAWL_JOB_STALE_TIMEOUT配置
+    """
+    def __init__(self, num_workers=2, stale_timeout=STALE_JOB_TIMEOUT):
+        self.app = None
+        self.num_workers = num_workers
+        self.stale_timeout = stale_timeout
+        self.handlers = {}
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._recovered = False
+
+    def init_app(self, app):
+        """
+        绑定Flask应用（不访问数据库）
+        CRAWL_JOB_RECOVER为真（默认）且不是测试时，在处理第一个请求前恢复遗留任务
+        """
+        self.app = app
+        self.num_workers = app.config.get('CRAWL_JOB_WORKERS', self.num_workers)
+        self.stale_timeout = app.config.get('CRAWL_JOB_STALE_TIMEOUT', self.stale_timeout)
+        if app.config.get('CRAWL_JOB_RECOVER', True) and not app.testing:
+            app.before_request(self._recover_once)
+
+    def _recover_once(self):
+        """服务进程处理第一个请求前恢复遗留任务，只执行一次"""
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        try:
+            # 数据库尚未迁移时跳过
+            if inspect(db.engine).has_table(CrawlJob.__tablename__):
+                self.recover()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            self.app.logger.error(f"恢复后台任务失败: {str(e)}")
+
+    def recover(self):
+        """
+        处理上次进程遗留的任务（需要应用上下文）
+        超过stale_timeout秒没有更新的执行中任务标记为失败，等待中的任务重新排队并启动工作线程。
+        返回：(标记为失败的任务数, 重新排队的任务数)
+        """
+        now = datetime.utcnow()
+        interrupted = CrawlJob.query.filter(
+            CrawlJob.status == 'running',
+            CrawlJob.updated_at <= now - timedelta(seconds=self.stale_timeout)
+        ).update({
+            'status': 'failed',
+            'message': '任务失败',
+            'error_message': '进程重启，任务中断',
+            'finished_at': now
+        }, synchronize_session=False)
+        db.session.commit()
+
+        pending = [job_id for (job_id,) in db.session.query(CrawlJob.id).filter_by(status='pending').order_by(CrawlJob.id).all()]
+        if pending:
+            self._ensure_started()
+            for job_id in pending:
+                self._queue.put(job_id)
+        return interrupted, len(pending)
+
+    def register(self, job_type):
+        """
+        注册任务处理函数
+        处理函数签名为 handler(params, report)，返回值作为任务结果保存。
+        report(processed, total=None, message=None) 用于上报进度，
+        只应在暂存数据库写入之前调用（它会提交当前会话）。
+        """
+        def decorator(func):
+            self.handlers[job_type] = func
+            return func
+        return decorator
+
+    def submit(self, job_type, params, user_id=None):
+        """
+        提交任务
+        参数：
+            job_type - 任务类型
+            params - 任务参数（可JSON序列化）
+            user_id - 提交者ID（可选）
+        返回：CrawlJob对象
+        """
+        if job_type not in self.handlers:
+            raise ValueError(f'未知的任务类型: {job_type}')
+
+        self._ensure_started()
+
+        job = CrawlJob(job_type=job_type, status='pending', created_by=user_id)
+        job.set_params(params)
+        db.session.add(job)
+        db.session.commit()
+
+        self._queue.put(job.id)
+        return job
+
+    def _ensure_started(self):
+        """首次需要执行任务时启动工作线程"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.num_workers):
+                thread = threading.Thread(target=self._worker, name=f'crawl-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _worker(self):
+        """工作线程主循环"""
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self.app.app_context():
+                    try:
+                        self._run(job_id)
+                    finally:
+                        db.session.remove()
+            except Exception as e:
+                self.app.logger.error(f"执行后台任务 {job_id} 失败: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id):
+        """执行单个任务"""
+        # 原子地认领任务，避免多个进程重复执行
+        claimed = CrawlJob.query.filter_by(id=job_id, status='pending').update(
+            {'status': 'running', 'started_at': datetime.utcnow()}
+        )
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(CrawlJob, job_id)
+        handler = self.handlers.get(job.job_type)
+        last_report = [0.0]
+
+        def report(processed, total=None, message=None):
+            """上报任务进度"""
+            job.processed = processed
+            if total is not None:
+                job.total = total
+            if message:
+                job.message = message
+            now = time.monotonic()
+            if now - last_report[0] >= PROGRESS_INTERVAL or (job.total and processed >= job.total):
+                last_report[0] = now
+                db.session.commit()
+
+        try:
+            if handler is None:
+                raise ValueError(f'未知的任务类型: {job.job_type}')
+            result = handler(job.get_params(), report)
+            job.status = 'completed'
+            job.message = '任务完成'
+            job.set_result(result)
+        except Exception as e:
+            self.app.logger.error(f"后台任务 {job_id} 执行失败: {str(e)}")
+            db.session.rollback()
+            job = db.session.get(CrawlJob, job_id)
+            job.status = 'failed'
+            job.message = '任务失败'
+            job.error_message = str(e)
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+job_queue = JobQueue()
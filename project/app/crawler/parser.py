@@ -0,0 +1,91 @@
+"""
+HTML解析层
+
+统一使用lxml作为BeautifulSoup的解析后端。各数据源在STRAINERS中声明只需要的节点，
+解析时通过SoupStrainer跳过其余部分；需要XPath时可直接获取lxml.html树。
+每次解析的耗时按名称累计，可通过get_parse_stats查看。
+"""
+import threading
+import time
+
+import lxml.html
+from bs4 import BeautifulSoup, SoupStrainer
+
+# 默认解析后端
+DEFAULT_PARSER = 'lxml'
+
+# 各数据源只需要解析的节点
+STRAINERS = {
+    # 百度搜索结果都在 #content_left 容器中
+    'baidu': SoupStrainer('div', id='content_left'),
+    # Bing 只需要 li.b_algo 结果节点
+    'bing': SoupStrainer('li', class_='b_algo'),
+    # 新华网列表页只需要带链接的 a 标签
+    'xinhua': SoupStrainer('a', href=True),
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _record(name, elapsed, size):
+    """累计解析耗时"""
+    with _stats_lock:
+        stat = _stats.setdefault(name, {'count': 0, 'total_time': 0.0, 'total_bytes': 0})
+        stat['count'] += 1
+        stat['total_time'] += elapsed
+        stat['total_bytes'] += size
+
+
+def parse_html(html_text, name=None, parse_only=None, parser=DEFAULT_PARSER):
+    """
+    解析HTML为BeautifulSoup对象
+    参数：
+        html_text - HTML文本
+        name - 解析来源名称，用于统计耗时；在STRAINERS中声明过的名称会自动使用对应的SoupStrainer
+        parse_only - 自定义SoupStrainer（可选），优先于STRAINERS
+        parser - 解析后端，默认lxml
+    返回：BeautifulSoup对象
+    """
+    if parse_only is None and name:
+        parse_only = STRAINERS.get(name)
+    started = time.perf_counter()
+    soup = BeautifulSoup(html_text, parser, parse_only=parse_only)
+    _record(name or 'default', time.perf_counter() - started, len(html_text or ''))
+    return soup
+
+
+def parse_tree(html_text, name=None):
+    """
+    解析HTML为lxml.html树，用于XPath查询
+    参数：
+        html_text - HTML文本
+        name - 解析来源名称，用于统计耗时
+    返回：lxml.html元素树的根节点
+    """
+    started = time.perf_counter()
+    try:
+        tree = lxml.html.fromstring(html_text or '<html></html>')
+    except ValueError:
+        # 带编码声明的XML头不能以str形式解析，改为按UTF-8字节解析
+        tree = lxml.html.fromstring(html_text.encode('utf-8'))
+    _record(name or 'default', time.perf_counter() - started, len(html_text or ''))
+    return tree
+
+
+def get_parse_stats():
+    """
+    获取各解析来源的累计耗时
+    返回：{名称: {'count', 'total_time', 'avg_time', 'total_bytes'}}
+    """
+    with _stats_lock:
+        return {
+            name: dict(stat, avg_time=stat['total_time'] / stat['count'] if stat['count'] else 0.0)
+            for name, stat in _stats.items()
+        }
+
+
+def reset_parse_stats():
+    """清空解析耗时统计"""
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,239 @@
+"""
+按主机限速
+
+每个主机一个令牌桶：令牌以每秒rate个的速度补充，最多积累burst个，每次请求消耗一个，没有令牌时等待。
+所有请求都经过fetcher.fetch，搜索采集和两个深度采集入口共用同一组令牌桶。
+主机返回429/503或验证码页面时自适应退避：速率减半（最低为配置速率的1/32），
+并在Retry-After指定的时间或按连续受限次数指数增长的时间（最长60秒）内暂停该主机的请求；
+之后每次正常响应把速率恢复配置值的1/10，直到恢复到配置速率。
+
+速率按以下顺序确定：采集规则SiteRule.rate_limit（按站点URL的主机名及其子域名生效）、
+CrawlerConfig.host_rate_limits、CrawlerConfig.rate_limit。速率为0或None时不限速。
+采集规则的站点速率在init_app之后的首次请求时加载，之后每SITE_RATES_REFRESH秒重新加载一次
+（其他进程修改的规则也能生效），本进程修改规则时由configure_site_rate_limits立即刷新。
+"""
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from app.crawler.executor import get_host
+
+# 触发退避的状态码
+THROTTLE_STATUS = (429, 503)
+
+# 验证码页面的特征（在URL或页面前部查找）
+CAPTCHA_MARKERS = ('wappass.baidu.com', '百度安全验证', 'id="captcha"', 'geetest', '/captcha')
+_CAPTCHA_SCAN_BYTES = 20000
+
+# 退避参数
+MIN_RATE_FACTOR = 1 / 32
+RECOVERY_STEP = 0.1
+MAX_BACKOFF = 60
+
+# 重新加载采集规则站点速率的间隔（秒）
+SITE_RATES_REFRESH = 300
+
+logger = logging.getLogger(__name__)
+
+
+def is_captcha(response):
+    """检查响应是否为验证码页面"""
+    if any(marker in (response.url or '') for marker in CAPTCHA_MARKERS):
+        return True
+    if 'html' not in response.headers.get('Content-Type', 'text/html'):
+        return False
+    head = (response.content or b'')[:_CAPTCHA_SCAN_BYTES]
+    return any(marker.encode('utf-8') in head for marker in CAPTCHA_MARKERS)
+
+
+def _retry_after(response):
+    """解析Retry-After响应头，返回秒数"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return parsedate_to_datetime(value).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+
+
+def _domain_lookup(rates, host):
+    """按主机名及其上级域名查找速率"""
+    parts = host.split('.')
+    for i in range(len(parts) - 1):
+        domain = '.'.join(parts[i:])
+        if domain in rates:
+            return rates[domain]
+    return None
+
+
+class _HostState:
+    """单个主机的令牌桶和退避状态"""
+    __slots__ = ('tokens', 'updated', 'factor', 'blocked_until', 'strikes', 'throttled', 'requests')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+        self.factor = 1.0
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.throttled = 0
+        self.requests = 0
+
+
+class HostRateLimiter:
+    """按主机的令牌桶限速器"""
+    def __init__(self):
+        self.app = None
+        self._hosts = {}
+        self._site_rates = {}
+        self._sites_loaded_at = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """记录应用实例，首次请求时从采集规则加载站点速率"""
+        self.app = app
+        self._sites_loaded_at = None
+
+    def configure_sites(self, site_rates):
+        """
+        设置采集规则的站点速率
+        参数：
+            site_rates - {站点URL或主机名: 每秒请求数}
+        """
+        rates = {}
+        for site, rate in site_rates.items():
+            host = get_host(site) if '//' in site else site.lower()
+            if host.startswith('www.'):
+                host = host[4:]
+            if host and rate:
+                rates[host] = rate
+        with self._lock:
+            self._site_rates = rates
+            self._sites_loaded_at = time.monotonic()
+
+    def load_sites(self):
+        """从启用的采集规则加载站点速率（需要应用上下文）"""
+        from app.models import SiteRule
+
+        rules = SiteRule.query.filter(SiteRule.is_active == True, SiteRule.rate_limit.isnot(None)).all()
+        self.configure_sites({rule.site_url: rule.rate_limit for rule in rules})
+
+    def _refresh_sites(self):
+        """站点速率尚未加载或已超过刷新间隔时从采集规则重新加载"""
+        if self.app is None:
+            return
+        with self._lock:
+            loaded_at = self._sites_loaded_at
+            if loaded_at is not None and time.monotonic() - loaded_at < SITE_RATES_REFRESH:
+                return
+            # 先记录加载时间，避免并发请求重复查询
+            self._sites_loaded_at = time.monotonic()
+        try:
+            with self.app.app_context():
+                self.load_sites()
+        except Exception as e:
+            logger.warning(f"加载采集规则站点速率失败: {e}")
+
+    def rate_for(self, host, config):
+        """确定主机的配置速率（每秒请求数），不限速时返回None"""
+        rate = _domain_lookup(self._site_rates, host)
+        if rate is None:
+            rate = _domain_lookup(config.host_rate_limits or {}, host)
+        if rate is None:
+            rate = config.rate_limit
+        return rate or None
+
+    def acquire(self, url, config):
+        """
+        请求前获取令牌，没有令牌或主机处于退避期时等待
+        参数：
+            url - 请求URL
+            config - 爬虫配置对象
+        返回：等待的秒数
+        """
+        self._refresh_sites()
+        host = get_host(url)
+        rate = self.rate_for(host, config)
+        if not host or not rate:
+            return 0
+        burst = max(1, config.burst)
+        with self._lock:
+            now = time.monotonic()
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = _HostState(burst, now)
+            effective_rate = rate * state.factor
+            # 预支令牌：令牌数为负时按欠缺的数量计算等待时间，保证等待的请求按顺序放行
+            state.tokens = min(burst, state.tokens + (now - state.updated) * effective_rate) - 1
+            state.updated = now
+            state.requests += 1
+            delay = max(-state.tokens / effective_rate, state.blocked_until - now, 0)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def report(self, url, response):
+        """
+        根据响应调整主机速率
+        参数：
+            url - 请求URL
+            response - requests.Response对象
+        返回：是否被限流（429/503或验证码页面）
+        """
+        host = get_host(url)
+        throttled = response.status_code in THROTTLE_STATUS or is_captcha(response)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return throttled
+            now = time.monotonic()
+            if throttled:
+                state.strikes += 1
+                state.throttled += 1
+                state.factor = max(state.factor / 2, MIN_RATE_FACTOR)
+                backoff = _retry_after(response)
+                if backoff is None:
+                    backoff = 2 ** (state.strikes - 1)
+                state.blocked_until = max(state.blocked_until, now + min(max(backoff, 0), MAX_BACKOFF))
+                state.tokens = min(state.tokens, 0)
+            else:
+                state.strikes = 0
+                state.factor = min(1.0, state.factor + RECOVERY_STEP)
+        return throttled
+
+    def stats(self):
+        """
+        各主机的限速状态
+        返回：{主机: {'rate_factor', 'blocked_for', 'requests', 'throttled'}}
+        """
+        with self._lock:
+            now = time.monotonic()
+            return {
+                host: {
+                    'rate_factor': round(state.factor, 4),
+                    'blocked_for': round(max(state.blocked_until - now, 0), 3),
+                    'requests': state.requests,
+                    'throttled': state.throttled
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def reset(self):
+        """清除所有主机状态"""
+        with self._lock:
+            self._hosts.clear()
+
+
+# 全局限速器
+rate_limiter = HostRateLimiter()
+
+
+def configure_site_rate_limits():
+    """从启用的采集规则加载全局限速器的站点速率（需要应用上下文）"""
+    rate_limiter.load_sites()
@@ -1,5 +1,5 @@
 from flask import Blueprint, request, jsonify
-from app.crawler.crawler import crawl_data
+from app.crawler.crawler import crawl_pages, federated_search, resolve_sources, SOURCES
 
 # 创建蓝图
 crawler_bp = Blueprint('crawler', __name__)
@@ -10,8 +10,10 @@ def crawl_data_api():
     数据采集API接口
     参数：
         keyword - 搜索关键字
-        source - 数据源，支持 'baidu'、'bing' 和 'xinhua'，默认为 'baidu'
-        pn - 翻页参数，默认为0代表第1页，10代表第2页，20代表第3页，以此类推
+        source - 数据源，支持 'baidu'、'bing' 和 'xinhua'，默认为 'baidu'；
+                 'all' 或逗号分隔的多个数据源时并发采集，结果交替排列并跨数据源去重
+        limit - 采集数量，默认20，最大100；需要多页时并发抓取
+        timeout - 多数据源采集时每个数据源的超时时间（秒），默认10，超时的数据源被放弃，返回其余数据源的结果
     返回：JSON格式的搜索结果
     """
     try:
@@ -37,39 +39,30 @@ def crawl_data_api():
                 'message': 'Missing keyword parameter'
             }), 400
         
-        # 调用抓取函数，支持多页抓取直到达到指定数量
-        all_results = []
-        page = 0
-        max_attempts = 5  # 最多尝试抓取的页数
+        sources = resolve_sources(source)
+        if source in SOURCES or not sources:
+            # 并发抓取多页直到达到指定数量，结果按页码顺序返回
+            final_results = crawl_pages(keyword, source=source, limit=limit)
+            source_statuses = None
+        else:
+            # 多个数据源并发采集，耗时取决于最慢的数据源
+            timeout = request.args.get('timeout', 10, type=float)
+            final_results, source_statuses = federated_search(
+                lambda name: crawl_pages(keyword, source=name, limit=limit),
+                sources, limit=limit, timeout=min(max(timeout, 1), 30)
+            )
         
-        while len(all_results) < limit and page < max_attempts:
-            # 计算还需要多少结果
-            remaining = limit - len(all_results)
-            
-            # 抓取当前页
-            page_results = crawl_data(keyword, source=source, page=page, limit=remaining)
-            
-            # 如果当前页没有结果，停止抓取
-            if not page_results:
-                break
-            
-            # 将当前页结果添加到总结果中
-            all_results.extend(page_results)
-            
-            # 增加页码
-            page += 1
-        
-        # 只返回用户指定数量的结果
-        final_results = all_results[:limit]
-        
-        return jsonify({
+        response = {
             'success': True,
             'keyword': keyword,
             'source': source,
             'limit': limit,
             'count': len(final_results),
             'results': final_results
-        }), 200
+        }
+        if source_statuses is not None:
+            response['sources'] = source_statuses
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({
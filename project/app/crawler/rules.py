@@ -0,0 +1,160 @@
+"""
+站点采集规则的编译与执行
+
+SiteRule中的标题/内容表达式按规则类型编译：XPath规则在lxml树上执行，CSS规则在BeautifulSoup上执行。
+编译结果按规则ID缓存，规则的updated_at变化后重新编译。
+"""
+import threading
+
+import soupsieve
+from lxml import etree
+
+from app.crawler.parser import parse_tree
+
+RULE_TYPE_XPATH = 'xpath'
+RULE_TYPE_CSS = 'css'
+RULE_TYPES = (RULE_TYPE_XPATH, RULE_TYPE_CSS)
+
+# 提取文本时跳过的标签
+SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def compile_expression(expression, rule_type=RULE_TYPE_XPATH):
+    """
+    编译单个规则表达式
+    参数：
+        expression - XPath或CSS选择器
+        rule_type - 规则类型（xpath或css）
+    返回：编译后的表达式，表达式为空时返回None
+    """
+    if not expression:
+        return None
+    if rule_type == RULE_TYPE_XPATH:
+        try:
+            return etree.XPath(expression)
+        except etree.XPathSyntaxError as e:
+            raise ValueError(f'无效的XPath表达式 {expression}: {str(e)}')
+    if rule_type == RULE_TYPE_CSS:
+        try:
+            return soupsieve.compile(expression)
+        except soupsieve.SelectorSyntaxError as e:
+            raise ValueError(f'无效的CSS选择器 {expression}: {str(e)}')
+    raise ValueError(f'未知的规则类型: {rule_type}')
+
+
+def element_text(element, separator=''):
+    """
+    获取lxml元素的文本，与BeautifulSoup的get_text(separator, strip=True)一致
+    参数：
+        element - lxml元素
+        separator - 文本片段之间的分隔符
+    返回：文本字符串
+    """
+    parts = []
+
+    def walk(node):
+        if not isinstance(node.tag, str) or node.tag.lower() in SKIP_TEXT_TAGS:
+            return
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(element)
+    return separator.join(part.strip() for part in parts if part.strip())
+
+
+class CompiledRule:
+    """
+    编译后的采集规则
+    参数：
+        title_expr - 标题表达式
+        content_expr - 内容表达式
+        rule_type - 规则类型（xpath或css）
+    """
+    def __init__(self, title_expr=None, content_expr=None, rule_type=RULE_TYPE_XPATH):
+        self.rule_type = rule_type or RULE_TYPE_XPATH
+        self.title = compile_expression(title_expr, self.rule_type)
+        self.content = compile_expression(content_expr, self.rule_type)
+
+    def _select_xpath(self, compiled, tree, separator):
+        """执行XPath并取第一个结果的文本"""
+        value = compiled(tree)
+        if isinstance(value, list):
+            if not value:
+                return ''
+            value = value[0]
+        if isinstance(value, etree._Element):
+            return element_text(value, separator)
+        if isinstance(value, bool):
+            return ''
+        return str(value).strip()
+
+    def _select_css(self, compiled, soup, separator):
+        """执行CSS选择器并取第一个结果的文本"""
+        element = compiled.select_one(soup)
+        return element.get_text(separator=separator, strip=True) if element else ''
+
+    def extract(self, html_text, soup=None):
+        """
+        按规则提取标题和内容
+        参数：
+            html_text - HTML文本，XPath规则据此构建lxml树
+            soup - 已解析的BeautifulSoup对象，CSS规则使用
+        返回：包含title和/或content的字典，只包含规则中配置了表达式的字段
+        """
+        fields = [('title', self.title, ''), ('content', self.content, '\n')]
+        result = {}
+        if self.rule_type == RULE_TYPE_XPATH:
+            tree = None
+            for field, compiled, separator in fields:
+                if compiled is None:
+                    continue
+                if tree is None:
+                    tree = parse_tree(html_text, name='detail_xpath')
+                result[field] = self._select_xpath(compiled, tree, separator)
+        else:
+            for field, compiled, separator in fields:
+                if compiled is not None:
+                    result[field] = self._select_css(compiled, soup, separator)
+        return result
+
+    def matches(self, html_text, soup=None):
+        """
+        检查规则能否在页面上提取到标题和内容
+        返回：(标题是否匹配, 内容是否匹配)
+        """
+        extracted = self.extract(html_text, soup)
+        return bool(extracted.get('title')), bool(extracted.get('content'))
+
+
+def get_compiled_rule(site_rule):
+    """
+    获取SiteRule的编译结果，按规则ID和updated_at缓存
+    参数：
+        site_rule - SiteRule对象
+    返回：CompiledRule对象
+    """
+    if site_rule.id is None:
+        return CompiledRule(site_rule.title_xpath, site_rule.content_xpath, site_rule.rule_type)
+
+    with _cache_lock:
+        cached = _cache.get(site_rule.id)
+    if cached and cached[0] == site_rule.updated_at:
+        return cached[1]
+
+    compiled = CompiledRule(site_rule.title_xpath, site_rule.content_xpath, site_rule.rule_type)
+    with _cache_lock:
+        _cache[site_rule.id] = (site_rule.updated_at, compiled)
+    return compiled
+
+
+def clear_rule_cache():
+    """清空规则编译缓存"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,357 @@
+"""
+定时采集任务调度器
+
+按next_run_time把启用的CrawlerTask放入最小堆，调度线程只在最早的任务到期时醒来，
+到期任务交给线程池执行，并限制同一主机同时执行的任务数，超出上限的任务按到期顺序排队。
+数据库只在启动和定期刷新（默认5分钟）时整体读取一次，不需要每秒轮询任务表。
+
+多个进程同时运行调度器时，任务通过把next_run_time从预期值推进到下一次执行时间来认领，
+只有认领成功的进程会执行该任务。
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import CrawlerTask, CrawlerResult
+from app.crawler.config import CrawlerConfig
+from app.crawler.executor import get_host
+from app.crawler.fetcher import fetch
+from app.crawler.parser import parse_html
+
+def extract_fields(html_text, rule):
+    """
+    按采集规则从HTML中提取字段
+    参数：
+        html_text - HTML文本
+        rule - 采集规则，格式为 {字段名: {"selector": CSS选择器, "attr": 属性名, "multiple": 是否取全部}}，
+               也可以直接写成 {字段名: CSS选择器}
+    返回：提取结果字典
+    """
+    soup = parse_html(html_text, name='task')
+    extracted = {}
+    for field, field_rule in (rule or {}).items():
+        if isinstance(field_rule, str):
+            field_rule = {'selector': field_rule}
+        if not isinstance(field_rule, dict) or not field_rule.get('selector'):
+            continue
+
+        attr = field_rule.get('attr')
+
+        def element_value(element):
+            if attr:
+                return element.get(attr, '')
+            return element.get_text(strip=True)
+
+        if field_rule.get('multiple'):
+            extracted[field] = [element_value(element) for element in soup.select(field_rule['selector'])]
+        else:
+            element = soup.select_one(field_rule['selector'])
+            extracted[field] = element_value(element) if element else ''
+    return extracted
+
+
+def run_crawler_task(task, config=None):
+    """
+    执行一次采集任务的请求和数据提取（不访问数据库）
+    参数：
+        task - CrawlerTask对象
+        config - 爬虫配置对象（可选）
+    返回：包含status_code、response_headers、response_body、extracted_data、
+          execution_time、error_message的字典
+    """
+    started = time.perf_counter()
+    outcome = {
+        'status_code': 0,
+        'response_headers': {},
+        'response_body': None,
+        'extracted_data': {},
+        'error_message': None
+    }
+    try:
+        response = fetch(
+            task.url,
+            config=config,
+            method=task.method or 'GET',
+            headers=task.get_headers() or None,
+            params=task.get_params() or None,
+            data=task.get_data() or None
+        )
+        outcome['status_code'] = response.status_code
+        outcome['response_headers'] = dict(response.headers)
+        outcome['response_body'] = response.text
+        response.raise_for_status()
+        outcome['extracted_data'] = extract_fields(response.text, task.get_rule())
+    except Exception as e:
+        outcome['error_message'] = str(e)
+    outcome['execution_time'] = time.perf_counter() - started
+    return outcome
+
+
+def execute_task(task_id, expected_run_time, config=None):
+    """
+    认领并执行一个到期任务，记录执行结果并原子地更新执行计数
+    参数：
+        task_id - 任务ID
+        expected_run_time - 调度器记录的next_run_time，用于认领任务
+        config - 爬虫配置对象（可选）
+    返回：任务的下一次执行时间；任务已删除或停用时返回None
+    """
+    task = db.session.get(CrawlerTask, task_id)
+    if not task or not task.is_active:
+        return None
+
+    now = datetime.utcnow()
+    interval = timedelta(seconds=max(task.interval or 0, 1))
+    next_run_time = (expected_run_time or now) + interval
+    if next_run_time <= now:
+        # 错过的执行不补跑，从当前时间重新计算
+        next_run_time = now + interval
+
+    if expected_run_time is None:
+        expected_filter = CrawlerTask.next_run_time.is_(None)
+    else:
+        expected_filter = CrawlerTask.next_run_time == expected_run_time
+    claimed = CrawlerTask.query.filter(CrawlerTask.id == task_id, expected_filter).update(
+        {'status': 'running', 'next_run_time': next_run_time},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not claimed:
+        # 其他进程已经执行了本次任务，按数据库中的时间重新排期
+        db.session.refresh(task)
+        return task.next_run_time
+
+    outcome = run_crawler_task(task, config)
+    success = outcome['error_message'] is None
+
+    result = CrawlerResult(
+        task_id=task_id,
+        url=task.url,
+        status_code=outcome['status_code'],
+        response_body=outcome['response_body'],
+        execution_time=outcome['execution_time'],
+        error_message=outcome['error_message'],
+        created_by=task.created_by
+    )
+    result.set_response_headers(outcome['response_headers'])
+    result.set_extracted_data(outcome['extracted_data'])
+    db.session.add(result)
+
+    # 计数在数据库中自增，并发执行时不会相互覆盖
+    CrawlerTask.query.filter_by(id=task_id).update({
+        'status': 'completed' if success else 'failed',
+        'last_run_time': now,
+        'total_runs': CrawlerTask.total_runs + 1,
+        'success_runs': CrawlerTask.success_runs + (1 if success else 0),
+        'failed_runs': CrawlerTask.failed_runs + (0 if success else 1)
+    }, synchronize_session=False)
+    db.session.commit()
+
+    return next_run_time
+
+
+class TaskScheduler:
+    """
+    基于最小堆的定时任务调度器
+    参数：
+        max_workers - 同时执行的最大任务数
+        max_per_host - 同一主机同时执行的最大任务数
+        refresh_interval - 重新读取任务表的间隔（秒），用于发现新增或修改的任务
+    """
+    def __init__(self, max_workers=8, max_per_host=2, refresh_interval=300):
+        self.app = None
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.refresh_interval = refresh_interval
+        self.config = CrawlerConfig()
+
+        self._heap = []
+        self._counter = itertools.count()
+        # 任务ID -> 当前有效的堆条目序号，序号不一致的条目已过期
+        self._entries = {}
+        # 任务ID -> 数据库中的next_run_time，用于认领任务
+        self._expected = {}
+        self._hosts = {}
+        self._running = set()
+        self._host_active = Counter()
+        # 主机 -> 等待该主机空闲的任务队列
+        self._host_queues = defaultdict(deque)
+        self._waiting = set()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._next_refresh = 0
+
+    def init_app(self, app):
+        """绑定Flask应用，CRAWLER_SCHEDULER_ENABLED为真时随应用启动"""
+        self.app = app
+        self.max_workers = app.config.get('CRAWLER_SCHEDULER_WORKERS', self.max_workers)
+        self.max_per_host = app.config.get('CRAWLER_SCHEDULER_MAX_PER_HOST', self.max_per_host)
+        self.refresh_interval = app.config.get('CRAWLER_SCHEDULER_REFRESH', self.refresh_interval)
+
+        @app.cli.command('crawler-scheduler')
+        def run_scheduler_command():
+            """在前台运行定时采集任务调度器"""
+            self.start()
+            try:
+                while self._thread.is_alive():
+                    self._thread.join(1)
+            except KeyboardInterrupt:
+                self.stop()
+
+        if app.config.get('CRAWLER_SCHEDULER_ENABLED'):
+            self.start()
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='crawler-task')
+        self._thread = threading.Thread(target=self._loop, name='crawler-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止调度线程，等待执行中的任务结束"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self._pool:
+            self._pool.shutdown(wait=True)
+
+    def schedule(self, task_id, run_time, url=None):
+        """
+        加入或重新安排任务
+        参数：
+            task_id - 任务ID
+            run_time - 数据库中的next_run_time，None表示立即执行
+            url - 任务URL，用于主机并发限制
+        """
+        with self._cond:
+            if url is not None:
+                self._hosts[task_id] = get_host(url)
+            self._expected[task_id] = run_time
+            self._push(task_id, run_time or datetime.utcnow())
+            self._cond.notify()
+
+    def unschedule(self, task_id):
+        """移除任务"""
+        with self._cond:
+            self._entries.pop(task_id, None)
+            self._expected.pop(task_id, None)
+            self._waiting.discard(task_id)
+
+    def _push(self, task_id, due_time):
+        """向堆中加入条目（调用方持有锁）"""
+        seq = next(self._counter)
+        self._entries[task_id] = seq
+        heapq.heappush(self._heap, (due_time, seq, task_id))
+
+    def _refresh(self):
+        """从任务表重新加载启用的任务"""
+        with self.app.app_context():
+            rows = db.session.query(
+                CrawlerTask.id, CrawlerTask.url, CrawlerTask.next_run_time
+            ).filter(CrawlerTask.is_active == True).all()
+            db.session.remove()
+
+        active_ids = set()
+        with self._cond:
+            for task_id, url, next_run_time in rows:
+                active_ids.add(task_id)
+                self._hosts[task_id] = get_host(url)
+                if task_id in self._running or task_id in self._waiting:
+                    continue
+                if task_id not in self._entries or self._expected.get(task_id) != next_run_time:
+                    self._expected[task_id] = next_run_time
+                    self._push(task_id, next_run_time or datetime.utcnow())
+            for task_id in list(self._entries) + list(self._waiting):
+                if task_id not in active_ids:
+                    self._entries.pop(task_id, None)
+                    self._expected.pop(task_id, None)
+                    self._waiting.discard(task_id)
+
+    def _dispatch(self, task_id, host):
+        """把任务交给线程池执行（调用方持有锁）"""
+        self._running.add(task_id)
+        self._host_active[host] += 1
+        self._pool.submit(self._execute, task_id, self._expected.get(task_id), host)
+
+    def _loop(self):
+        """调度主循环"""
+        while not self._stop.is_set():
+            if time.monotonic() >= self._next_refresh:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    self.app.logger.error(f"加载定时采集任务失败: {str(e)}")
+                self._next_refresh = time.monotonic() + self.refresh_interval
+
+            with self._cond:
+                timeout = max(self._next_refresh - time.monotonic(), 0)
+                if not self._heap:
+                    self._cond.wait(timeout)
+                    continue
+
+                due_time, seq, task_id = self._heap[0]
+                delay = (due_time - datetime.utcnow()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(min(delay, timeout))
+                    continue
+
+                heapq.heappop(self._heap)
+                if self._entries.get(task_id) != seq:
+                    continue
+                del self._entries[task_id]
+
+                host = self._hosts.get(task_id, '')
+                if self._host_active[host] >= self.max_per_host:
+                    # 主机已满，按到期顺序排队，等该主机有任务结束时再执行
+                    self._host_queues[host].append(task_id)
+                    self._waiting.add(task_id)
+                    continue
+
+                self._dispatch(task_id, host)
+
+    def _execute(self, task_id, expected, host):
+        """在工作线程中执行任务，完成后按新的next_run_time重新排期"""
+        next_run_time = None
+        try:
+            with self.app.app_context():
+                try:
+                    next_run_time = execute_task(task_id, expected, self.config)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            # 执行异常时不在本地排期，下一次刷新时按数据库中的时间重新加载
+            self.app.logger.error(f"执行定时采集任务 {task_id} 失败: {str(e)}")
+        finally:
+            with self._cond:
+                self._running.discard(task_id)
+                self._host_active[host] -= 1
+                if next_run_time is None:
+                    self._expected.pop(task_id, None)
+                elif not self._stop.is_set():
+                    self._expected[task_id] = next_run_time
+                    self._push(task_id, next_run_time)
+
+                # 优先执行在该主机上排队的任务
+                queue = self._host_queues[host]
+                while queue and not self._stop.is_set():
+                    waiting_id = queue.popleft()
+                    if waiting_id in self._waiting:
+                        self._waiting.discard(waiting_id)
+                        self._dispatch(waiting_id, host)
+                        break
+                self._cond.notify()
+
+
+task_scheduler = TaskScheduler()
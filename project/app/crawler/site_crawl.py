@@ -0,0 +1,364 @@
+"""
+站点广度优先采集
+
+从采集规则的站点URL（SiteRule.site_url）开始，按广度优先顺序跟踪同站点的链接，直到达到最大深度或页面数上限。
+页面通过crawl_detailed_content采集（与详细内容采集使用同一套请求、限速和解析流程），
+有标题和正文的页面写入采集结果及深度采集结果，所有页面的链接都用于扩展待采集队列。
+
+已发现的URL按指纹（规范化URL的SHA-1）去重：内存中的布隆过滤器判断"一定未见过"，
+过滤器命中时再查询磁盘上的精确集合，内存占用与站点规模基本无关，误判只会多一次磁盘查询。
+精确集合、待采集队列和计数保存在每个站点一个的SQLite状态文件中，每采集一批页面保存一次检查点，
+任务中断后可从检查点继续（resume）。
+"""
+import math
+import os
+import sqlite3
+import struct
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+from flask import current_app
+
+from app import db
+from app.crawler.config import CrawlerConfig
+from app.crawler.executor import BoundedExecutor, get_host
+from app.crawler.urls import url_fingerprint
+
+# 默认的最大深度和页面数上限，可通过SITE_CRAWL_MAX_DEPTH、SITE_CRAWL_MAX_PAGES配置
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 200
+
+# 布隆过滤器的默认容量和误判率
+BLOOM_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.01
+
+# 不跟踪的链接后缀
+SKIP_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.ico', '.css', '.js',
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.zip', '.rar', '.7z',
+    '.mp3', '.mp4', '.avi', '.flv', '.wmv', '.apk', '.exe'
+)
+
+# 写入采集结果的摘要长度
+SUMMARY_LENGTH = 200
+
+# 状态文件中的状态值
+STATUS_RUNNING = 'running'
+STATUS_FINISHED = 'finished'
+
+
+class BloomFilter:
+    """
+    布隆过滤器，键为URL指纹（十六进制SHA-1）
+    参数：
+        capacity - 预计的元素数量
+        error_rate - 元素数量不超过capacity时的误判率
+    """
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        """按双重哈希计算各比特位置，SHA-1本身分布均匀，直接取其前16字节"""
+        first, second = struct.unpack('>QQ', bytes.fromhex(key)[:16])
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class CrawlState:
+    """
+    站点采集状态文件：已发现URL的精确集合、待采集队列和计数
+    参数：
+        path - 状态文件路径
+        capacity - 布隆过滤器容量
+    """
+    def __init__(self, path, capacity=BLOOM_CAPACITY):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.capacity = capacity
+        self.bloom = BloomFilter(capacity)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(
+            'CREATE TABLE IF NOT EXISTS seen (url_hash TEXT PRIMARY KEY) WITHOUT ROWID;'
+            'CREATE TABLE IF NOT EXISTS frontier (position INTEGER PRIMARY KEY, url TEXT NOT NULL, depth INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);'
+        )
+        self.connection.commit()
+
+    def reset(self):
+        """清空状态，开始新的采集"""
+        with self.connection:
+            for table in ('seen', 'frontier', 'meta'):
+                self.connection.execute(f'DELETE FROM {table}')
+        self.bloom = BloomFilter(self.capacity)
+
+    def load(self):
+        """
+        读取检查点，并按精确集合重建布隆过滤器
+        返回：(待采集队列[(url, depth)], 计数字典)；没有未完成的采集时返回(None, None)
+        """
+        meta = dict(self.connection.execute('SELECT key, value FROM meta'))
+        if meta.get('status') != STATUS_RUNNING:
+            return None, None
+        self.bloom = BloomFilter(self.capacity)
+        for (url_hash,) in self.connection.execute('SELECT url_hash FROM seen'):
+            self.bloom.add(url_hash)
+        frontier = [tuple(row) for row in self.connection.execute('SELECT url, depth FROM frontier ORDER BY position')]
+        counters = {key: int(value) for key, value in meta.items() if key != 'status'}
+        return frontier, counters
+
+    def add(self, url_hash):
+        """
+        记录已发现的URL
+        返回：是否为新URL
+        """
+        if url_hash in self.bloom:
+            if self.connection.execute('SELECT 1 FROM seen WHERE url_hash = ?', (url_hash,)).fetchone():
+                return False
+        self.bloom.add(url_hash)
+        self.connection.execute('INSERT OR IGNORE INTO seen(url_hash) VALUES (?)', (url_hash,))
+        return True
+
+    def checkpoint(self, frontier, counters, status=STATUS_RUNNING):
+        """保存待采集队列和计数（同时提交期间记录的已发现URL）"""
+        with self.connection:
+            self.connection.execute('DELETE FROM frontier')
+            self.connection.executemany('INSERT INTO frontier(url, depth) VALUES (?, ?)', list(frontier))
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)',
+                [('status', status)] + [(key, str(value)) for key, value in counters.items()]
+            )
+
+    def seen_count(self):
+        """已发现的URL数量"""
+        return self.connection.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def _site_host(url):
+    """站点主机名（去掉www.前缀）"""
+    host = get_host(url)
+    return host[4:] if host.startswith('www.') else host
+
+
+def same_site(url, site_host):
+    """判断URL是否属于站点（主机名相同或为其子域名）"""
+    host = _site_host(url)
+    return bool(host) and (host == site_host or host.endswith('.' + site_host))
+
+
+def extract_links(page_url, detailed_content, site_host):
+    """
+    从采集结果中取出需要跟踪的同站点链接
+    参数：
+        page_url - 页面URL，用于解析相对链接
+        detailed_content - crawl_detailed_content返回的结果
+        site_host - 站点主机名
+    返回：URL列表（保持页面中的顺序）
+    """
+    urls = []
+    for link in detailed_content.get('links') or []:
+        href = (link.get('href') if isinstance(link, dict) else link) or ''
+        url = urljoin(page_url, href.strip()).split('#', 1)[0]
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            continue
+        if parts.path.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        if same_site(url, site_host):
+            urls.append(url)
+    return urls
+
+
+class SiteCrawler:
+    """
+    广度优先的站点采集器
+    参数：
+        start_url - 起始URL
+        state - CrawlState对象
+        fetch_page - 采集函数 fetch_page(url) -> crawl_detailed_content格式的结果
+        store_pages - 保存函数 store_pages([(url, depth, 详细内容)]) -> 保存的页面数，只传入有标题和正文的页面
+        max_depth - 最大深度，起始页为0
+        max_pages - 最多采集的页面数
+        config - 爬虫配置对象，使用max_workers、max_per_host
+        batch_size - 每批并发采集的页面数，每批结束后保存一次检查点，默认max_workers的4倍
+    """
+    def __init__(self, start_url, state, fetch_page, store_pages, max_depth=DEFAULT_MAX_DEPTH,
+                 max_pages=DEFAULT_MAX_PAGES, config=None, batch_size=None):
+        self.start_url = start_url
+        self.site_host = _site_host(start_url)
+        self.state = state
+        self.fetch_page = fetch_page
+        self.store_pages = store_pages
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.config = config or CrawlerConfig()
+        self.batch_size = batch_size or self.config.max_workers * 4
+
+    def run(self, resume=False, report=None):
+        """
+        执行采集
+        参数：
+            resume - 是否从上次未完成的检查点继续，没有检查点时重新开始
+            report - 进度上报函数 report(已采集页面数, 页面数上限, 消息)（可选）
+        返回：{'pages', 'stored', 'failed', 'discovered', 'frontier', 'max_depth_reached', 'resumed'}
+        """
+        frontier, counters = self.state.load() if resume else (None, None)
+        resumed = frontier is not None
+        if not resumed:
+            self.state.reset()
+            frontier = []
+            url_hash = url_fingerprint(self.start_url)
+            if url_hash:
+                self.state.add(url_hash)
+                frontier.append((self.start_url, 0))
+            counters = {}
+        counters = dict({'pages': 0, 'stored': 0, 'failed': 0, 'max_depth_reached': 0}, **counters)
+        frontier = deque(frontier)
+        self.state.checkpoint(frontier, counters)
+
+        executor = BoundedExecutor(max_workers=self.config.max_workers, max_per_host=self.config.max_per_host)
+        while frontier and counters['pages'] < self.max_pages:
+            count = min(self.batch_size, self.max_pages - counters['pages'], len(frontier))
+            batch = [frontier.popleft() for _ in range(count)]
+            outcomes = executor.map(self.fetch_page, [url for url, _ in batch])
+
+            pages = []
+            for (url, depth), (detailed_content, error) in zip(batch, outcomes):
+                counters['pages'] += 1
+                counters['max_depth_reached'] = max(counters['max_depth_reached'], depth)
+                if error or not detailed_content:
+                    counters['failed'] += 1
+                    continue
+                if detailed_content.get('title') and detailed_content.get('content'):
+                    pages.append((url, depth, detailed_content))
+                if depth >= self.max_depth:
+                    continue
+                for link in extract_links(url, detailed_content, self.site_host):
+                    url_hash = url_fingerprint(link)
+                    if url_hash and self.state.add(url_hash):
+                        frontier.append((link, depth + 1))
+
+            if pages:
+                counters['stored'] += self.store_pages(pages)
+            self.state.checkpoint(frontier, counters)
+            if report:
+                report(counters['pages'], self.max_pages, f'已采集{counters["pages"]}个页面，待采集{len(frontier)}个')
+
+        status = STATUS_RUNNING if frontier else STATUS_FINISHED
+        self.state.checkpoint(frontier, counters, status=status)
+        return dict(counters, discovered=self.state.seen_count(), frontier=len(frontier), resumed=resumed)
+
+
+def state_path(site_rule):
+    """站点采集状态文件路径，目录可通过SITE_CRAWL_DIR配置"""
+    directory = current_app.config.get('SITE_CRAWL_DIR') or os.path.join(current_app.instance_path, 'site_crawl')
+    return os.path.join(directory, f'site_{site_rule.id}.db')
+
+
+def store_site_pages(site_rule, pages):
+    """
+    把站点采集到的页面写入采集结果和深度采集结果
+    参数：
+        site_rule - SiteRule对象
+        pages - [(url, depth, 详细内容)]
+    返回：写入的页面数
+    """
+    from app.crawler.http_cache import save_cache_info
+    from app.crawler.writer import crawl_writer
+    from app.models import CrawlResult, DepthCrawlResult
+    from app.warehouse.links import index_pages
+    from app.warehouse.pagination import clear_count_cache
+
+    rows = []
+    for url, depth, detailed_content in pages:
+        images = detailed_content.get('images') or []
+        rows.append(CrawlResult.build_row({
+            'title': detailed_content['title'][:255],
+            'summary': detailed_content['content'][:SUMMARY_LENGTH],
+            'cover': images[0] if images else '',
+            'original_url': url,
+            'source': site_rule.site_name,
+            'depth': depth
+        }, keyword=site_rule.site_name, depth_crawled=True, is_stored=True))
+
+    # 写入队列在独立的会话中写入，先提交当前会话
+    db.session.commit()
+    ids = crawl_writer.upsert_rows(rows, update_columns=('last_seen_at', 'depth_crawled', 'is_stored'))
+
+    existing = {
+        depth_result.crawl_result_id: depth_result
+        for depth_result in DepthCrawlResult.query.filter(DepthCrawlResult.crawl_result_id.in_(ids)).all()
+    }
+    changed_pages = []
+    cache_infos = []
+    for crawl_result_id, (url, _, detailed_content) in zip(ids, pages):
+        cache_infos.append((url, detailed_content.pop('http_cache', None)))
+        depth_result = existing.get(crawl_result_id)
+        if depth_result is None:
+            depth_result = existing[crawl_result_id] = DepthCrawlResult(crawl_result_id=crawl_result_id)
+            db.session.add(depth_result)
+        if depth_result.apply_detailed_content(detailed_content):
+            changed_pages.append((crawl_result_id, detailed_content))
+    index_pages(changed_pages)
+    save_cache_info(cache_infos)
+    db.session.commit()
+    clear_count_cache()
+    return len(rows)
+
+
+def crawl_site(site_rule, max_depth=None, max_pages=None, resume=False, report=None, config=None):
+    """
+    从采集规则的站点URL开始广度优先采集
+    参数：
+        site_rule - SiteRule对象
+        max_depth - 最大深度（可选），默认读取SITE_CRAWL_MAX_DEPTH配置
+        max_pages - 最多采集的页面数（可选），默认读取SITE_CRAWL_MAX_PAGES配置
+        resume - 是否从上次未完成的检查点继续
+        report - 进度上报函数（可选）
+        config - 爬虫配置（可选）
+    返回：采集统计，见SiteCrawler.run
+    """
+    from app.crawler.crawler import crawl_detailed_content
+    from app.crawler.ratelimit import configure_site_rate_limits
+    from app.crawler.rules import get_compiled_rule
+
+    configure_site_rate_limits()
+    config = config or CrawlerConfig()
+    if max_depth is None:
+        max_depth = current_app.config.get('SITE_CRAWL_MAX_DEPTH', DEFAULT_MAX_DEPTH)
+    if max_pages is None:
+        max_pages = current_app.config.get('SITE_CRAWL_MAX_PAGES', DEFAULT_MAX_PAGES)
+
+    headers = site_rule.get_request_headers()
+    try:
+        rule = get_compiled_rule(site_rule)
+    except ValueError as e:
+        current_app.logger.error(f"编译采集规则失败 {site_rule.site_name}: {str(e)}")
+        rule = None
+
+    def fetch_page(url):
+        return crawl_detailed_content(url, headers=headers, config=config, rule=rule)
+
+    state = CrawlState(state_path(site_rule))
+    try:
+        crawler = SiteCrawler(
+            site_rule.site_url, state, fetch_page, lambda pages: store_site_pages(site_rule, pages),
+            max_depth=max_depth, max_pages=max_pages, config=config
+        )
+        return crawler.run(resume=resume, report=report)
+    finally:
+        state.close()
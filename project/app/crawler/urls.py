@@ -0,0 +1,67 @@
+"""
+URL规范化与指纹
+
+同一页面的不同写法（主机名大小写、默认端口、锚点、跟踪参数、参数顺序等）规范化为同一个URL，
+再取SHA-1作为指纹，用于采集结果去重。
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {'spm', 'gclid', 'fbclid'}
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    规范化URL
+    参数：
+        url - 原始URL
+    返回：规范化后的URL，无法解析时返回去掉首尾空白的原始字符串
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'http:' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{host}:{port}'
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    # http和https视为同一页面
+    if scheme == 'https':
+        scheme = 'http'
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def url_fingerprint(url):
+    """
+    计算URL指纹
+    参数：
+        url - 原始URL
+    返回：规范化URL的SHA-1十六进制字符串，URL为空时返回None
+    """
+    normalized = normalize_url(url)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
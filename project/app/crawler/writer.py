@@ -0,0 +1,135 @@
+"""
+采集结果写入队列
+
+所有采集结果写入（CrawlResult.upsert_rows）由一个写线程串行执行，多个采集任务同时写入时不再争抢数据库写锁。
+写线程每次取出队列中已积压的全部写入请求（最多CRAWL_WRITER_MAX_ROWS行），合并为一个事务提交；
+合并提交失败时逐个重新写入，只有出错的请求收到异常。
+调用方等待写入完成并得到记录ID，调用前应先提交当前会话中的写操作，否则写线程会等待该会话释放写锁。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import current_app
+
+from app import db
+from app.models import CrawlResult
+
+
+class _WriteRequest:
+    """一次写入请求"""
+    __slots__ = ('app', 'update_columns', 'rows', 'future')
+
+    def __init__(self, app, update_columns, rows):
+        self.app = app
+        self.update_columns = update_columns
+        self.rows = rows
+        self.future = Future()
+
+
+class CrawlWriter:
+    """
+    采集结果写入队列
+    参数：
+        max_rows - 一次合并提交的最大行数，可通过CRAWL_WRITER_MAX_ROWS配置
+        linger - 取到第一个请求后等待更多请求的秒数，可通过CRAWL_WRITER_LINGER配置，默认不等待
+    """
+    def __init__(self, max_rows=2000, linger=0):
+        self.enabled = True
+        self.max_rows = max_rows
+        self.linger = linger
+        self.commits = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """按Flask配置设置写入参数，CRAWL_WRITER_ENABLED为假时在调用线程中直接写入"""
+        self.enabled = app.config.get('CRAWL_WRITER_ENABLED', True)
+        self.max_rows = app.config.get('CRAWL_WRITER_MAX_ROWS', self.max_rows)
+        self.linger = app.config.get('CRAWL_WRITER_LINGER', self.linger)
+
+    def upsert_rows(self, rows, update_columns=('last_seen_at',)):
+        """
+        通过写线程按URL指纹写入采集结果
+        参数：
+            rows - build_row生成的字段字典列表
+            update_columns - URL已存在时更新的列
+        返回：记录ID列表，与rows顺序一致
+        """
+        if not rows:
+            return []
+        if not self.enabled or threading.current_thread() is self._thread:
+            return CrawlResult.upsert_rows(rows, update_columns=update_columns)
+
+        self._ensure_started()
+        request = _WriteRequest(current_app._get_current_object(), tuple(update_columns), rows)
+        self._queue.put(request)
+        return request.future.result()
+
+    def _ensure_started(self):
+        """首次写入时启动写线程"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='crawl-writer', daemon=True)
+                self._thread.start()
+
+    def _take_batch(self):
+        """取出一批写入请求：阻塞等待第一个，再取出已积压的请求"""
+        batch = [self._queue.get()]
+        row_count = len(batch[0].rows)
+        deadline = time.monotonic() + self.linger
+        while row_count < self.max_rows:
+            try:
+                remaining = deadline - time.monotonic()
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            row_count += len(request.rows)
+        return batch
+
+    def _worker(self):
+        """写线程主循环"""
+        while True:
+            batch = self._take_batch()
+            groups = {}
+            for request in batch:
+                groups.setdefault((request.app, request.update_columns), []).append(request)
+            for (app, update_columns), requests in groups.items():
+                try:
+                    self._commit(app, update_columns, requests)
+                except Exception as e:
+                    if len(requests) == 1:
+                        requests[0].future.set_exception(e)
+                        continue
+                    # 合并提交失败时逐个写入
+                    for request in requests:
+                        try:
+                            self._commit(app, update_columns, [request])
+                        except Exception as error:
+                            request.future.set_exception(error)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _commit(self, app, update_columns, requests):
+        """在一个事务中写入多个请求的记录，并把ID分配给各请求"""
+        rows = [row for request in requests for row in request.rows]
+        with app.app_context():
+            try:
+                ids = CrawlResult.upsert_rows(rows, update_columns=update_columns, chunk_size=len(rows))
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+        self.commits += 1
+        start = 0
+        for request in requests:
+            request.future.set_result(ids[start:start + len(request.rows)])
+            start += len(request.rows)
+
+
+# 全局写入队列
+crawl_writer = CrawlWriter()
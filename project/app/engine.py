@@ -0,0 +1,70 @@
+"""
+数据库引擎配置
+
+SQLite：每个连接建立时设置PRAGMA。WAL模式下读操作不会被写事务阻塞，synchronous=NORMAL在WAL下只在检查点时同步磁盘，
+busy_timeout让写操作在锁被占用时等待而不是立即报"database is locked"，mmap_size和cache_size减少读取时的系统调用。
+可通过SQLITE_PRAGMAS配置覆盖，值为None的项不设置。
+MySQL/PostgreSQL：设置连接池大小（DB_POOL_SIZE、DB_MAX_OVERFLOW）、连接回收时间（DB_POOL_RECYCLE），
+并在取出连接时检测连接是否可用（pool_pre_ping），避免使用被服务器关闭的空闲连接。
+SQLALCHEMY_ENGINE_OPTIONS中显式配置的项优先。
+"""
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 默认的SQLite连接参数，busy_timeout需要在切换journal_mode之前设置
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+# 当前生效的SQLite连接参数
+_sqlite_pragmas = dict(SQLITE_PRAGMAS)
+
+
+def engine_options(uri, config):
+    """
+    按数据库类型生成引擎参数
+    参数：
+        uri - 数据库连接URI
+        config - Flask配置
+    返回：SQLALCHEMY_ENGINE_OPTIONS字典
+    """
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_pre_ping': True,
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """为新建的SQLite连接设置PRAGMA"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas.items():
+            if value is not None:
+                cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def init_app(app):
+    """设置引擎参数并注册SQLite连接PRAGMA（需在db.init_app之前调用）"""
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    _sqlite_pragmas.clear()
+    _sqlite_pragmas.update(SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {}))
+    if not event.contains(Engine, 'connect', _set_sqlite_pragmas):
+        event.listen(Engine, 'connect', _set_sqlite_pragmas)
@@ -3,6 +3,8 @@ from flask_login import login_required, current_user
 from app.main import bp
 from app import db
 from app.models import CrawlResult
+from app.crawler.writer import crawl_writer
+from app.warehouse.pagination import clear_count_cache
 import json
 
 
@@ -42,33 +44,21 @@ def api_store_data():
         if not isinstance(results, list) or len(results) == 0:
             return jsonify({'success': False, 'message': '请提供有效的结果数据'})
         
-        stored_count = 0
-        
+        rows = []
         for result in results:
             try:
-                # 创建CrawlResult对象
-                crawl_result = CrawlResult(
-                    keyword=result.get('keyword', ''),
-                    title=result.get('title', ''),
-                    summary=result.get('summary', ''),
-                    cover=result.get('cover', ''),
-                    original_url=result.get('original_url', ''),
-                    source=result.get('source', ''),
-                    depth_crawled=False,
+                rows.append(CrawlResult.build_row(
+                    result,
                     is_stored=True,
-                    raw_data=json.dumps(result),
                     created_by=current_user.id
-                )
-                
-                # 添加到数据库
-                db.session.add(crawl_result)
-                stored_count += 1
+                ))
             except Exception as e:
                 current_app.logger.error(f"存储单条数据失败: {str(e)}")
                 continue
         
-        # 提交事务
-        db.session.commit()
+        # 批量写入，已采集过的URL标记为已存储并更新最后采集时间
+        stored_count = len(crawl_writer.upsert_rows(rows, update_columns=('last_seen_at', 'is_stored')))
+        clear_count_cache()
         
         return jsonify({
             'success': True,
@@ -2,6 +2,7 @@ from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import db, login_manager
+from app.compression import CompressedText
 from sqlalchemy.ext.declarative import declared_attr
 import json
 
@@ -100,6 +101,138 @@ class BaseModel(db.Model):
     def updater(cls):
         backref_name = f'{cls.__tablename__}_updated_by'
         return db.relationship('User', foreign_keys=[cls.updated_by], backref=db.backref(backref_name, lazy='dynamic'))
+    
+    @classmethod
+    def bulk_insert(cls, rows, chunk_size=500, conflict_columns=None, update_columns=()):
+        """
+        批量写入记录
+        使用executemany方式的INSERT，每chunk_size行一个事务，不创建ORM对象。
+        指定conflict_columns时按INSERT ... ON CONFLICT（MySQL为ON DUPLICATE KEY UPDATE）写入：
+        与已有记录冲突的行只更新update_columns，同一批中冲突键相同的行只写入第一行。
+        数据库不支持RETURNING时写入后按冲突列查回ID，没有冲突列时逐行写入。
+        参数：
+            rows - 字段字典列表，各字典的键应一致
+            chunk_size - 每个事务写入的行数
+            conflict_columns - 唯一索引的列名列表（可选）
+            update_columns - 冲突时更新的列名列表
+        返回：记录ID列表，与rows顺序一致；冲突的行返回已有记录的ID
+        """
+        ids = [None] * len(rows)
+        positions = list(range(len(rows)))
+        duplicates = {}
+        if conflict_columns:
+            first_positions = {}
+            positions = []
+            for index, row in enumerate(rows):
+                key = tuple(row.get(column) for column in conflict_columns)
+                if None not in key and key in first_positions:
+                    duplicates[index] = first_positions[key]
+                    continue
+                first_positions.setdefault(key, index)
+                positions.append(index)
+        
+        dialect = db.session.get_bind().dialect
+        if dialect.insert_returning and (not conflict_columns or dialect.name in ('sqlite', 'postgresql')):
+            statement = cls._bulk_insert_statement(dialect.name, conflict_columns, update_columns)
+            write_chunk = lambda chunk_rows: db.session.scalars(statement, chunk_rows).all()
+        elif conflict_columns:
+            write_chunk = lambda chunk_rows: cls._upsert_chunk(dialect.name, chunk_rows, conflict_columns, update_columns)
+        else:
+            write_chunk = cls._insert_each
+        
+        for start in range(0, len(positions), chunk_size):
+            chunk = positions[start:start + chunk_size]
+            chunk_ids = write_chunk([rows[index] for index in chunk])
+            for index, row_id in zip(chunk, chunk_ids):
+                ids[index] = row_id
+            db.session.commit()
+        
+        for index, first_index in duplicates.items():
+            ids[index] = ids[first_index]
+        return ids
+    
+    @classmethod
+    def _bulk_insert_statement(cls, dialect_name, conflict_columns=None, update_columns=()):
+        """生成批量写入使用的INSERT语句（SQLite、PostgreSQL通过RETURNING按参数顺序返回ID，MySQL不返回ID）"""
+        if not conflict_columns:
+            return db.insert(cls).returning(cls.id, sort_by_parameter_order=True)
+        
+        # 没有要更新的列时用冲突列自身赋值，使冲突的行也被视为写入
+        update_columns = list(update_columns) or list(conflict_columns[:1])
+        if dialect_name == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            statement = insert(cls.__table__)
+            return statement.on_duplicate_key_update({column: statement.inserted[column] for column in update_columns})
+        
+        if dialect_name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(cls.__table__)
+        # DO UPDATE时冲突的行也会通过RETURNING返回ID
+        statement = statement.on_conflict_do_update(
+            index_elements=list(conflict_columns),
+            set_={column: statement.excluded[column] for column in update_columns}
+        )
+        return statement.returning(cls.__table__.c.id, sort_by_parameter_order=True)
+    
+    @classmethod
+    def _insert_each(cls, chunk_rows):
+        """逐行INSERT并读取自增ID（数据库不支持RETURNING时使用）"""
+        return [db.session.execute(cls.__table__.insert(), row).inserted_primary_key[0] for row in chunk_rows]
+    
+    @classmethod
+    def _upsert_chunk(cls, dialect_name, chunk_rows, conflict_columns, update_columns=()):
+        """
+        不支持ON CONFLICT ... RETURNING时写入一块记录
+        MySQL使用INSERT ... ON DUPLICATE KEY UPDATE，其他数据库先按冲突列查询已有记录，更新已有记录、插入其余记录；
+        写入后按冲突列查回ID。冲突列含空值的行不会冲突，逐行插入。
+        参数：
+            dialect_name - 数据库方言名称
+            chunk_rows - 字段字典列表（冲突键互不相同）
+            conflict_columns - 唯一索引的列名列表
+            update_columns - 冲突时更新的列名列表
+        返回：记录ID列表，与chunk_rows顺序一致
+        """
+        table = cls.__table__
+        key_columns = [table.c[column] for column in conflict_columns]
+        
+        def key_of(row):
+            return tuple(row.get(column) for column in conflict_columns)
+        
+        def lookup_ids(keys):
+            if not keys:
+                return {}
+            rows = db.session.execute(
+                db.select(table.c.id, *key_columns).where(db.tuple_(*key_columns).in_(list(keys)))
+            ).all()
+            return {tuple(row[1:]): row[0] for row in rows}
+        
+        keyed_rows = [row for row in chunk_rows if None not in key_of(row)]
+        keys = {key_of(row) for row in keyed_rows}
+        if dialect_name == 'mysql':
+            if keyed_rows:
+                db.session.execute(cls._bulk_insert_statement(dialect_name, conflict_columns, update_columns), keyed_rows)
+        else:
+            existing = lookup_ids(keys)
+            new_rows = [row for row in keyed_rows if key_of(row) not in existing]
+            if update_columns and len(new_rows) < len(keyed_rows):
+                statement = table.update() \
+                    .where(db.and_(*[column == db.bindparam(f'key_{column.name}') for column in key_columns])) \
+                    .values({column: db.bindparam(f'new_{column}') for column in update_columns})
+                db.session.execute(statement, [
+                    dict({f'key_{column}': row[column] for column in conflict_columns},
+                         **{f'new_{column}': row.get(column) for column in update_columns})
+                    for row in keyed_rows if key_of(row) in existing
+                ])
+            if new_rows:
+                db.session.execute(table.insert(), new_rows)
+        
+        ids = lookup_ids(keys)
+        return [
+            ids[key_of(row)] if None not in key_of(row) else cls._insert_each([row])[0]
+            for row in chunk_rows
+        ]
 
 
 # 用户-角色关联表
@@ -195,6 +328,49 @@ class SystemConfig(BaseModel):
     @classmethod
     def get_config(cls):
         """获取所有系统配置"""
+        configs = cls.query.filter_by(is_active=True).all()
+        config_dict = {}
+        for config in configs:
+            config_dict[config.key] = config.get_value()
+        return config_dict
+    
+    @classmethod
+    def get_by_key(cls, key, default=None):
+        """根据键获取配置值"""
+        config = cls.query.filter_by(key=key, is_active=True).first()
+        if config:
+            return config.get_value()
+        return default
+    
+    @classmethod
+    def set_by_key(cls, key, value, type='string', label=None, description=None):
+        """根据键设置配置值"""
+        config = cls.query.filter_by(key=key).first()
+        if config:
+            config.set_value(value)
+            config.type = type
+            if label:
+                config.label = label
+            if description:
+                config.description = description
+        else:
+            config = cls(
+                key=key,
+                type=type,
+                label=label,
+                description=description
+            )
+            config.set_value(value)
+            db.session.add(config)
+        
+        try:
+            db.session.commit()
+            return True
+        except:
+            db.session.rollback()
+            return False
+
+
 
 
 class CrawlerTask(BaseModel):
@@ -284,7 +460,7 @@ class CrawlerResult(BaseModel):
     url = db.Column(db.String(500), nullable=False, comment='采集URL')
     status_code = db.Column(db.Integer, nullable=False, comment='响应状态码')
     response_headers = db.Column(db.Text, nullable=True, comment='响应头(JSON格式)')
-    response_body = db.Column(db.Text, nullable=True, comment='响应内容')
+    response_body = db.Column(CompressedText, nullable=True, comment='响应内容（压缩存储）')
     extracted_data = db.Column(db.Text, nullable=True, comment='提取的数据(JSON格式)')
     execution_time = db.Column(db.Float, nullable=False, default=0.0, comment='执行时间(秒)')
     error_message = db.Column(db.Text, nullable=True, comment='错误信息')
@@ -318,52 +494,24 @@ class CrawlerResult(BaseModel):
     def set_extracted_data(self, data):
         """设置提取的数据"""
         self.extracted_data = json.dumps(data)
-        configs = cls.query.filter_by(is_active=True).all()
-        config_dict = {}
-        for config in configs:
-            config_dict[config.key] = config.get_value()
-        return config_dict
-    
-    @classmethod
-    def get_by_key(cls, key, default=None):
-        """根据键获取配置值"""
-        config = cls.query.filter_by(key=key, is_active=True).first()
-        if config:
-            return config.get_value()
-        return default
-    
-    @classmethod
-    def set_by_key(cls, key, value, type='string', label=None, description=None):
-        """根据键设置配置值"""
-        config = cls.query.filter_by(key=key).first()
-        if config:
-            config.set_value(value)
-            config.type = type
-            if label:
-                config.label = label
-            if description:
-                config.description = description
-        else:
-            config = cls(
-                key=key,
-                type=type,
-                label=label,
-                description=description
-            )
-            config.set_value(value)
-            db.session.add(config)
-        
-        try:
-            db.session.commit()
-            return True
-        except:
-            db.session.rollback()
-            return False
 
 
 class CrawlResult(BaseModel):
     """数据采集结果模型"""
     __tablename__ = 'crawl_result'
+    __table_args__ = (
+        # 列表按创建时间倒序分页，以及按日期统计
+        db.Index('ix_crawl_result_created_at', 'created_at'),
+        # 按来源筛选的列表
+        db.Index('ix_crawl_result_source_created_at', 'source', 'created_at'),
+        # 按关键词分组统计
+        db.Index('ix_crawl_result_keyword', 'keyword'),
+        # 深度采集、存储状态的统计和筛选
+        db.Index('ix_crawl_result_depth_crawled_created_at', 'depth_crawled', 'created_at'),
+        db.Index('ix_crawl_result_is_stored_created_at', 'is_stored', 'created_at'),
+        # 按URL指纹去重
+        db.Index('ix_crawl_result_url_hash', 'url_hash', unique=True),
+    )
     
     keyword = db.Column(db.String(100), nullable=False, comment='采集关键词')
     title = db.Column(db.String(255), nullable=False, comment='标题')
@@ -373,22 +521,70 @@ class CrawlResult(BaseModel):
     source = db.Column(db.String(100), nullable=True, comment='来源网站')
     depth_crawled = db.Column(db.Boolean, default=False, comment='是否已深度采集')
     is_stored = db.Column(db.Boolean, default=False, comment='是否已存储到数据库')
-    raw_data = db.Column(db.Text, nullable=True, comment='原始采集数据')
+    # 原始数据和MinHash签名只在详情和去重时使用，列表查询不加载
+    raw_data = db.deferred(db.Column(CompressedText, nullable=True, comment='原始采集数据（压缩存储）'))
+    url_hash = db.Column(db.String(40), nullable=True, comment='规范化URL的SHA-1指纹，用于去重')
+    last_seen_at = db.Column(db.DateTime, nullable=True, comment='最后一次采集到的时间')
+    minhash = db.deferred(db.Column(db.LargeBinary, nullable=True, comment='标题和摘要的MinHash签名，用于近似重复检测'))
     
     def __repr__(self):
         return f"<CrawlResult {self.title[:20]}>"
+    
+    @staticmethod
+    def build_row(result, **fields):
+        """
+        把爬虫返回的结果转换为bulk_insert使用的字段字典
+        参数：
+            result - 爬虫返回的结果字典
+            fields - 覆盖或补充的字段，如keyword、is_stored、created_by
+        返回：字段字典
+        """
+        from app.crawler.urls import url_fingerprint
+        from app.warehouse.dedup import text_minhash
+        
+        row = {
+            'keyword': result.get('keyword', ''),
+            'title': result.get('title', ''),
+            'summary': result.get('summary', ''),
+            'cover': result.get('cover', ''),
+            'original_url': result.get('original_url', ''),
+            'source': result.get('source', ''),
+            'depth_crawled': False,
+            'is_stored': False,
+            'raw_data': json.dumps(result, ensure_ascii=False),
+            'url_hash': url_fingerprint(result.get('original_url', '')),
+            'last_seen_at': datetime.utcnow()
+        }
+        row.update(fields)
+        row['minhash'] = text_minhash(row['title'], row['summary'])
+        return row
+    
+    @classmethod
+    def upsert_rows(cls, rows, update_columns=('last_seen_at',), chunk_size=500):
+        """
+        按URL指纹写入采集结果，已存在的URL只更新update_columns（默认最后采集时间）
+        参数：
+            rows - build_row生成的字段字典列表
+            update_columns - URL已存在时更新的列
+            chunk_size - 每个事务写入的行数
+        返回：记录ID列表，与rows顺序一致
+        """
+        return cls.bulk_insert(rows, chunk_size=chunk_size, conflict_columns=['url_hash'], update_columns=update_columns)
 
 
 class DepthCrawlResult(BaseModel):
     """深度采集结果模型"""
     __tablename__ = 'depth_crawl_result'
     
-    crawl_result_id = db.Column(db.Integer, db.ForeignKey('crawl_result.id'), nullable=False, comment='关联的采集结果ID')
-    content = db.Column(db.Text, nullable=True, comment='深度采集内容')
+    crawl_result_id = db.Column(db.Integer, db.ForeignKey('crawl_result.id'), nullable=False, index=True, comment='关联的采集结果ID')
+    content = db.Column(CompressedText, nullable=True, comment='深度采集内容（压缩存储）')
     images = db.Column(db.Text, nullable=True, comment='采集到的图片列表（JSON格式）')
     videos = db.Column(db.Text, nullable=True, comment='采集到的视频列表（JSON格式）')
-    links = db.Column(db.Text, nullable=True, comment='页面中的链接列表（JSON格式）')
-    meta_data = db.Column(db.Text, nullable=True, comment='页面元数据（JSON格式）')
+    links = db.Column(CompressedText, nullable=True, comment='页面中的链接列表（JSON格式，压缩存储）')
+    meta_data = db.Column(CompressedText, nullable=True, comment='页面元数据（JSON格式，压缩存储）')
+    content_minhash = db.Column(db.LargeBinary, nullable=True, comment='正文的MinHash签名，用于近似重复检测')
+    content_hash = db.Column(db.String(40), nullable=True, comment='提取内容的指纹，用于重新采集时判断内容是否变化')
+    last_verified_at = db.Column(db.DateTime, nullable=True, comment='最近一次重新采集确认内容的时间')
     
     # 关系
     crawl_result = db.relationship('CrawlResult', backref=db.backref('depth_results', lazy=True))
@@ -396,6 +592,37 @@ class DepthCrawlResult(BaseModel):
     def __repr__(self):
         return f"<DepthCrawlResult {self.crawl_result.title[:20]}>"
     
+    def apply_detailed_content(self, detailed_content):
+        """
+        写入详细采集内容
+        页面未变化（304或内容指纹相同）时只更新确认时间，不重写内容字段；
+        既没有内容指纹也没有内容的结果不是有效的采集结果，不做任何修改。
+        参数：
+            detailed_content - crawl_detailed_content返回的结果，没有content_minhash时在这里计算正文签名
+        返回：内容是否有变化
+        """
+        from app.warehouse.dedup import text_minhash
+        
+        # 采集线程已计算的正文签名（字节串）取出后不再留在结果中，结果还会作为JSON返回
+        has_minhash = 'content_minhash' in detailed_content
+        content_minhash = detailed_content.pop('content_minhash', None)
+        fingerprint = detailed_content.get('fingerprint')
+        if not detailed_content.get('not_modified') and not fingerprint and not detailed_content.get('content'):
+            return False
+        
+        self.last_verified_at = datetime.utcnow()
+        if detailed_content.get('not_modified') or (fingerprint and fingerprint == self.content_hash):
+            return False
+        
+        self.content_hash = fingerprint
+        self.content = detailed_content.get('content', '')
+        self.content_minhash = content_minhash if has_minhash else text_minhash(self.content)
+        self.set_images(detailed_content.get('images', []))
+        self.set_videos(detailed_content.get('videos', []))
+        self.set_links(detailed_content.get('links', []))
+        self.set_meta_data(detailed_content.get('meta_data', {}))
+        return True
+    
     def set_images(self, images):
         """设置图片列表"""
         if isinstance(images, list):
@@ -461,6 +688,56 @@ class DepthCrawlResult(BaseModel):
             return {}
 
 
+class PageLink(db.Model):
+    """深度采集页面中的链接（随深度采集结果写入），按链接URL指纹索引，用于查找链接到某个URL的文章"""
+    __tablename__ = 'page_link'
+    __table_args__ = (
+        # 按链接URL反查文章
+        db.Index('ix_page_link_url_hash', 'url_hash', 'crawl_result_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    crawl_result_id = db.Column(db.Integer, db.ForeignKey('crawl_result.id'), nullable=False, index=True, comment='所在页面的采集结果ID')
+    url_hash = db.Column(db.String(40), nullable=False, comment='链接URL指纹（规范化URL的SHA-1）')
+    url = db.Column(db.Text, nullable=False, comment='链接URL')
+    text = db.Column(db.String(255), nullable=True, comment='链接文字')
+    
+    def __repr__(self):
+        return f"<PageLink {self.crawl_result_id} {self.url[:50]}>"
+
+
+class PageMedia(db.Model):
+    """深度采集页面中的图片和视频（随深度采集结果写入），按媒体URL指纹索引，用于查找使用同一媒体的文章"""
+    __tablename__ = 'page_media'
+    __table_args__ = (
+        # 按媒体URL反查文章
+        db.Index('ix_page_media_url_hash', 'url_hash', 'crawl_result_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    crawl_result_id = db.Column(db.Integer, db.ForeignKey('crawl_result.id'), nullable=False, index=True, comment='所在页面的采集结果ID')
+    media_type = db.Column(db.String(10), nullable=False, comment='媒体类型：image图片，video视频')
+    url_hash = db.Column(db.String(40), nullable=False, comment='媒体URL指纹（规范化URL的SHA-1）')
+    url = db.Column(db.Text, nullable=False, comment='媒体URL')
+    
+    def __repr__(self):
+        return f"<PageMedia {self.media_type} {self.url[:50]}>"
+
+
+class CrawlResultDailyStat(db.Model):
+    """采集结果按日、按关键词汇总的统计（由数据库触发器随crawl_result增量维护）"""
+    __tablename__ = 'crawl_result_daily_stats'
+    
+    stat_date = db.Column(db.Date, primary_key=True, comment='统计日期(UTC)')
+    keyword = db.Column(db.String(100), primary_key=True, comment='采集关键词')
+    total_count = db.Column(db.Integer, nullable=False, default=0, comment='采集数量')
+    depth_crawled_count = db.Column(db.Integer, nullable=False, default=0, comment='已深度采集数量')
+    stored_count = db.Column(db.Integer, nullable=False, default=0, comment='已存储数量')
+    
+    def __repr__(self):
+        return f"<CrawlResultDailyStat {self.stat_date} {self.keyword}>"
+
+
 class SiteRule(BaseModel):
     """站点采集规则模型"""
     __tablename__ = 'site_rules'
@@ -469,7 +746,9 @@ class SiteRule(BaseModel):
     site_url = db.Column(db.String(500), nullable=False, comment='站点URL')
     title_xpath = db.Column(db.String(200), nullable=False, comment='标题XPATH')
     content_xpath = db.Column(db.String(200), nullable=False, comment='详细内容XPATH')
+    rule_type = db.Column(db.String(20), nullable=False, default='xpath', server_default='xpath', comment='规则类型(xpath/css)')
     request_headers = db.Column(db.Text, nullable=True, comment='请求头(JSON格式)')
+    rate_limit = db.Column(db.Float, nullable=True, comment='站点每秒请求数上限（为空时使用爬虫配置）')
     is_active = db.Column(db.Boolean, default=True, comment='是否启用')
     
     def __repr__(self):
@@ -523,3 +802,108 @@ class AIEngine(BaseModel):
             self.api_params = json.dumps(params)
         else:
             self.api_params = params
+
+
+class CrawlJob(BaseModel):
+    """后台采集任务模型"""
+    __tablename__ = 'crawl_jobs'
+    
+    job_type = db.Column(db.String(50), nullable=False, comment='任务类型：crawl, depth_crawl, batch_detailed_crawl')
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True, comment='任务状态：pending(等待中), running(执行中), completed(已完成), failed(失败)')
+    params = db.Column(db.Text, nullable=True, comment='任务参数(JSON格式)')
+    result = db.Column(db.Text, nullable=True, comment='任务结果(JSON格式)')
+    total = db.Column(db.Integer, nullable=False, default=0, comment='待处理数量')
+    processed = db.Column(db.Integer, nullable=False, default=0, comment='已处理数量')
+    message = db.Column(db.String(255), nullable=True, comment='进度信息')
+    error_message = db.Column(db.Text, nullable=True, comment='错误信息')
+    started_at = db.Column(db.DateTime, nullable=True, comment='开始时间')
+    finished_at = db.Column(db.DateTime, nullable=True, comment='结束时间')
+    
+    def __repr__(self):
+        return f"<CrawlJob {self.id} {self.job_type} - {self.status}>"
+    
+    @property
+    def progress(self):
+        """进度百分比"""
+        if self.status == 'completed':
+            return 100
+        if not self.total:
+            return 0
+        return min(int(self.processed * 100 / self.total), 100)
+    
+    @property
+    def is_finished(self):
+        """任务是否已结束"""
+        return self.status in ('completed', 'failed')
+    
+    def get_params(self):
+        """获取任务参数"""
+        if not self.params:
+            return {}
+        try:
+            return json.loads(self.params)
+        except:
+            return {}
+    
+    def set_params(self, params):
+        """设置任务参数"""
+        self.params = json.dumps(params, ensure_ascii=False)
+    
+    def get_result(self):
+        """获取任务结果"""
+        if not self.result:
+            return None
+        try:
+            return json.loads(self.result)
+        except:
+            return None
+    
+    def set_result(self, result):
+        """设置任务结果"""
+        self.result = json.dumps(result, ensure_ascii=False)
+    
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'processed': self.processed,
+            'message': self.message,
+            'error_message': self.error_message,
+            'result': self.get_result() if self.is_finished else None,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'started_at': self.started_at.strftime('%Y-%m-%d %H:%M:%S') if self.started_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
+
+
+class MinHashBand(db.Model):
+    """MinHash签名分段索引（由数据库触发器随crawl_result、depth_crawl_result维护），用于查找近似重复记录"""
+    __tablename__ = 'minhash_band'
+    
+    kind = db.Column(db.String(20), primary_key=True, comment='签名类型：title标题摘要，content正文')
+    band = db.Column(db.Integer, primary_key=True, comment='段序号')
+    band_value = db.Column(db.LargeBinary, primary_key=True, comment='段值')
+    target_id = db.Column(db.Integer, primary_key=True, comment='采集结果ID')
+    
+    def __repr__(self):
+        return f"<MinHashBand {self.kind} {self.band} {self.target_id}>"
+
+
+class HttpCacheEntry(db.Model):
+    """深度采集页面的HTTP缓存：按URL保存响应校验值（ETag/Last-Modified）和压缩后的页面内容"""
+    __tablename__ = 'http_cache'
+    
+    url_hash = db.Column(db.String(40), primary_key=True, comment='URL指纹（规范化URL的SHA-1）')
+    url = db.Column(db.Text, nullable=False, comment='页面URL')
+    etag = db.Column(db.String(255), nullable=True, comment='响应头ETag')
+    last_modified = db.Column(db.String(64), nullable=True, comment='响应头Last-Modified')
+    body = db.Column(db.LargeBinary, nullable=True, comment='zlib压缩的页面内容')
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='最近一次下载页面的时间')
+    validated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='最近一次确认页面未变化的时间')
+    
+    def __repr__(self):
+        return f"<HttpCacheEntry {self.url[:50]}>"
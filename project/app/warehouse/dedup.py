@@ -0,0 +1,318 @@
+"""
+采集结果近似重复检测
+
+同一条新闻在百度、必应、新华网上标题和URL略有不同，按标题精确去重无法识别。
+这里对CrawlResult的标题+摘要和DepthCrawlResult的正文计算MinHash签名，写入时保存在minhash、content_minhash列。
+签名由64个32位最小哈希组成，按每4个一段切分为16段存入minhash_band表（由SQLite触发器维护）。
+两条记录的Jaccard相似度为s时至少有一段完全相同的概率为1-(1-s^4)^16，s=0.7时约为99%，s=0.1时约为0.2%，
+查找近似重复时只需按段在索引上取出候选记录再比较签名，耗时不随数据量线性增长。
+段表或触发器不存在时（如非SQLite数据库）退回逐条比较，只与最近的FALLBACK_SCAN_LIMIT条记录比较，
+更早的近似重复记录不会被发现。
+"""
+import hashlib
+import random
+import struct
+
+import click
+from sqlalchemy import and_, bindparam, or_, text
+
+from app import db
+from app.models import CrawlResult, DepthCrawlResult, MinHashBand
+from app.warehouse.search import tokenize
+
+BAND_TABLE = 'minhash_band'
+
+# 签名长度、分段数和每段的哈希个数
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+# 默认的近似重复阈值（估计的Jaccard相似度）
+MIN_SIMILARITY = 0.7
+
+# 签名类型
+KIND_TITLE = 'title'
+KIND_CONTENT = 'content'
+
+# 最小哈希使用的 (a*x + b) mod p 参数，种子固定，修改后需要重建全部签名
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_SIGNATURE = struct.Struct(f'>{NUM_PERM}I')
+_BAND_BYTES = ROWS_PER_BAND * 4
+_BAND_INDEXES = ', '.join(f'({i})' for i in range(BANDS))
+# 每次查询段表的段数
+_CANDIDATE_BATCH = 300
+# 没有段表时逐条比较的最近记录数
+FALLBACK_SCAN_LIMIT = 5000
+
+
+def _band_rows(kind, column, target, row):
+    """生成把一条记录的各段写入段表的SQL"""
+    return f"""INSERT OR IGNORE INTO {BAND_TABLE}(kind, band, band_value, target_id)
+            SELECT '{kind}', column1, substr({row}.{column}, column1 * {_BAND_BYTES} + 1, {_BAND_BYTES}), {row}.{target}
+            FROM (VALUES {_BAND_INDEXES}) WHERE {row}.{column} IS NOT NULL;"""
+
+
+def _remove_rows(kind, target, row):
+    """生成从段表删除一条记录的SQL"""
+    return f"DELETE FROM {BAND_TABLE} WHERE kind = '{kind}' AND target_id = {row}.{target};"
+
+
+# 维护段表的触发器；正文签名以关联的采集结果ID为目标
+BAND_TRIGGERS = {
+    'crawl_result_minhash_insert': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_minhash_insert
+    AFTER INSERT ON crawl_result WHEN new.minhash IS NOT NULL BEGIN
+        {_band_rows(KIND_TITLE, 'minhash', 'id', 'new')}
+    END""",
+    'crawl_result_minhash_update': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_minhash_update
+    AFTER UPDATE OF minhash ON crawl_result BEGIN
+        {_remove_rows(KIND_TITLE, 'id', 'old')}
+        {_band_rows(KIND_TITLE, 'minhash', 'id', 'new')}
+    END""",
+    'crawl_result_minhash_delete': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_minhash_delete
+    AFTER DELETE ON crawl_result BEGIN
+        {_remove_rows(KIND_TITLE, 'id', 'old')}
+    END""",
+    'depth_crawl_result_minhash_insert': f"""CREATE TRIGGER IF NOT EXISTS depth_crawl_result_minhash_insert
+    AFTER INSERT ON depth_crawl_result WHEN new.content_minhash IS NOT NULL BEGIN
+        {_band_rows(KIND_CONTENT, 'content_minhash', 'crawl_result_id', 'new')}
+    END""",
+    'depth_crawl_result_minhash_update': f"""CREATE TRIGGER IF NOT EXISTS depth_crawl_result_minhash_update
+    AFTER UPDATE OF content_minhash, crawl_result_id ON depth_crawl_result BEGIN
+        {_remove_rows(KIND_CONTENT, 'crawl_result_id', 'old')}
+        {_band_rows(KIND_CONTENT, 'content_minhash', 'crawl_result_id', 'new')}
+    END""",
+    'depth_crawl_result_minhash_delete': f"""CREATE TRIGGER IF NOT EXISTS depth_crawl_result_minhash_delete
+    AFTER DELETE ON depth_crawl_result BEGIN
+        {_remove_rows(KIND_CONTENT, 'crawl_result_id', 'old')}
+    END""",
+}
+
+# 按现有签名重建段表
+REBUILD_BANDS_SQL = [
+    f"DELETE FROM {BAND_TABLE}",
+    f"""INSERT OR IGNORE INTO {BAND_TABLE}(kind, band, band_value, target_id)
+        SELECT '{KIND_TITLE}', b.column1, substr(c.minhash, b.column1 * {_BAND_BYTES} + 1, {_BAND_BYTES}), c.id
+        FROM crawl_result c, (VALUES {_BAND_INDEXES}) b
+        WHERE c.minhash IS NOT NULL""",
+    f"""INSERT OR IGNORE INTO {BAND_TABLE}(kind, band, band_value, target_id)
+        SELECT '{KIND_CONTENT}', b.column1, substr(d.content_minhash, b.column1 * {_BAND_BYTES} + 1, {_BAND_BYTES}), d.crawl_result_id
+        FROM depth_crawl_result d, (VALUES {_BAND_INDEXES}) b
+        WHERE d.content_minhash IS NOT NULL""",
+]
+
+# 各数据库引擎的段表是否由触发器维护
+_bands_available = {}
+
+
+def text_minhash(*texts):
+    """
+    计算文本的MinHash签名
+    特征词与全文索引一致（中文二元分词、英文单词），按集合计算。
+    参数：
+        texts - 一段或多段文本，合并计算
+    返回：签名（bytes），没有特征词时返回None
+    """
+    features = set()
+    for text_value in texts:
+        features.update(tokenize(text_value))
+    if not features:
+        return None
+
+    hashes = [
+        int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big') % _PRIME
+        for feature in features
+    ]
+    return _SIGNATURE.pack(*(
+        min((a * value + b) % _PRIME for value in hashes) & 0xFFFFFFFF
+        for a, b in _PERMUTATIONS
+    ))
+
+
+def similarity(signature_a, signature_b):
+    """
+    按签名估计两段文本的Jaccard相似度
+    返回：0到1之间的小数
+    """
+    values_a = _SIGNATURE.unpack(signature_a)
+    values_b = _SIGNATURE.unpack(signature_b)
+    return sum(1 for a, b in zip(values_a, values_b) if a == b) / NUM_PERM
+
+
+def band_keys(signature):
+    """
+    签名的各段在段表中的键
+    参数：
+        signature - MinHash签名
+    返回：(段序号, 段值) 列表
+    """
+    return [(band, signature[band * _BAND_BYTES:(band + 1) * _BAND_BYTES]) for band in range(BANDS)]
+
+
+def bands_available():
+    """检查段表是否存在并由触发器维护"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    key = str(engine.url)
+    if key not in _bands_available:
+        with engine.connect() as connection:
+            _bands_available[key] = connection.execute(
+                text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN :names")
+                .bindparams(bindparam('names', expanding=True)),
+                {'names': list(BAND_TRIGGERS)}
+            ).scalar() == len(BAND_TRIGGERS)
+    return _bands_available[key]
+
+
+def backfill_minhash(batch_size=500):
+    """
+    为没有签名的采集结果和深度采集结果计算签名
+    参数：
+        batch_size - 每批处理的记录数
+    返回：处理的记录数
+    """
+    processed = 0
+    for model, column, compute in (
+        (CrawlResult, CrawlResult.minhash, lambda row: text_minhash(row.title, row.summary)),
+        (DepthCrawlResult, DepthCrawlResult.content_minhash, lambda row: text_minhash(row.content)),
+    ):
+        last_id = 0
+        while True:
+            rows = model.query.filter(column.is_(None), model.id > last_id).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                break
+            for row in rows:
+                setattr(row, column.key, compute(row))
+            db.session.commit()
+            processed += len(rows)
+            last_id = rows[-1].id
+    return processed
+
+
+def create_minhash_index(rebuild=False):
+    """
+    创建段表和触发器
+    参数：
+        rebuild - 是否为已有数据计算签名并重建段表
+    """
+    MinHashBand.__table__.create(db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        for statement in BAND_TRIGGERS.values():
+            connection.execute(text(statement))
+    if rebuild:
+        backfill_minhash()
+        with db.engine.begin() as connection:
+            for statement in REBUILD_BANDS_SQL:
+                connection.execute(text(statement))
+    _bands_available.clear()
+
+
+def _candidates(kind, signatures):
+    """
+    按段查找候选记录
+    参数：
+        kind - 签名类型
+        signatures - 签名列表
+    返回：候选的采集结果ID集合；段表不可用时返回None，表示需要逐条比较
+    """
+    if not bands_available():
+        return None
+    keys = sorted({key for signature in signatures for key in band_keys(signature)})
+    candidates = set()
+    # 逐段写成OR条件，SQLite对每个条件分别使用主键索引；(band, band_value) IN (...)写法只能用到kind前缀。
+    # 按批查询，避免超出SQLite的参数个数限制
+    for start in range(0, len(keys), _CANDIDATE_BATCH):
+        rows = db.session.query(MinHashBand.target_id).filter(or_(*(
+            and_(MinHashBand.kind == kind, MinHashBand.band == band, MinHashBand.band_value == band_value)
+            for band, band_value in keys[start:start + _CANDIDATE_BATCH]
+        ))).distinct()
+        candidates.update(target_id for (target_id,) in rows)
+    return candidates
+
+
+def _signatures(kind, ids=None):
+    """
+    读取采集结果的签名
+    参数：
+        kind - 签名类型
+        ids - 采集结果ID集合，为None时读取最近的FALLBACK_SCAN_LIMIT条
+    返回：{采集结果ID: 签名}
+    """
+    if kind == KIND_TITLE:
+        query = db.session.query(CrawlResult.id, CrawlResult.minhash).filter(CrawlResult.minhash.isnot(None))
+        id_column = CrawlResult.id
+    else:
+        query = db.session.query(DepthCrawlResult.crawl_result_id, DepthCrawlResult.content_minhash) \
+            .filter(DepthCrawlResult.content_minhash.isnot(None))
+        id_column = DepthCrawlResult.crawl_result_id
+    if ids is None:
+        query = query.order_by(id_column.desc()).limit(FALLBACK_SCAN_LIMIT)
+    elif not ids:
+        return {}
+    else:
+        query = query.filter(id_column.in_(ids))
+    return dict(query.all())
+
+
+def find_near_duplicates(crawl_result_ids, min_similarity=MIN_SIMILARITY):
+    """
+    查找采集结果的近似重复记录
+    标题+摘要签名或正文签名任一达到阈值即视为近似重复。
+    参数：
+        crawl_result_ids - 采集结果ID列表
+        min_similarity - 相似度阈值
+    返回：{采集结果ID: {近似重复的采集结果ID: 相似度}}，不包含自身
+    """
+    crawl_result_ids = list(crawl_result_ids)
+    duplicates = {crawl_result_id: {} for crawl_result_id in crawl_result_ids}
+    for kind in (KIND_TITLE, KIND_CONTENT):
+        own = _signatures(kind, set(crawl_result_ids))
+        if not own:
+            continue
+        candidates = _signatures(kind, _candidates(kind, own.values()))
+        for crawl_result_id, signature in own.items():
+            found = duplicates[crawl_result_id]
+            for candidate_id, candidate_signature in candidates.items():
+                if candidate_id == crawl_result_id:
+                    continue
+                score = similarity(signature, candidate_signature)
+                if score >= min_similarity:
+                    found[candidate_id] = max(score, found.get(candidate_id, score))
+    return duplicates
+
+
+def cluster_ids(crawl_result_ids, min_similarity=MIN_SIMILARITY):
+    """
+    为采集结果分配近似重复簇
+    近似重复关系按传递合并，A与B、B与C近似重复时A、B、C属于同一簇。
+    参数：
+        crawl_result_ids - 采集结果ID列表
+        min_similarity - 相似度阈值
+    返回：{采集结果ID: 簇ID}，簇ID为簇内（含库中其他近似重复记录）最小的ID
+    """
+    parents = {}
+
+    def find(node):
+        parents.setdefault(node, node)
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    for crawl_result_id, found in find_near_duplicates(crawl_result_ids, min_similarity).items():
+        for duplicate_id in [crawl_result_id, *found]:
+            root, other = sorted((find(crawl_result_id), find(duplicate_id)))
+            parents[other] = root
+    return {crawl_result_id: find(crawl_result_id) for crawl_result_id in crawl_result_ids}
+
+
+def init_app(app):
+    """注册段表维护命令"""
+    @app.cli.command('minhash-index')
+    @click.option('--rebuild', is_flag=True, help='为已有数据计算签名并重建段表')
+    def minhash_index_command(rebuild):
+        """创建近似重复检测段表"""
+        create_minhash_index(rebuild=rebuild)
+        click.echo('近似重复段表已重建' if rebuild else '近似重复段表已创建')
@@ -0,0 +1,238 @@
+"""
+链接和媒体索引
+
+深度采集结果的链接、图片、视频以JSON保存在depth_crawl_result中，按URL反查需要逐行解析全部记录。
+写入深度采集结果时同时把它们拆分写入page_link、page_media表，每行保存URL的指纹（规范化URL的SHA-1），
+"哪些文章链接到某个URL"、"哪些文章使用了同一张图片"只需在(url_hash, crawl_result_id)索引上查找。
+同一页面中重复的URL只保留一行。页面内容未变化时不重写；删除采集结果前需调用delete_page_links。
+已有数据可通过 flask link-index 命令重建。
+"""
+import json
+
+import click
+from sqlalchemy import func
+
+from app import db
+from app.crawler.urls import url_fingerprint
+from app.models import CrawlResult, DepthCrawlResult, PageLink, PageMedia
+
+MEDIA_IMAGE = 'image'
+MEDIA_VIDEO = 'video'
+
+# 链接文字的最大长度（与page_link.text列一致）
+MAX_TEXT_LENGTH = 255
+
+# 每条INSERT语句写入的行数
+INSERT_CHUNK_SIZE = 1000
+
+
+def page_rows(crawl_result_id, detailed_content):
+    """
+    从详细内容中提取链接和媒体行
+    参数：
+        crawl_result_id - 采集结果ID
+        detailed_content - crawl_detailed_content返回的结果（或同样格式的字典）
+    返回：(链接行列表, 媒体行列表)
+    """
+    links = {}
+    for link in detailed_content.get('links') or []:
+        if isinstance(link, dict):
+            url, link_text = link.get('href'), link.get('text')
+        else:
+            url, link_text = link, None
+        url_hash = url_fingerprint(url)
+        if url_hash and url_hash not in links:
+            links[url_hash] = {
+                'crawl_result_id': crawl_result_id,
+                'url_hash': url_hash,
+                'url': url,
+                'text': (link_text or '')[:MAX_TEXT_LENGTH] or None
+            }
+
+    media = {}
+    for media_type, key in ((MEDIA_IMAGE, 'images'), (MEDIA_VIDEO, 'videos')):
+        for url in detailed_content.get(key) or []:
+            url_hash = url_fingerprint(url)
+            if url_hash and (media_type, url_hash) not in media:
+                media[(media_type, url_hash)] = {
+                    'crawl_result_id': crawl_result_id,
+                    'media_type': media_type,
+                    'url_hash': url_hash,
+                    'url': url
+                }
+    return list(links.values()), list(media.values())
+
+
+def _insert(model, rows):
+    """按块批量写入，不提交事务"""
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        db.session.execute(db.insert(model), rows[start:start + INSERT_CHUNK_SIZE])
+
+
+def delete_page_links(crawl_result_ids):
+    """
+    删除采集结果的链接和媒体行（不提交事务）
+    参数：
+        crawl_result_ids - 采集结果ID列表
+    """
+    crawl_result_ids = list(crawl_result_ids)
+    if not crawl_result_ids:
+        return
+    for model in (PageLink, PageMedia):
+        db.session.execute(db.delete(model).where(model.crawl_result_id.in_(crawl_result_ids)))
+
+
+def index_pages(pages):
+    """
+    写入页面的链接和媒体行，替换这些页面原有的行（不提交事务，与深度采集结果一起提交）
+    参数：
+        pages - [(采集结果ID, 详细内容字典)]
+    """
+    pages = list(pages)
+    if not pages:
+        return
+    delete_page_links(crawl_result_id for crawl_result_id, _ in pages)
+    link_rows, media_rows = [], []
+    for crawl_result_id, detailed_content in pages:
+        links, media = page_rows(crawl_result_id, detailed_content)
+        link_rows.extend(links)
+        media_rows.extend(media)
+    _insert(PageLink, link_rows)
+    _insert(PageMedia, media_rows)
+
+
+def _article(crawl_result):
+    """文章的基本信息"""
+    return {
+        'id': crawl_result.id,
+        'title': crawl_result.title,
+        'original_url': crawl_result.original_url,
+        'source': crawl_result.source,
+        'created_at': crawl_result.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def inbound_links(url, limit=100):
+    """
+    查找链接到指定URL的文章
+    参数：
+        url - 被链接的URL（按规范化URL匹配）
+        limit - 最多返回的文章数
+    返回：[{'id', 'title', 'original_url', 'source', 'created_at', 'link_text'}]，按文章ID倒序
+    """
+    url_hash = url_fingerprint(url)
+    if not url_hash:
+        return []
+    rows = db.session.query(CrawlResult, PageLink.text) \
+        .join(PageLink, PageLink.crawl_result_id == CrawlResult.id) \
+        .filter(PageLink.url_hash == url_hash) \
+        .order_by(PageLink.crawl_result_id.desc()).limit(limit).all()
+    return [dict(_article(crawl_result), link_text=link_text) for crawl_result, link_text in rows]
+
+
+def media_usage(url, limit=100):
+    """
+    查找使用了指定图片或视频的文章
+    参数：
+        url - 媒体URL（按规范化URL匹配）
+        limit - 最多返回的文章数
+    返回：[{'id', 'title', 'original_url', 'source', 'created_at'}]，按文章ID倒序
+    """
+    url_hash = url_fingerprint(url)
+    if not url_hash:
+        return []
+    crawl_result_ids = db.session.query(PageMedia.crawl_result_id).filter(PageMedia.url_hash == url_hash) \
+        .distinct().order_by(PageMedia.crawl_result_id.desc()).limit(limit)
+    results = CrawlResult.query.filter(CrawlResult.id.in_(crawl_result_ids.scalar_subquery())) \
+        .order_by(CrawlResult.id.desc()).all()
+    return [_article(crawl_result) for crawl_result in results]
+
+
+def shared_media(crawl_result_id, limit=100):
+    """
+    查找与指定文章使用了相同图片或视频的其他文章
+    参数：
+        crawl_result_id - 采集结果ID
+        limit - 最多返回的文章数
+    返回：[{'id', 'title', 'original_url', 'source', 'created_at', 'shared_count', 'shared_media'}]，
+          按共用的媒体数量降序
+    """
+    own = db.aliased(PageMedia)
+    other = db.aliased(PageMedia)
+    shared = db.session.query(other.crawl_result_id, other.url) \
+        .join(own, own.url_hash == other.url_hash) \
+        .filter(own.crawl_result_id == crawl_result_id, other.crawl_result_id != crawl_result_id)
+
+    # 在数据库中按共用数量排序，只取前limit篇文章的媒体URL
+    shared_count = func.count(func.distinct(other.url_hash))
+    ranked = shared.with_entities(other.crawl_result_id, shared_count) \
+        .group_by(other.crawl_result_id).order_by(shared_count.desc(), other.crawl_result_id.desc()).limit(limit).all()
+    if not ranked:
+        return []
+    ranked_ids = [other_id for other_id, _ in ranked]
+    urls = {}
+    for other_id, url in shared.filter(other.crawl_result_id.in_(ranked_ids)).all():
+        if url not in urls.setdefault(other_id, []):
+            urls[other_id].append(url)
+    results = {crawl_result.id: crawl_result for crawl_result in CrawlResult.query.filter(CrawlResult.id.in_(ranked_ids)).all()}
+    return [
+        dict(_article(results[other_id]), shared_count=count, shared_media=urls.get(other_id, []))
+        for other_id, count in ranked if other_id in results
+    ]
+
+
+def rebuild_page_links(batch_size=500):
+    """
+    按深度采集结果中的JSON重建链接和媒体表
+    参数：
+        batch_size - 每批处理的记录数
+    返回：处理的深度采集结果数
+    """
+    db.session.execute(db.delete(PageLink))
+    db.session.execute(db.delete(PageMedia))
+    db.session.commit()
+
+    processed = 0
+    last_id = 0
+    while True:
+        rows = DepthCrawlResult.query \
+            .with_entities(DepthCrawlResult.id, DepthCrawlResult.crawl_result_id,
+                           DepthCrawlResult.links, DepthCrawlResult.images, DepthCrawlResult.videos) \
+            .filter(DepthCrawlResult.id > last_id).order_by(DepthCrawlResult.id).limit(batch_size).all()
+        if not rows:
+            break
+        link_rows, media_rows = [], []
+        for row in rows:
+            detailed_content = {}
+            for key, value in (('links', row.links), ('images', row.images), ('videos', row.videos)):
+                try:
+                    detailed_content[key] = json.loads(value) if value else []
+                except ValueError:
+                    detailed_content[key] = []
+            links, media = page_rows(row.crawl_result_id, detailed_content)
+            link_rows.extend(links)
+            media_rows.extend(media)
+        _insert(PageLink, link_rows)
+        _insert(PageMedia, media_rows)
+        db.session.commit()
+        processed += len(rows)
+        last_id = rows[-1].id
+    return processed
+
+
+def link_counts():
+    """链接和媒体表的行数"""
+    return {
+        'links': db.session.query(func.count(PageLink.id)).scalar(),
+        'media': db.session.query(func.count(PageMedia.id)).scalar()
+    }
+
+
+def init_app(app):
+    """注册链接索引维护命令"""
+    @app.cli.command('link-index')
+    def link_index_command():
+        """按深度采集结果重建链接和媒体表"""
+        processed = rebuild_page_links()
+        counts = link_counts()
+        click.echo(f"已处理{processed}条深度采集结果，链接{counts['links']}条，媒体{counts['media']}条")
@@ -0,0 +1,134 @@
+"""
+列表分页
+
+按(created_at, id)倒序的游标分页：游标记录上一页最后一行的排序键，下一页直接从索引位置继续读取，
+翻页耗时与页码无关。页码分页保留给layui表格使用，先只按索引取出本页的ID再加载整行，避免深分页时读取被跳过的行。
+总数按查询语句缓存一段时间，不再在每次翻页时重新统计。
+"""
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import literal, tuple_
+
+# 总数缓存的默认有效期（秒），可通过WAREHOUSE_COUNT_CACHE_TTL配置
+COUNT_CACHE_TTL = 30
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def encode_cursor(created_at, row_id):
+    """
+    生成游标
+    参数：
+        created_at - 最后一行的创建时间
+        row_id - 最后一行的ID
+    返回：不透明的游标字符串
+    """
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析游标
+    参数：
+        cursor - encode_cursor生成的游标
+    返回：(created_at, id)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('无效的分页游标')
+
+
+def _ordered(query, model):
+    """按(created_at, id)倒序排列"""
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+
+def keyset_paginate(query, model, limit, cursor=None):
+    """
+    游标分页
+    参数：
+        query - 查询对象
+        model - 模型类，需要有created_at和id列
+        limit - 每页数量
+        cursor - 上一页返回的游标，为空时从第一页开始
+    返回：(本页数据列表, 下一页游标)，没有下一页时游标为None
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    rows = _ordered(query, model).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def offset_paginate(query, model, page, limit):
+    """
+    页码分页
+    先在索引上取出本页的ID，再按ID加载数据行（沿用query的加载选项，如只读取部分列）
+    参数：
+        query - 查询对象
+        model - 模型类，需要有created_at和id列
+        page - 页码，从1开始
+        limit - 每页数量
+    返回：(本页数据列表, 下一页游标)，下一页游标可用于切换到游标分页
+    """
+    offset = (max(page, 1) - 1) * limit
+    ids = [row_id for (row_id,) in _ordered(query.with_entities(model.id), model).offset(offset).limit(limit + 1)]
+
+    next_cursor = None
+    rows = []
+    if ids:
+        rows_by_id = {row.id: row for row in query.filter(model.id.in_(ids[:limit])).all()}
+        rows = [rows_by_id[row_id] for row_id in ids[:limit] if row_id in rows_by_id]
+        if len(ids) > limit and rows:
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def cached_count(query, ttl=None):
+    """
+    获取查询的总数，相同查询在有效期内复用上次的结果
+    参数：
+        query - 查询对象
+        ttl - 缓存有效期（秒），默认读取WAREHOUSE_COUNT_CACHE_TTL配置
+    返回：总数
+    """
+    if ttl is None:
+        ttl = current_app.config.get('WAREHOUSE_COUNT_CACHE_TTL', COUNT_CACHE_TTL)
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    now = time.monotonic()
+
+    with _count_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    # 统计时只选出常量，子查询不读取任何列
+    total = query.order_by(None).with_entities(literal(1)).count()
+    with _count_lock:
+        # 顺便清理过期的缓存，避免不同筛选条件的结果无限累积
+        for expired_key in [k for k, (expires, _) in _count_cache.items() if expires <= now]:
+            del _count_cache[expired_key]
+        _count_cache[key] = (now + ttl, total)
+    return total
+
+
+def clear_count_cache():
+    """清空总数缓存，数据被批量修改后调用"""
+    with _count_lock:
+        _count_cache.clear()
@@ -0,0 +1,65 @@
+"""
+列表字段投影
+
+列表接口通过fields参数（逗号分隔的字段名）指定返回的字段，查询时只读取这些列（load_only），
+不需要的摘要、原始数据等大字段不会从数据库读出，也不参与JSON编码。未传fields时返回接口的默认字段。
+id总是返回；分页需要的created_at总是读取，但只在请求了该字段时返回。
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import load_only
+
+# 列表始终读取的列（主键和游标分页的排序键）
+REQUIRED_COLUMNS = ('id', 'created_at')
+
+
+def parse_fields(value, allowed):
+    """
+    解析fields参数
+    参数：
+        value - fields参数值，为空时返回全部允许的字段
+        allowed - 允许的字段名（按默认返回顺序）
+    返回：字段名列表，第一个总是id
+    异常：包含不支持的字段时抛出ValueError
+    """
+    if not value:
+        return list(allowed)
+    fields = ['id']
+    for name in value.split(','):
+        name = name.strip()
+        if not name or name in fields:
+            continue
+        if name not in allowed:
+            raise ValueError(f'不支持的字段: {name}')
+        fields.append(name)
+    return fields
+
+
+def project(query, model, fields):
+    """
+    只读取指定字段对应的列
+    参数：
+        query - 查询对象
+        model - 模型类
+        fields - parse_fields返回的字段名列表
+    返回：查询对象
+    """
+    names = dict.fromkeys(REQUIRED_COLUMNS + tuple(fields))
+    return query.options(load_only(*[getattr(model, name) for name in names]))
+
+
+def serialize(obj, fields):
+    """
+    按字段列表生成字典，时间格式化为字符串
+    参数：
+        obj - 模型对象
+        fields - 字段名列表
+    返回：字典
+    """
+    item = {}
+    for name in fields:
+        value = getattr(obj, name)
+        if isinstance(value, datetime):
+            value = value.strftime('%Y-%m-%d %H:%M:%S')
+        item[name] = value
+    return item
@@ -2,12 +2,23 @@ from flask import Blueprint, render_template, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import CrawlResult, DepthCrawlResult
+from app.crawler.jobs import job_queue, wants_async
+from app.crawler.rules import get_compiled_rule
+from app.warehouse.search import apply_search, highlight
+from app.warehouse.pagination import cached_count, clear_count_cache, keyset_paginate, offset_paginate
+from app.warehouse.projection import parse_fields, project, serialize
+from app.warehouse.dedup import MIN_SIMILARITY, cluster_ids, find_near_duplicates, text_minhash
+from app.warehouse.links import delete_page_links, index_pages, inbound_links, media_usage, shared_media
 import json
 import time
 
 # 创建蓝图
 warehouse_bp = Blueprint('warehouse', __name__)
 
+# 数据列表可返回的字段
+LIST_FIELDS = ('id', 'keyword', 'title', 'summary', 'cover', 'original_url', 'source',
+               'depth_crawled', 'is_stored', 'created_at', 'updated_at')
+
 @warehouse_bp.route('/warehouse', methods=['GET'])
 def warehouse_page():
     """数据仓库管理页面"""
@@ -20,62 +31,87 @@ def get_warehouse_data():
     参数：
         page - 页码，默认1
         limit - 每页数量，默认10
-        keyword - 搜索关键词
+        cursor - 分页游标（可选），传入时按游标分页，首页传空值，之后传上一页返回的next_cursor
+        keyword - 搜索关键词，使用全文索引时按相关度排序并返回高亮内容
         source - 数据源筛选
+        collapse - 是否折叠近似重复数据（可选，1为折叠），折叠后本页每个簇只保留第一条，并返回cluster_id和duplicate_count
+        min_similarity - 近似重复的相似度阈值（可选），0到1之间，默认0.7
+        fields - 返回的字段（可选），逗号分隔，如id,title,source，只查询这些列；默认返回全部列表字段
     返回：JSON格式的数据列表
     """
     try:
         # 获取分页参数
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
+        cursor = request.args.get('cursor')
         keyword = request.args.get('keyword', '')
         source = request.args.get('source', '')
-        
-        # 计算偏移量
-        offset = (page - 1) * limit
+        collapse = request.args.get('collapse', 0, type=int)
+        min_similarity = min(max(request.args.get('min_similarity', MIN_SIMILARITY, type=float), 0.0), 1.0)
+        try:
+            fields = parse_fields(request.args.get('fields'), LIST_FIELDS)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
         
         # 构建查询
         query = CrawlResult.query
         
         # 关键词搜索
-        if keyword:
-            query = query.filter(
-                CrawlResult.keyword.like(f'%{keyword}%') | 
-                CrawlResult.title.like(f'%{keyword}%') |
-                CrawlResult.summary.like(f'%{keyword}%')
-            )
+        query, score = apply_search(query, keyword)
         
         # 数据源筛选
         if source:
             query = query.filter(CrawlResult.source == source)
         
-        # 执行查询
-        total_count = query.count()
-        results = query.order_by(CrawlResult.created_at.desc()).offset(offset).limit(limit).all()
+        # 执行查询，只读取需要返回的列
+        total_count = cached_count(query)
+        query = project(query, CrawlResult, fields)
+        next_cursor = None
+        if score is not None:
+            # 全文检索按相关度排序，只支持页码分页
+            rows = query.add_columns(score).order_by(score, CrawlResult.created_at.desc()) \
+                .offset((page - 1) * limit).limit(limit).all()
+        elif cursor is not None:
+            try:
+                results, next_cursor = keyset_paginate(query, CrawlResult, limit, cursor)
+            except ValueError as e:
+                return jsonify({'success': False, 'message': str(e)})
+            rows = [(result, None) for result in results]
+        else:
+            results, next_cursor = offset_paginate(query, CrawlResult, page, limit)
+            rows = [(result, None) for result in results]
+        
+        # 近似重复分簇
+        clusters = cluster_ids([result.id for result, _ in rows], min_similarity) if collapse else {}
         
         # 格式化结果
         data = []
-        for result in results:
-            data.append({
-                'id': result.id,
-                'keyword': result.keyword,
-                'title': result.title,
-                'summary': result.summary,
-                'cover': result.cover,
-                'original_url': result.original_url,
-                'source': result.source,
-                'depth_crawled': result.depth_crawled,
-                'is_stored': result.is_stored,
-                'created_at': result.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'updated_at': result.updated_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        cluster_items = {}
+        for result, result_score in rows:
+            item = serialize(result, fields)
+            if keyword:
+                item['score'] = -result_score if result_score is not None else None
+                item['highlight'] = {
+                    name: highlight(getattr(result, name), keyword)
+                    for name in ('title', 'summary') if name in fields
+                }
+            if collapse:
+                cluster_id = clusters.get(result.id, result.id)
+                if cluster_id in cluster_items:
+                    cluster_items[cluster_id]['duplicate_count'] += 1
+                    continue
+                item['cluster_id'] = cluster_id
+                item['duplicate_count'] = 0
+                cluster_items[cluster_id] = item
+            data.append(item)
         
         return jsonify({
             'success': True,
             'total': total_count,
             'data': data,
             'page': page,
-            'limit': limit
+            'limit': limit,
+            'next_cursor': next_cursor
         })
         
     except Exception as e:
@@ -92,7 +128,7 @@ def get_warehouse_data_detail(data_id):
     """
     try:
         # 查询数据
-        result = CrawlResult.query.get(data_id)
+        result = CrawlResult.query.options(db.undefer(CrawlResult.raw_data)).get(data_id)
         if not result:
             return jsonify({'success': False, 'message': '数据不存在'})
         
@@ -131,6 +167,105 @@ def get_warehouse_data_detail(data_id):
         current_app.logger.error(f"获取数据详情失败: {str(e)}")
         return jsonify({'success': False, 'message': f'获取数据详情失败: {str(e)}'})
 
+@warehouse_bp.route('/api/warehouse/data/<int:data_id>/duplicates', methods=['GET'])
+def get_warehouse_data_duplicates(data_id):
+    """
+    获取与指定数据近似重复的数据
+    参数：
+        data_id - 数据ID
+        min_similarity - 相似度阈值（可选），0到1之间，默认0.7
+    返回：JSON格式的近似重复数据列表，按相似度降序
+    """
+    try:
+        result = CrawlResult.query.get(data_id)
+        if not result:
+            return jsonify({'success': False, 'message': '数据不存在'})
+        
+        min_similarity = min(max(request.args.get('min_similarity', MIN_SIMILARITY, type=float), 0.0), 1.0)
+        found = find_near_duplicates([data_id], min_similarity)[data_id]
+        duplicates = CrawlResult.query.filter(CrawlResult.id.in_(found)).all() if found else []
+        duplicates.sort(key=lambda duplicate: (-found[duplicate.id], duplicate.id))
+        
+        return jsonify({
+            'success': True,
+            'data': [{
+                'id': duplicate.id,
+                'keyword': duplicate.keyword,
+                'title': duplicate.title,
+                'original_url': duplicate.original_url,
+                'source': duplicate.source,
+                'depth_crawled': duplicate.depth_crawled,
+                'similarity': found[duplicate.id],
+                'created_at': duplicate.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            } for duplicate in duplicates]
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"获取近似重复数据失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'获取近似重复数据失败: {str(e)}'})
+
+@warehouse_bp.route('/api/warehouse/links/inbound', methods=['GET'])
+def get_inbound_links():
+    """
+    获取链接到指定URL的文章
+    参数：
+        url - 被链接的URL
+        data_id - 数据ID（可选），未传url时查找链接到该数据原始URL的文章
+        limit - 最多返回的文章数，默认100
+    返回：JSON格式的文章列表，包含链接文字
+    """
+    try:
+        url = request.args.get('url', '').strip()
+        data_id = request.args.get('data_id', type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        if not url and data_id:
+            result = CrawlResult.query.get(data_id)
+            if not result:
+                return jsonify({'success': False, 'message': '数据不存在'})
+            url = result.original_url
+        if not url:
+            return jsonify({'success': False, 'message': '请指定URL'})
+        
+        return jsonify({
+            'success': True,
+            'url': url,
+            'data': inbound_links(url, limit)
+        })
+    
+    except Exception as e:
+        current_app.logger.error(f"获取链接来源失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'获取链接来源失败: {str(e)}'})
+
+@warehouse_bp.route('/api/warehouse/media/shared', methods=['GET'])
+def get_shared_media():
+    """
+    获取共用图片或视频的文章
+    参数：
+        url - 图片或视频URL，返回使用该媒体的文章
+        data_id - 数据ID（可选），未传url时返回与该数据共用媒体的其他文章及共用的媒体URL
+        limit - 最多返回的文章数，默认100
+    返回：JSON格式的文章列表
+    """
+    try:
+        url = request.args.get('url', '').strip()
+        data_id = request.args.get('data_id', type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+        if url:
+            data = media_usage(url, limit)
+        elif data_id:
+            data = shared_media(data_id, limit)
+        else:
+            return jsonify({'success': False, 'message': '请指定媒体URL或数据ID'})
+        
+        return jsonify({
+            'success': True,
+            'data': data
+        })
+    
+    except Exception as e:
+        current_app.logger.error(f"获取共用媒体失败: {str(e)}")
+        return jsonify({'success': False, 'message': f'获取共用媒体失败: {str(e)}'})
+
 @warehouse_bp.route('/api/warehouse/data/<int:data_id>', methods=['PUT'])
 def update_warehouse_data(data_id):
     """
@@ -157,6 +292,7 @@ def update_warehouse_data(data_id):
         result.summary = summary
         result.source = source
         result.cover = cover
+        result.minhash = text_minhash(title, summary)
         
         # 提交更新
         db.session.commit()
@@ -180,8 +316,9 @@ def delete_warehouse_data(data_id):
     返回：JSON格式的删除结果
     """
     try:
-        # 先删除深度采集数据
+        # 先删除深度采集数据和页面链接
         DepthCrawlResult.query.filter_by(crawl_result_id=data_id).delete()
+        delete_page_links([data_id])
         
         # 再删除采集结果数据
         result = CrawlResult.query.get(data_id)
@@ -190,6 +327,7 @@ def delete_warehouse_data(data_id):
         
         db.session.delete(result)
         db.session.commit()
+        clear_count_cache()
         
         return jsonify({
             'success': True,
@@ -223,13 +361,15 @@ def batch_delete_warehouse_data():
         if not isinstance(result_ids, list) or len(result_ids) == 0:
             return jsonify({'success': False, 'message': '请选择要删除的数据'})
         
-        # 先删除深度采集数据
+        # 先删除深度采集数据和页面链接
         DepthCrawlResult.query.filter(DepthCrawlResult.crawl_result_id.in_(result_ids)).delete()
+        delete_page_links(result_ids)
         
         # 再删除采集结果数据
         CrawlResult.query.filter(CrawlResult.id.in_(result_ids)).delete()
         
         db.session.commit()
+        clear_count_cache()
         
         return jsonify({
             'success': True,
@@ -253,6 +393,10 @@ def detailed_crawl_data(data_id):
     try:
         from app.models import SiteRule
         from app.crawler.crawler import crawl_detailed_content
+        from app.crawler.http_cache import load_validators, save_cache_info
+        from app.crawler.ratelimit import configure_site_rate_limits
+        
+        configure_site_rate_limits()
         
         # 获取要采集的结果
         crawl_result = CrawlResult.query.get(data_id)
@@ -265,18 +409,36 @@ def detailed_crawl_data(data_id):
             SiteRule.site_name == crawl_result.source
         ).first()
         
+        # 已有详细内容时按缓存校验值发送条件请求，页面未变化则沿用已有结果
+        depth_result = DepthCrawlResult.query.filter_by(crawl_result_id=data_id).first()
+        has_content = depth_result is not None and bool(depth_result.content)
+        url = crawl_result.original_url
+        validators = load_validators([url], with_body=() if has_content else [url]).get(url)
+        
         # 执行详细内容采集
         if site_rule:
             # 使用匹配的规则进行采集
             detailed_content = crawl_detailed_content(
-                crawl_result.original_url,
-                title_xpath=site_rule.title_xpath,
-                content_xpath=site_rule.content_xpath,
-                headers=site_rule.get_request_headers()
+                url,
+                headers=site_rule.get_request_headers(),
+                rule=_load_compiled_rule(site_rule),
+                validators=validators
             )
         else:
             # 没有匹配的规则，使用默认采集
-            detailed_content = crawl_detailed_content(crawl_result.original_url)
+            detailed_content = crawl_detailed_content(url, validators=validators)
+        
+        if detailed_content.get('not_modified'):
+            save_cache_info([(url, detailed_content['http_cache'])])
+            depth_result.apply_detailed_content(detailed_content)
+            crawl_result.depth_crawled = True
+            crawl_result.is_stored = True
+            db.session.commit()
+            return jsonify({
+                'success': True,
+                'message': '页面未变化，沿用已有的详细内容',
+                'data': _depth_result_content(crawl_result, depth_result)
+            })
         
         # 检查是否需要更新规则
         if site_rule and (not detailed_content.get('title') or not detailed_content.get('content')):
@@ -289,32 +451,19 @@ def detailed_crawl_data(data_id):
             if updated:
                 # 使用更新后的规则重新采集
                 detailed_content = crawl_detailed_content(
-                    crawl_result.original_url,
-                    title_xpath=site_rule.title_xpath,
-                    content_xpath=site_rule.content_xpath,
-                    headers=site_rule.get_request_headers()
+                    url,
+                    headers=site_rule.get_request_headers(),
+                    rule=_load_compiled_rule(site_rule)
                 )
         
         # 保存详细采集结果
-        depth_result = DepthCrawlResult.query.filter_by(crawl_result_id=data_id).first()
-        if depth_result:
-            # 更新已有结果
-            depth_result.content = detailed_content.get('content', '')
-            depth_result.set_images(detailed_content.get('images', []))
-            depth_result.set_videos(detailed_content.get('videos', []))
-            depth_result.set_links(detailed_content.get('links', []))
-            depth_result.set_meta_data(detailed_content.get('meta_data', {}))
-        else:
+        save_cache_info([(url, detailed_content.pop('http_cache', None))])
+        if not depth_result:
             # 创建新结果
-            depth_result = DepthCrawlResult(
-                crawl_result_id=data_id,
-                content=detailed_content.get('content', ''),
-                meta_data=json.dumps(detailed_content.get('meta_data', {}), ensure_ascii=False)
-            )
-            depth_result.set_images(detailed_content.get('images', []))
-            depth_result.set_videos(detailed_content.get('videos', []))
-            depth_result.set_links(detailed_content.get('links', []))
+            depth_result = DepthCrawlResult(crawl_result_id=data_id)
             db.session.add(depth_result)
+        if depth_result.apply_detailed_content(detailed_content):
+            index_pages([(data_id, detailed_content)])
         
         # 更新采集状态
         crawl_result.depth_crawled = True
@@ -337,6 +486,38 @@ def detailed_crawl_data(data_id):
 
 
 
+def _load_compiled_rule(site_rule):
+    """
+    获取站点规则的编译结果
+    参数：
+        site_rule - SiteRule对象
+    返回：CompiledRule对象；规则表达式无效时返回None，按默认方式解析
+    """
+    try:
+        return get_compiled_rule(site_rule)
+    except ValueError as e:
+        current_app.logger.error(f"编译采集规则失败 {site_rule.site_name}: {str(e)}")
+        return None
+
+
+def _depth_result_content(crawl_result, depth_result):
+    """
+    按crawl_detailed_content的返回格式读取已有的深度采集结果
+    参数：
+        crawl_result - CrawlResult对象
+        depth_result - DepthCrawlResult对象
+    返回：详细内容字典
+    """
+    return {
+        'title': crawl_result.title,
+        'content': depth_result.content,
+        'images': depth_result.get_images(),
+        'videos': depth_result.get_videos(),
+        'links': depth_result.get_links(),
+        'meta_data': depth_result.get_meta_data()
+    }
+
+
 def update_crawl_rules(url, site_rule, expected_title):
     """
     自动更新采集规则
@@ -347,8 +528,9 @@ def update_crawl_rules(url, site_rule, expected_title):
     返回：是否更新成功
     """
     try:
-        import requests
-        from bs4 import BeautifulSoup
+        from app.crawler.fetcher import fetch
+        from app.crawler.parser import parse_html
+        from app.crawler.rules import RULE_TYPE_CSS
         
         # 发送请求
         headers = site_rule.get_request_headers()
@@ -357,29 +539,40 @@ def update_crawl_rules(url, site_rule, expected_title):
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
         
-        response = requests.get(url, headers=headers, timeout=15)
+        response = fetch(url, headers=headers, timeout=15)
         response.raise_for_status()
         response.encoding = 'utf-8'
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = parse_html(response.text, name='rule_update')
         updated = False
         
-        # 尝试更新标题XPATH
-        if not site_rule.title_xpath or not soup.select_one(site_rule.title_xpath):
+        # 用现有规则检查页面，表达式无效时视为不匹配
+        try:
+            title_matched, content_matched = get_compiled_rule(site_rule).matches(response.text, soup)
+        except ValueError:
+            title_matched, content_matched = False, False
+        
+        # 按规则类型生成新的表达式
+        if site_rule.rule_type == RULE_TYPE_CSS:
+            build_expression = get_element_selector
+        else:
+            build_expression = get_element_xpath
+        
+        # 尝试更新标题规则
+        if not title_matched:
             # 查找可能的标题元素
             title_elements = soup.find_all(['h1', 'h2', 'h3'])
             for title_element in title_elements:
                 title_text = title_element.get_text(strip=True)
                 if expected_title in title_text or title_text in expected_title:
-                    # 获取XPATH
-                    new_title_xpath = get_element_xpath(title_element)
+                    new_title_xpath = build_expression(title_element)
                     if new_title_xpath:
                         site_rule.title_xpath = new_title_xpath
                         updated = True
                         break
         
-        # 尝试更新内容XPATH
-        if not site_rule.content_xpath or not soup.select_one(site_rule.content_xpath):
+        # 尝试更新内容规则
+        if not content_matched:
             # 查找可能的内容元素
             content_elements = soup.find_all(['article', 'div', 'section'])
             for content_element in content_elements:
@@ -388,8 +581,7 @@ def update_crawl_rules(url, site_rule, expected_title):
                 
                 content_text = content_element.get_text(separator='\n', strip=True)
                 if len(content_text) > 500:
-                    # 获取XPATH
-                    new_content_xpath = get_element_xpath(content_element)
+                    new_content_xpath = build_expression(content_element)
                     if new_content_xpath:
                         site_rule.content_xpath = new_content_xpath
                         updated = True
@@ -405,6 +597,25 @@ def update_crawl_rules(url, site_rule, expected_title):
         return False
 
 
+def _element_path(element):
+    """
+    获取元素从根节点开始的路径
+    参数：
+        element - BeautifulSoup元素对象
+    返回：[(标签名, 同名兄弟中的序号, 同名兄弟数量)] 列表
+    """
+    components = []
+    child = element
+    while child.parent:
+        siblings = child.parent.find_all(child.name, recursive=False)
+        # 按对象身份定位，内容相同的兄弟元素会被Tag.__eq__视为相等
+        position = next(index for index, sibling in enumerate(siblings) if sibling is child)
+        components.append((child.name, position + 1, len(siblings)))
+        child = child.parent
+    components.reverse()
+    return components
+
+
 def get_element_xpath(element):
     """
     获取元素的XPATH路径
@@ -413,28 +624,171 @@ def get_element_xpath(element):
     返回：XPATH字符串
     """
     try:
-        components = []
-        child = element
-        while child.parent:
-            siblings = child.parent.find_all(child.name, recursive=False)
-            if len(siblings) > 1:
-                components.append(f"{child.name}[{siblings.index(child)+1}]")
-            else:
-                components.append(child.name)
-            child = child.parent
-        components.reverse()
+        components = [
+            f"{name}[{position}]" if count > 1 else name
+            for name, position, count in _element_path(element)
+        ]
         return '/' + '/'.join(components)
     except Exception as e:
         current_app.logger.error(f"获取元素XPATH失败: {str(e)}")
         return ''
 
 
+def get_element_selector(element):
+    """
+    获取元素的CSS选择器路径
+    参数：
+        element - BeautifulSoup元素对象
+    返回：CSS选择器字符串
+    """
+    try:
+        components = [
+            f"{name}:nth-of-type({position})" if count > 1 else name
+            for name, position, count in _element_path(element)
+        ]
+        return ' > '.join(components)
+    except Exception as e:
+        current_app.logger.error(f"获取元素CSS选择器失败: {str(e)}")
+        return ''
+
+
+def batch_detailed_crawl(data_ids, report=None):
+    """
+    并发采集多条数据的详细内容并批量保存
+    参数：
+        data_ids - 数据ID列表
+        report - 进度上报函数（可选）
+    返回：包含total、success_count、fail_count的统计结果
+    """
+    from app.models import SiteRule
+    from app.crawler.crawler import crawl_detailed_content, CrawlerConfig
+    from app.crawler.executor import BoundedExecutor
+    from app.crawler.http_cache import load_validators, save_cache_info
+    from app.crawler.ratelimit import configure_site_rate_limits
+    
+    configure_site_rate_limits()
+    
+    # 一次性加载采集结果、已有的详细采集结果、缓存校验值和匹配的规则
+    crawl_results = CrawlResult.query.filter(CrawlResult.id.in_(data_ids)).all()
+    existing_results = {
+        depth_result.crawl_result_id: depth_result
+        for depth_result in DepthCrawlResult.query.filter(
+            DepthCrawlResult.crawl_result_id.in_([crawl_result.id for crawl_result in crawl_results])
+        ).all()
+    }
+    # 没有已有内容的页面在304时需要用缓存的页面内容重新解析
+    validators = load_validators(
+        [crawl_result.original_url for crawl_result in crawl_results],
+        with_body=[
+            crawl_result.original_url for crawl_result in crawl_results
+            if not getattr(existing_results.get(crawl_result.id), 'content', None)
+        ]
+    )
+    sources = {crawl_result.source for crawl_result in crawl_results}
+    site_rules = {
+        rule.site_name: rule
+        for rule in SiteRule.query.filter(
+            SiteRule.is_active == True,
+            SiteRule.site_name.in_(sources)
+        ).all()
+    }
+    
+    def build_job(crawl_result, conditional=True):
+        """生成采集任务参数（在调用线程中读取规则，采集线程不访问数据库会话）"""
+        site_rule = site_rules.get(crawl_result.source)
+        kwargs = {}
+        if site_rule:
+            kwargs = {
+                'headers': site_rule.get_request_headers(),
+                'rule': _load_compiled_rule(site_rule)
+            }
+        if conditional:
+            kwargs['validators'] = validators.get(crawl_result.original_url)
+        return {'url': crawl_result.original_url, 'kwargs': kwargs}
+    
+    def run_job(job):
+        return crawl_detailed_content(job['url'], **job['kwargs'])
+    
+    config = CrawlerConfig()
+    executor = BoundedExecutor(max_workers=config.max_workers, max_per_host=config.max_per_host)
+    
+    # 第一轮：并发采集所有页面
+    jobs = [build_job(crawl_result) for crawl_result in crawl_results]
+    callback = None
+    if report:
+        report(0, len(jobs), '正在采集详细内容')
+        callback = lambda done, total: report(done, total)
+    outcomes = executor.map(run_job, jobs, url_getter=lambda job: job['url'], callback=callback)
+    
+    # 规则失效的页面：在调用线程中更新规则，再并发重新采集
+    updated_rules = set()
+    retry_indexes = []
+    for index, (detailed_content, error) in enumerate(outcomes):
+        crawl_result = crawl_results[index]
+        site_rule = site_rules.get(crawl_result.source)
+        if error or not site_rule or detailed_content.get('not_modified'):
+            continue
+        if detailed_content.get('title') and detailed_content.get('content'):
+            continue
+        if site_rule.id not in updated_rules:
+            if not update_crawl_rules(crawl_result.original_url, site_rule, crawl_result.title):
+                continue
+            updated_rules.add(site_rule.id)
+        retry_indexes.append(index)
+    
+    if retry_indexes:
+        retry_jobs = [build_job(crawl_results[index], conditional=False) for index in retry_indexes]
+        retry_outcomes = executor.map(run_job, retry_jobs, url_getter=lambda job: job['url'])
+        for index, outcome in zip(retry_indexes, retry_outcomes):
+            outcomes[index] = outcome
+    
+    # 批量写入详细采集结果，未变化的页面只更新确认时间
+    new_results = []
+    cache_infos = []
+    changed_pages = []
+    success_count = 0
+    for crawl_result, (detailed_content, error) in zip(crawl_results, outcomes):
+        if error:
+            current_app.logger.error(f"详细内容采集失败 ID {crawl_result.id}: {str(error)}")
+            continue
+        cache_infos.append((crawl_result.original_url, detailed_content.pop('http_cache', None)))
+        depth_result = existing_results.get(crawl_result.id)
+        if depth_result is None:
+            depth_result = DepthCrawlResult(crawl_result_id=crawl_result.id)
+            new_results.append(depth_result)
+        if depth_result.apply_detailed_content(detailed_content):
+            changed_pages.append((crawl_result.id, detailed_content))
+        
+        # 更新采集状态
+        crawl_result.depth_crawled = True
+        crawl_result.is_stored = True
+        success_count += 1
+    
+    db.session.add_all(new_results)
+    index_pages(changed_pages)
+    save_cache_info(cache_infos)
+    db.session.commit()
+    
+    return {
+        'total': len(data_ids),
+        'success_count': success_count,
+        'fail_count': len(data_ids) - success_count
+    }
+
+
+@job_queue.register('batch_detailed_crawl')
+def run_batch_detailed_crawl_job(params, report):
+    """后台执行批量详细内容采集任务"""
+    return batch_detailed_crawl(params['data_ids'], report)
+
+
 @warehouse_bp.route('/api/warehouse/batch_detailed_crawl', methods=['POST'])
 def batch_detailed_crawl_data():
     """
     批量详细内容采集API接口
     参数：
         data_ids - 数据ID列表（JSON格式）
+        async - 为1时提交后台任务并立即返回任务ID
     返回：JSON格式的采集结果
     """
     try:
@@ -451,99 +805,17 @@ def batch_detailed_crawl_data():
         if not isinstance(data_ids, list) or len(data_ids) == 0:
             return jsonify({'success': False, 'message': '请选择要采集的数据'})
         
-        # 初始化结果统计
-        success_count = 0
-        fail_count = 0
+        if wants_async(request.form):
+            job = job_queue.submit('batch_detailed_crawl', {'data_ids': data_ids})
+            return jsonify({'success': True, 'message': '批量详细内容采集任务已提交', 'job_id': job.id})
         
-        # 循环处理每个要采集的ID
-        for data_id in data_ids:
-            try:
-                # 获取要采集的结果
-                crawl_result = CrawlResult.query.get(data_id)
-                if not crawl_result:
-                    fail_count += 1
-                    continue
-                
-                # 调用单个采集函数
-                from app.models import SiteRule
-                from app.crawler.crawler import crawl_detailed_content
-                
-                # 根据来源匹配规则
-                site_rule = SiteRule.query.filter(
-                    SiteRule.is_active == True,
-                    SiteRule.site_name == crawl_result.source
-                ).first()
-                
-                # 执行详细内容采集
-                if site_rule:
-                    detailed_content = crawl_detailed_content(
-                        crawl_result.original_url,
-                        title_xpath=site_rule.title_xpath,
-                        content_xpath=site_rule.content_xpath,
-                        headers=site_rule.get_request_headers()
-                    )
-                else:
-                    detailed_content = crawl_detailed_content(crawl_result.original_url)
-                
-                # 检查是否需要更新规则
-                if site_rule and (not detailed_content.get('title') or not detailed_content.get('content')):
-                    updated = update_crawl_rules(
-                        crawl_result.original_url,
-                        site_rule,
-                        crawl_result.title
-                    )
-                    if updated:
-                        # 使用更新后的规则重新采集
-                        detailed_content = crawl_detailed_content(
-                            crawl_result.original_url,
-                            title_xpath=site_rule.title_xpath,
-                            content_xpath=site_rule.content_xpath,
-                            headers=site_rule.get_request_headers()
-                        )
-                
-                # 保存详细采集结果
-                depth_result = DepthCrawlResult.query.filter_by(crawl_result_id=data_id).first()
-                if depth_result:
-                    # 更新已有结果
-                    depth_result.content = detailed_content.get('content', '')
-                    depth_result.set_images(detailed_content.get('images', []))
-                    depth_result.set_videos(detailed_content.get('videos', []))
-                    depth_result.set_links(detailed_content.get('links', []))
-                    depth_result.set_meta_data(detailed_content.get('meta_data', {}))
-                else:
-                    # 创建新结果
-                    depth_result = DepthCrawlResult(
-                        crawl_result_id=data_id,
-                        content=detailed_content.get('content', ''),
-                        meta_data=json.dumps(detailed_content.get('meta_data', {}), ensure_ascii=False)
-                    )
-                    depth_result.set_images(detailed_content.get('images', []))
-                    depth_result.set_videos(detailed_content.get('videos', []))
-                    depth_result.set_links(detailed_content.get('links', []))
-                    db.session.add(depth_result)
-                
-                # 更新采集状态
-                crawl_result.depth_crawled = True
-                crawl_result.is_stored = True
-                
-                success_count += 1
-                
-            except Exception as e:
-                current_app.logger.error(f"详细内容采集失败 ID {data_id}: {str(e)}")
-                fail_count += 1
-        
-        # 提交所有更改
-        db.session.commit()
+        stats = batch_detailed_crawl(data_ids)
         
         # 返回结果
         return jsonify({
             'success': True,
             'message': '批量详细内容采集完成',
-            'data': {
-                'total': len(data_ids),
-                'success_count': success_count,
-                'fail_count': fail_count
-            }
+            'data': stats
         })
         
     except Exception as e:
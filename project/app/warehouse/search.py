@@ -0,0 +1,409 @@
+"""
+采集结果全文检索
+
+基于SQLite FTS5建立crawl_result_fts索引，覆盖CrawlResult的关键词、标题、摘要和DepthCrawlResult的正文。
+中文按相邻两字切分（二元分词），英文和数字按单词切分。
+数据库触发器只使用SQLite内置的SQL：写入或修改采集结果时把ID记入待同步表crawl_result_fts_pending，
+删除采集结果时直接删除索引行，因此不经过应用的连接（如sqlite3命令行）也能正常写入。
+分词在应用中完成：sync_search_index把待同步的采集结果分词后写入索引（压缩存储的正文先解压）。
+同步不在检索请求中进行：会话提交了采集结果或深度采集结果的修改后通知后台同步线程，
+同步线程还按SEARCH_SYNC_INTERVAL定时同步，收录不经过应用写入的记录。测试时在提交后直接同步。
+检索结果按bm25相关度排序，高亮在Python中对原文进行。非SQLite数据库或索引表不存在时退回LIKE查询。
+"""
+import logging
+import re
+import sqlite3
+import threading
+
+import click
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, bindparam, event, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import db
+from app.compression import decompress_text
+from app.models import CrawlResult, DepthCrawlResult
+
+# 索引表名称
+FTS_TABLE = 'crawl_result_fts'
+# 待同步到索引的采集结果ID
+PENDING_TABLE = 'crawl_result_fts_pending'
+
+# bm25权重：关键词、标题、摘要、正文
+RANK_WEIGHTS = (2.0, 10.0, 5.0, 1.0)
+
+# 每个同步事务处理的采集结果数
+SYNC_BATCH_SIZE = 500
+
+# 后台同步线程的定时同步间隔（秒）
+SYNC_INTERVAL = 60
+
+# 修改后需要同步索引的表
+_INDEXED_TABLES = {CrawlResult.__tablename__, DepthCrawlResult.__tablename__}
+# 会话info中记录有待同步修改的键
+_DIRTY_KEY = 'search_index_dirty'
+
+logger = logging.getLogger(__name__)
+
+# 连续的中日韩字符
+_CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+# 连续的字母或数字
+_WORD = re.compile(r'[^\W_]+')
+
+# 同步触发器，深度采集结果的crawl_result_id为空时不记录
+SEARCH_TRIGGERS = {
+    'crawl_result_fts_insert': f"""CREATE TRIGGER crawl_result_fts_insert AFTER INSERT ON crawl_result BEGIN
+        INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id) VALUES (new.id);
+    END""",
+    'crawl_result_fts_update': f"""CREATE TRIGGER crawl_result_fts_update AFTER UPDATE OF keyword, title, summary ON crawl_result BEGIN
+        INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id) VALUES (new.id);
+    END""",
+    'crawl_result_fts_delete': f"""CREATE TRIGGER crawl_result_fts_delete AFTER DELETE ON crawl_result BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        DELETE FROM {PENDING_TABLE} WHERE crawl_result_id = old.id;
+    END""",
+    'depth_crawl_result_fts_insert': f"""CREATE TRIGGER depth_crawl_result_fts_insert AFTER INSERT ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id)
+        SELECT new.crawl_result_id WHERE new.crawl_result_id IS NOT NULL;
+    END""",
+    'depth_crawl_result_fts_update': f"""CREATE TRIGGER depth_crawl_result_fts_update AFTER UPDATE OF content, crawl_result_id ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id)
+        SELECT old.crawl_result_id WHERE old.crawl_result_id IS NOT NULL
+        UNION SELECT new.crawl_result_id WHERE new.crawl_result_id IS NOT NULL;
+    END""",
+    'depth_crawl_result_fts_delete': f"""CREATE TRIGGER depth_crawl_result_fts_delete AFTER DELETE ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id)
+        SELECT old.crawl_result_id WHERE old.crawl_result_id IS NOT NULL;
+    END""",
+}
+
+# 建立索引表、待同步表和同步触发器（替换旧版本的触发器）
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        keyword, title, summary, content, tokenize='unicode61'
+    )""",
+    f"CREATE TABLE IF NOT EXISTS {PENDING_TABLE} (crawl_result_id INTEGER PRIMARY KEY)",
+] + [f"DROP TRIGGER IF EXISTS {name}" for name in SEARCH_TRIGGERS] + list(SEARCH_TRIGGERS.values())
+
+# 按现有数据重建索引：清空索引，把全部采集结果记入待同步表
+REBUILD_INDEX_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"INSERT OR IGNORE INTO {PENDING_TABLE}(crawl_result_id) SELECT id FROM crawl_result",
+]
+
+# 各数据库引擎的索引表是否存在
+_index_available = {}
+
+
+def _split_runs(text_value):
+    """
+    把文本拆分为中文片段和单词
+    返回：(是否中文片段, 片段) 的生成器
+    """
+    position = 0
+    for match in _CJK_RUN.finditer(text_value):
+        for word in _WORD.findall(text_value[position:match.start()]):
+            yield False, word
+        yield True, match.group()
+        position = match.end()
+    for word in _WORD.findall(text_value[position:]):
+        yield False, word
+
+
+def tokenize(text_value):
+    """
+    把文本切分为索引词
+    中文每个连续片段按相邻两字切分，并补上片段末字，保证任意单字都是某个索引词的开头；
+    字母和数字按单词切分并转为小写。
+    参数：
+        text_value - 原始文本
+    返回：索引词列表
+    """
+    tokens = []
+    for is_cjk, run in _split_runs(text_value or ''):
+        if is_cjk:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            tokens.append(run[-1])
+        else:
+            tokens.append(run.lower())
+    return tokens
+
+
+def fts_tokens(text_value):
+    """返回以空格分隔的索引词，压缩存储的正文先解压（也注册为SQLite函数，供早期迁移的触发器使用）"""
+    if isinstance(text_value, bytes):
+        text_value = decompress_text(text_value)
+    return ' '.join(tokenize(text_value))
+
+
+def build_match_query(keyword):
+    """
+    把搜索关键词转换为FTS5查询
+    中文片段转换为二元分词组成的短语（相当于子串匹配），单字和英文单词按前缀匹配，多个片段之间为AND关系。
+    参数：
+        keyword - 搜索关键词
+    返回：FTS5 MATCH表达式，关键词中没有可检索内容时返回空字符串
+    """
+    terms = []
+    for is_cjk, run in _split_runs(keyword or ''):
+        if is_cjk and len(run) > 1:
+            terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        else:
+            terms.append(f'"{run.lower()}"*')
+    return ' '.join(terms)
+
+
+def highlight(text_value, keyword, tag='em'):
+    """
+    高亮原文中的关键词
+    参数：
+        text_value - 原文
+        keyword - 搜索关键词
+        tag - 高亮使用的HTML标签
+    返回：转义后的HTML字符串
+    """
+    if not text_value:
+        return ''
+    terms = {run for _, run in _split_runs(keyword or '')}
+    if not terms:
+        return str(escape(text_value))
+    pattern = re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    parts = []
+    position = 0
+    for match in pattern.finditer(text_value):
+        parts.append(escape(text_value[position:match.start()]))
+        parts.append(Markup(f'<{tag}>') + escape(match.group()) + Markup(f'</{tag}>'))
+        position = match.end()
+    parts.append(escape(text_value[position:]))
+    return str(Markup('').join(parts))
+
+
+def _register_functions(dbapi_connection, connection_record):
+    """在每个SQLite连接上注册分词函数（迁移b71e3f0c5a92至当前版本之间的触发器调用它）"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('fts_tokens', 1, fts_tokens, deterministic=True)
+
+
+def search_index_available():
+    """检查当前数据库是否可以使用全文索引"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    key = str(engine.url)
+    if key not in _index_available:
+        with engine.connect() as connection:
+            _index_available[key] = connection.execute(
+                text("SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :pending)"),
+                {'fts': FTS_TABLE, 'pending': PENDING_TABLE}
+            ).scalar() == 2
+    return _index_available[key]
+
+
+def sync_search_index(batch_size=SYNC_BATCH_SIZE):
+    """
+    把待同步的采集结果分词后写入索引
+    每个事务先从待同步表中删除一批ID（DELETE ... RETURNING，同时取得写锁），再按采集结果和最新的深度采集正文重写索引行，
+    多个进程同时同步时不会重复处理。没有待同步记录时只执行一次读查询。
+    参数：
+        batch_size - 每个事务处理的采集结果数
+    返回：同步的采集结果数
+    """
+    if not search_index_available():
+        return 0
+    with db.engine.connect() as connection:
+        if connection.execute(text(f"SELECT 1 FROM {PENDING_TABLE} LIMIT 1")).first() is None:
+            return 0
+
+    crawl_result = CrawlResult.__table__
+    depth_crawl_result = DepthCrawlResult.__table__
+    synced = 0
+    while True:
+        with db.engine.begin() as connection:
+            ids = connection.execute(text(
+                f"DELETE FROM {PENDING_TABLE} WHERE crawl_result_id IN "
+                f"(SELECT crawl_result_id FROM {PENDING_TABLE} ORDER BY crawl_result_id LIMIT :limit) "
+                f"RETURNING crawl_result_id"
+            ), {'limit': batch_size}).scalars().all()
+            if not ids:
+                return synced
+
+            contents = {}
+            for crawl_result_id, content in connection.execute(
+                select(depth_crawl_result.c.crawl_result_id, depth_crawl_result.c.content)
+                .where(depth_crawl_result.c.crawl_result_id.in_(ids)).order_by(depth_crawl_result.c.id)
+            ):
+                contents[crawl_result_id] = content
+            rows = [{
+                'rowid': row.id,
+                'keyword': fts_tokens(row.keyword),
+                'title': fts_tokens(row.title),
+                'summary': fts_tokens(row.summary),
+                'content': fts_tokens(contents.get(row.id))
+            } for row in connection.execute(
+                select(crawl_result.c.id, crawl_result.c.keyword, crawl_result.c.title, crawl_result.c.summary)
+                .where(crawl_result.c.id.in_(ids))
+            )]
+
+            connection.execute(
+                text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+                {'ids': ids}
+            )
+            if rows:
+                connection.execute(text(
+                    f"INSERT INTO {FTS_TABLE}(rowid, keyword, title, summary, content) "
+                    f"VALUES (:rowid, :keyword, :title, :summary, :content)"
+                ), rows)
+        synced += len(ids)
+
+
+def create_search_index(rebuild=False):
+    """
+    创建索引表、待同步表和触发器，并同步待索引的记录
+    参数：
+        rebuild - 是否按现有数据重建索引
+    """
+    with db.engine.begin() as connection:
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+        if rebuild:
+            for statement in REBUILD_INDEX_SQL:
+                connection.execute(text(statement))
+    _index_available.clear()
+    sync_search_index()
+
+
+def apply_search(query, keyword, like_columns=None):
+    """
+    在CrawlResult查询上应用关键词检索
+    参数：
+        query - CrawlResult查询对象
+        keyword - 搜索关键词
+        like_columns - 退回LIKE查询时匹配的列，默认关键词、标题和摘要
+    返回：(查询对象, 相关度列)，相关度列越小越相关；使用LIKE查询时相关度列为None
+    """
+    if not keyword:
+        return query, None
+
+    if search_index_available():
+        match_query = build_match_query(keyword)
+        if match_query:
+            weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+            matches = text(
+                f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS score "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match_query"
+            ).bindparams(match_query=match_query).columns(rowid=Integer, score=Float).subquery('fts_matches')
+            return query.join(matches, CrawlResult.id == matches.c.rowid), matches.c.score
+
+    like_columns = like_columns or [CrawlResult.keyword, CrawlResult.title, CrawlResult.summary]
+    condition = like_columns[0].like(f'%{keyword}%')
+    for column in like_columns[1:]:
+        condition = condition | column.like(f'%{keyword}%')
+    return query.filter(condition), None
+
+
+class SearchIndexSyncer:
+    """
+    全文索引同步线程
+    参数：
+        interval - 定时同步的秒数，可通过SEARCH_SYNC_INTERVAL配置
+    """
+    def __init__(self, interval=SYNC_INTERVAL):
+        self.app = None
+        self.interval = interval
+        self.in_background = True
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """
+        绑定Flask应用（不访问数据库、不启动线程）
+        SEARCH_SYNC_IN_BACKGROUND默认在测试时为假，此时在提交后直接同步；否则在处理第一个请求前启动同步线程
+        """
+        self.app = app
+        self.interval = app.config.get('SEARCH_SYNC_INTERVAL', self.interval)
+        self.in_background = app.config.get('SEARCH_SYNC_IN_BACKGROUND', not app.testing)
+        if self.in_background:
+            app.before_request(self._ensure_started)
+
+    def notify(self):
+        """有待同步的修改时调用（需要应用上下文）"""
+        if not self.in_background:
+            sync_search_index()
+            return
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self):
+        """启动同步线程"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='search-index-sync', daemon=True)
+                self._thread.start()
+
+    def _worker(self):
+        """同步线程主循环：收到通知或等待超时后同步"""
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    sync_search_index()
+                except SQLAlchemyError as e:
+                    logger.error(f"同步全文索引失败: {str(e)}")
+
+
+# 全局同步线程
+search_index_syncer = SearchIndexSyncer()
+
+
+def _track_flush(session, flush_context):
+    """刷新了采集结果或深度采集结果的修改时标记会话"""
+    if any(isinstance(instance, (CrawlResult, DepthCrawlResult))
+           for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_DIRTY_KEY] = True
+
+
+def _track_statement(orm_execute_state):
+    """通过会话执行写入采集结果或深度采集结果的语句（批量写入）时标记会话"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) in _INDEXED_TABLES:
+            orm_execute_state.session.info[_DIRTY_KEY] = True
+
+
+def _after_commit(session):
+    """提交了需要同步的修改后通知同步线程"""
+    if session.info.pop(_DIRTY_KEY, False):
+        search_index_syncer.notify()
+
+
+def _after_rollback(session):
+    """回滚后清除标记"""
+    session.info.pop(_DIRTY_KEY, None)
+
+
+SESSION_EVENTS = {
+    'after_flush': _track_flush,
+    'do_orm_execute': _track_statement,
+    'after_commit': _after_commit,
+    'after_rollback': _after_rollback,
+}
+
+
+def init_app(app):
+    """注册SQLite分词函数、提交后同步索引的会话事件和索引维护命令"""
+    if not event.contains(Engine, 'connect', _register_functions):
+        event.listen(Engine, 'connect', _register_functions)
+    for name, listener in SESSION_EVENTS.items():
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+    search_index_syncer.init_app(app)
+
+    @app.cli.command('search-index')
+    @click.option('--rebuild', is_flag=True, help='按现有数据重建索引')
+    def search_index_command(rebuild):
+        """创建采集结果全文索引并同步待索引的记录"""
+        create_search_index(rebuild=rebuild)
+        click.echo('全文索引已重建' if rebuild else '全文索引已创建')
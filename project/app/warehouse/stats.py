@@ -0,0 +1,160 @@
+"""
+采集结果统计
+
+crawl_result_daily_stats表按(日期, 关键词)汇总采集数量、深度采集数量和存储数量，
+由SQLite触发器在crawl_result增删改时增量维护，统计接口只需读取汇总表，耗时不随数据量增长。
+汇总表或触发器不存在时（如非SQLite数据库），直接在crawl_result上分组聚合。
+"""
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import bindparam, case, func, text
+
+from app import db
+from app.models import CrawlResult, CrawlResultDailyStat
+
+ROLLUP_TABLE = 'crawl_result_daily_stats'
+
+# 把一条采集结果计入或移出汇总表
+_ADD_ROW = f"""INSERT INTO {ROLLUP_TABLE}(stat_date, keyword, total_count, depth_crawled_count, stored_count)
+        VALUES (date(new.created_at), new.keyword, 1, coalesce(new.depth_crawled, 0) != 0, coalesce(new.is_stored, 0) != 0)
+        ON CONFLICT(stat_date, keyword) DO UPDATE SET
+            total_count = total_count + 1,
+            depth_crawled_count = depth_crawled_count + excluded.depth_crawled_count,
+            stored_count = stored_count + excluded.stored_count;"""
+_REMOVE_ROW = f"""UPDATE {ROLLUP_TABLE} SET
+            total_count = total_count - 1,
+            depth_crawled_count = depth_crawled_count - (coalesce(old.depth_crawled, 0) != 0),
+            stored_count = stored_count - (coalesce(old.is_stored, 0) != 0)
+        WHERE stat_date = date(old.created_at) AND keyword = old.keyword;
+        DELETE FROM {ROLLUP_TABLE} WHERE stat_date = date(old.created_at) AND keyword = old.keyword AND total_count <= 0;"""
+
+# 维护汇总表的触发器
+ROLLUP_TRIGGERS = {
+    'crawl_result_stats_insert': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_stats_insert AFTER INSERT ON crawl_result BEGIN
+        {_ADD_ROW}
+    END""",
+    'crawl_result_stats_update': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_stats_update
+    AFTER UPDATE OF keyword, created_at, depth_crawled, is_stored ON crawl_result BEGIN
+        {_REMOVE_ROW}
+        {_ADD_ROW}
+    END""",
+    'crawl_result_stats_delete': f"""CREATE TRIGGER IF NOT EXISTS crawl_result_stats_delete AFTER DELETE ON crawl_result BEGIN
+        {_REMOVE_ROW}
+    END""",
+}
+
+# 按现有数据重建汇总表
+REBUILD_ROLLUP_SQL = [
+    f"DELETE FROM {ROLLUP_TABLE}",
+    f"""INSERT INTO {ROLLUP_TABLE}(stat_date, keyword, total_count, depth_crawled_count, stored_count)
+        SELECT date(created_at), keyword, COUNT(*),
+               SUM(coalesce(depth_crawled, 0) != 0), SUM(coalesce(is_stored, 0) != 0)
+        FROM crawl_result GROUP BY date(created_at), keyword""",
+]
+
+# 各数据库引擎的汇总表是否由触发器维护
+_rollup_available = {}
+
+
+def rollup_available():
+    """检查汇总表是否存在并由触发器维护"""
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        return False
+    key = str(engine.url)
+    if key not in _rollup_available:
+        with engine.connect() as connection:
+            _rollup_available[key] = connection.execute(
+                text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name IN :names")
+                .bindparams(bindparam('names', expanding=True)),
+                {'names': list(ROLLUP_TRIGGERS)}
+            ).scalar() == len(ROLLUP_TRIGGERS)
+    return _rollup_available[key]
+
+
+def create_stats_rollup(rebuild=False):
+    """
+    创建汇总表和触发器
+    参数：
+        rebuild - 是否按现有数据重建汇总表
+    """
+    CrawlResultDailyStat.__table__.create(db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        for statement in ROLLUP_TRIGGERS.values():
+            connection.execute(text(statement))
+        if rebuild:
+            for statement in REBUILD_ROLLUP_SQL:
+                connection.execute(text(statement))
+    _rollup_available.clear()
+
+
+def _daily_source():
+    """按日期和关键词汇总的数据来源：汇总表，或在crawl_result上实时分组"""
+    if rollup_available():
+        return CrawlResultDailyStat.__table__
+    return db.session.query(
+        func.date(CrawlResult.created_at).label('stat_date'),
+        CrawlResult.keyword.label('keyword'),
+        func.count(CrawlResult.id).label('total_count'),
+        func.sum(case((CrawlResult.depth_crawled == True, 1), else_=0)).label('depth_crawled_count'),
+        func.sum(case((CrawlResult.is_stored == True, 1), else_=0)).label('stored_count')
+    ).group_by(func.date(CrawlResult.created_at), CrawlResult.keyword).subquery('daily_stats')
+
+
+def get_crawl_stats(days=7, top_keywords=10, today=None):
+    """
+    获取采集统计数据
+    参数：
+        days - 按日统计的天数（不含今天）
+        top_keywords - 返回采集数量最多的关键词个数
+        today - 统计基准日期（UTC），默认今天
+    返回：包含total_count、depth_crawled_count、stored_count、keywords_stats、date_stats的字典
+    """
+    today = today or datetime.utcnow().date()
+    daily = _daily_source()
+
+    # 按日期汇总，总数由各日期相加得到
+    per_day = db.session.query(
+        daily.c.stat_date,
+        func.sum(daily.c.total_count),
+        func.sum(daily.c.depth_crawled_count),
+        func.sum(daily.c.stored_count)
+    ).group_by(daily.c.stat_date).all()
+
+    totals = [0, 0, 0]
+    counts_by_date = {}
+    for stat_date, total_count, depth_crawled_count, stored_count in per_day:
+        totals[0] += total_count or 0
+        totals[1] += depth_crawled_count or 0
+        totals[2] += stored_count or 0
+        if stat_date is not None:
+            counts_by_date[str(stat_date)[:10]] = total_count or 0
+
+    keyword_count = func.sum(daily.c.total_count).label('count')
+    keywords_stats = db.session.query(daily.c.keyword, keyword_count) \
+        .group_by(daily.c.keyword).order_by(keyword_count.desc(), daily.c.keyword).limit(top_keywords).all()
+
+    start_date = today - timedelta(days=days)
+    date_stats = []
+    for i in range(days):
+        day = (start_date + timedelta(days=i)).strftime('%Y-%m-%d')
+        date_stats.append({'date': day, 'count': counts_by_date.get(day, 0)})
+
+    return {
+        'total_count': totals[0],
+        'depth_crawled_count': totals[1],
+        'stored_count': totals[2],
+        'keywords_stats': [{'keyword': keyword, 'count': count} for keyword, count in keywords_stats],
+        'date_stats': date_stats
+    }
+
+
+def init_app(app):
+    """注册汇总表维护命令"""
+    @app.cli.command('stats-rollup')
+    @click.option('--rebuild', is_flag=True, help='按现有数据重建汇总表')
+    def stats_rollup_command(rebuild):
+        """创建采集结果按日统计汇总表"""
+        create_stats_rollup(rebuild=rebuild)
+        click.echo('统计汇总表已重建' if rebuild else '统计汇总表已创建')
@@ -0,0 +1,49 @@
+"""Add crawl jobs table
+
+Revision ID: 3c9f2a7d41e8
+Revises: 5e44ce33d810
+Create Date: 2026-10-18 10:12:41.306215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9f2a7d41e8'
+down_revision = '5e44ce33d810'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('crawl_jobs',
+    sa.Column('job_type', sa.String(length=50), nullable=False, comment='任务类型：crawl, depth_crawl, batch_detailed_crawl'),
+    sa.Column('status', sa.String(length=20), nullable=False, comment='任务状态：pending(等待中), running(执行中), completed(已完成), failed(失败)'),
+    sa.Column('params', sa.Text(), nullable=True, comment='任务参数(JSON格式)'),
+    sa.Column('result', sa.Text(), nullable=True, comment='任务结果(JSON格式)'),
+    sa.Column('total', sa.Integer(), nullable=False, comment='待处理数量'),
+    sa.Column('processed', sa.Integer(), nullable=False, comment='已处理数量'),
+    sa.Column('message', sa.String(length=255), nullable=True, comment='进度信息'),
+    sa.Column('error_message', sa.Text(), nullable=True, comment='错误信息'),
+    sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+    sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('created_by', sa.Integer(), nullable=True),
+    sa.Column('updated_by', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['user.id'], ),
+    sa.ForeignKeyConstraint(['updated_by'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('crawl_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_crawl_jobs_status', ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('crawl_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_crawl_jobs_status')
+
+    op.drop_table('crawl_jobs')
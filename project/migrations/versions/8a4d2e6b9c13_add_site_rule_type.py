@@ -0,0 +1,26 @@
+"""Add rule type to site rules
+
+Revision ID: 8a4d2e6b9c13
+Revises: 3c9f2a7d41e8
+Create Date: 2026-10-18 14:05:27.518903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d2e6b9c13'
+down_revision = '3c9f2a7d41e8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('site_rules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rule_type', sa.String(length=20), server_default='xpath', nullable=False, comment='规则类型(xpath/css)'))
+
+
+def downgrade():
+    with op.batch_alter_table('site_rules', schema=None) as batch_op:
+        batch_op.drop_column('rule_type')
@@ -0,0 +1,162 @@
+"""Add crawl result minhash signatures
+
+Revision ID: a4c7e1f28d39
+Revises: f3a6c9e2b715
+Create Date: 2026-10-18 23:42:05.317904
+
+"""
+import hashlib
+import random
+import re
+import struct
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c7e1f28d39'
+down_revision = 'f3a6c9e2b715'
+branch_labels = None
+depends_on = None
+
+
+BANDS = 16
+BAND_BYTES = 16
+BAND_INDEXES = ', '.join(f'({i})' for i in range(BANDS))
+
+# 迁移时的分词和签名算法（冻结自app.warehouse.search和app.warehouse.dedup）：
+# 应用代码以后修改算法时，本迁移回填的签名保持不变
+NUM_PERM = 64
+PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)
+PERMUTATIONS = [(_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(NUM_PERM)]
+SIGNATURE = struct.Struct(f'>{NUM_PERM}I')
+CJK_RUN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+')
+WORD = re.compile(r'[^\W_]+')
+
+
+def tokenize(text_value):
+    text_value = text_value or ''
+    tokens = []
+    position = 0
+    for match in CJK_RUN.finditer(text_value):
+        tokens.extend(word.lower() for word in WORD.findall(text_value[position:match.start()]))
+        run = match.group()
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+        position = match.end()
+    tokens.extend(word.lower() for word in WORD.findall(text_value[position:]))
+    return tokens
+
+
+def text_minhash(*texts):
+    features = set()
+    for text_value in texts:
+        features.update(tokenize(text_value))
+    if not features:
+        return None
+    hashes = [
+        int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big') % PRIME
+        for feature in features
+    ]
+    return SIGNATURE.pack(*(
+        min((a * value + b) % PRIME for value in hashes) & 0xFFFFFFFF
+        for a, b in PERMUTATIONS
+    ))
+
+
+def band_rows(kind, column, target):
+    return f"""INSERT OR IGNORE INTO minhash_band(kind, band, band_value, target_id)
+            SELECT '{kind}', column1, substr(new.{column}, column1 * {BAND_BYTES} + 1, {BAND_BYTES}), new.{target}
+            FROM (VALUES {BAND_INDEXES}) WHERE new.{column} IS NOT NULL;"""
+
+
+def remove_rows(kind, target):
+    return f"DELETE FROM minhash_band WHERE kind = '{kind}' AND target_id = old.{target};"
+
+
+TRIGGERS = {
+    'crawl_result_minhash_insert': f"""CREATE TRIGGER crawl_result_minhash_insert
+    AFTER INSERT ON crawl_result WHEN new.minhash IS NOT NULL BEGIN
+        {band_rows('title', 'minhash', 'id')}
+    END""",
+    'crawl_result_minhash_update': f"""CREATE TRIGGER crawl_result_minhash_update
+    AFTER UPDATE OF minhash ON crawl_result BEGIN
+        {remove_rows('title', 'id')}
+        {band_rows('title', 'minhash', 'id')}
+    END""",
+    'crawl_result_minhash_delete': f"""CREATE TRIGGER crawl_result_minhash_delete
+    AFTER DELETE ON crawl_result BEGIN
+        {remove_rows('title', 'id')}
+    END""",
+    'depth_crawl_result_minhash_insert': f"""CREATE TRIGGER depth_crawl_result_minhash_insert
+    AFTER INSERT ON depth_crawl_result WHEN new.content_minhash IS NOT NULL BEGIN
+        {band_rows('content', 'content_minhash', 'crawl_result_id')}
+    END""",
+    'depth_crawl_result_minhash_update': f"""CREATE TRIGGER depth_crawl_result_minhash_update
+    AFTER UPDATE OF content_minhash, crawl_result_id ON depth_crawl_result BEGIN
+        {remove_rows('content', 'crawl_result_id')}
+        {band_rows('content', 'content_minhash', 'crawl_result_id')}
+    END""",
+    'depth_crawl_result_minhash_delete': f"""CREATE TRIGGER depth_crawl_result_minhash_delete
+    AFTER DELETE ON depth_crawl_result BEGIN
+        {remove_rows('content', 'crawl_result_id')}
+    END""",
+}
+
+
+def backfill(connection, table_name, columns, target_column, compute):
+    """按批为已有记录计算签名，段表由更新触发器写入"""
+    table = sa.table(table_name, sa.column('id', sa.Integer), sa.column(target_column, sa.LargeBinary),
+                     *[sa.column(name, sa.Text) for name in columns])
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, *[table.c[name] for name in columns])
+            .where(table.c.id > last_id).order_by(table.c.id).limit(500)
+        ).all()
+        if not rows:
+            break
+        updates = [{'row_id': row[0], 'signature': compute(*row[1:])} for row in rows]
+        updates = [update for update in updates if update['signature'] is not None]
+        if updates:
+            connection.execute(
+                table.update().where(table.c.id == sa.bindparam('row_id'))
+                .values({target_column: sa.bindparam('signature')}),
+                updates
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    # 不使用batch模式，避免SQLite重建表时丢失表上已有的触发器
+    op.add_column('crawl_result', sa.Column('minhash', sa.LargeBinary(), nullable=True, comment='标题和摘要的MinHash签名，用于近似重复检测'))
+    op.add_column('depth_crawl_result', sa.Column('content_minhash', sa.LargeBinary(), nullable=True, comment='正文的MinHash签名，用于近似重复检测'))
+    op.create_table('minhash_band',
+    sa.Column('kind', sa.String(length=20), nullable=False, comment='签名类型：title标题摘要，content正文'),
+    sa.Column('band', sa.Integer(), nullable=False, comment='段序号'),
+    sa.Column('band_value', sa.LargeBinary(), nullable=False, comment='段值'),
+    sa.Column('target_id', sa.Integer(), nullable=False, comment='采集结果ID'),
+    sa.PrimaryKeyConstraint('kind', 'band', 'band_value', 'target_id')
+    )
+
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in TRIGGERS.values():
+        op.execute(statement)
+
+    # 回填现有数据
+    connection = op.get_bind()
+    backfill(connection, 'crawl_result', ['title', 'summary'], 'minhash', text_minhash)
+    backfill(connection, 'depth_crawl_result', ['content'], 'content_minhash', text_minhash)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for name in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('minhash_band')
+    op.drop_column('depth_crawl_result', 'content_minhash')
+    op.drop_column('crawl_result', 'minhash')
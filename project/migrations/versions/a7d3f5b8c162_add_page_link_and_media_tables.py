@@ -0,0 +1,214 @@
+"""Add page link and media tables
+
+Revision ID: a7d3f5b8c162
+Revises: f1c3e5a7b924
+Create Date: 2026-10-19 08:41:26.503817
+
+"""
+import hashlib
+import json
+import zlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3f5b8c162'
+down_revision = 'f1c3e5a7b924'
+branch_labels = None
+depends_on = None
+
+
+# 以下为迁移编写时应用代码的副本（app.compression、app.crawler.urls、app.warehouse.links），
+# 之后应用代码的修改不影响本迁移的回填结果
+
+# 压缩格式标记与预置字典（app.compression）
+FORMAT_RAW = b'\x01'
+FORMAT_ZLIB = b'\x02'
+FORMAT_ZLIB_DICT = b'\x03'
+
+PRESET_DICTIONARY = ''.join([
+    '<div class="content"><p></p></div><br/>&nbsp;',
+    'width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no',
+    'text/html; charset=utf-8', 'IE=edge,chrome=1', 'renderer', 'webkit', 'format-detection', 'telephone=no',
+    '"og:title": "', '"og:description": "', '"og:url": "', '"og:image": "', '"og:type": "article"',
+    '"author": "', '"publishdate": "', '"ContentSource": "', '"source": "', '"applicable-device": "pc,mobile"',
+    '"viewport": "', '"X-UA-Compatible": "IE=edge", "referrer": "always", ',
+    '"keywords": "', '"description": "',
+    '.html', '.shtml', '.htm', '.jpg', '.png', '.gif', '.js', '.css',
+    'index', 'detail', 'article', 'content', 'news', 'list', 'static',
+    '.gov.cn/', '.com.cn/', '.org.cn/', '.net/', '.cn/', '.com/',
+    'http://www.news.cn/', 'http://www.xinhuanet.com/', 'https://www.xinhuanet.com/',
+    'https://baijiahao.baidu.com/s?id=', 'http://www.baidu.com/link?url=', 'https://www.baidu.com/s?',
+    'https://www.bing.com/ck/a?', 'https://www.', 'http://www.',
+    '\\u897f\\u660c', '\\u51c9\\u5c71', '\\u65b0\\u95fb', '\\u9996\\u9875', '\\u66f4\\u591a',
+    '西昌市', '凉山州', '凉山彝族自治州', '四川省', '记者', '通讯员', '来源：', '责任编辑：', '编辑：', '发布时间：',
+    '新华社', '新华网', '人民网', '央视网', '中国', '发展', '工作', '建设', '项目', '活动', '群众', '全国', '我们',
+    '年', '月', '日', '的', '了', '和', '在', '是', '，', '。', '、', '：', '“', '”', '（', '）',
+    '", "cover": "', '", "source": "', '", "summary": "', '", "original_url": "', '{"title": "',
+    '"}, {"text": "', '", "href": "https://', '", "href": "http://', '[{"text": "',
+]).encode('utf-8')
+
+TRACKING_PARAMS = {'spm', 'gclid', 'fbclid'}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+MAX_TEXT_LENGTH = 255
+
+
+def decompress_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, data = value[:1], value[1:]
+    if marker == FORMAT_RAW:
+        return data.decode('utf-8')
+    if marker == FORMAT_ZLIB_DICT:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+    if marker == FORMAT_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    return value.decode('utf-8', 'ignore')
+
+
+def load_json(value):
+    try:
+        value = decompress_text(value)
+        return json.loads(value) if value else []
+    except (ValueError, zlib.error):
+        return []
+
+
+def normalize_url(url):
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'http:' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{host}:{port}'
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    if scheme == 'https':
+        scheme = 'http'
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def url_fingerprint(url):
+    normalized = normalize_url(url)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def page_rows(crawl_result_id, detailed_content):
+    links = {}
+    for link in detailed_content.get('links') or []:
+        if isinstance(link, dict):
+            url, link_text = link.get('href'), link.get('text')
+        else:
+            url, link_text = link, None
+        url_hash = url_fingerprint(url)
+        if url_hash and url_hash not in links:
+            links[url_hash] = {
+                'crawl_result_id': crawl_result_id,
+                'url_hash': url_hash,
+                'url': url,
+                'text': (link_text or '')[:MAX_TEXT_LENGTH] or None
+            }
+
+    media = {}
+    for media_type, key in (('image', 'images'), ('video', 'videos')):
+        for url in detailed_content.get(key) or []:
+            url_hash = url_fingerprint(url)
+            if url_hash and (media_type, url_hash) not in media:
+                media[(media_type, url_hash)] = {
+                    'crawl_result_id': crawl_result_id,
+                    'media_type': media_type,
+                    'url_hash': url_hash,
+                    'url': url
+                }
+    return list(links.values()), list(media.values())
+
+
+def upgrade():
+    page_link = op.create_table('page_link',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('crawl_result_id', sa.Integer(), nullable=False, comment='所在页面的采集结果ID'),
+    sa.Column('url_hash', sa.String(length=40), nullable=False, comment='链接URL指纹（规范化URL的SHA-1）'),
+    sa.Column('url', sa.Text(), nullable=False, comment='链接URL'),
+    sa.Column('text', sa.String(length=255), nullable=True, comment='链接文字'),
+    sa.ForeignKeyConstraint(['crawl_result_id'], ['crawl_result.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_page_link_url_hash', 'page_link', ['url_hash', 'crawl_result_id'], unique=False)
+    op.create_index(op.f('ix_page_link_crawl_result_id'), 'page_link', ['crawl_result_id'], unique=False)
+    page_media = op.create_table('page_media',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('crawl_result_id', sa.Integer(), nullable=False, comment='所在页面的采集结果ID'),
+    sa.Column('media_type', sa.String(length=10), nullable=False, comment='媒体类型：image图片，video视频'),
+    sa.Column('url_hash', sa.String(length=40), nullable=False, comment='媒体URL指纹（规范化URL的SHA-1）'),
+    sa.Column('url', sa.Text(), nullable=False, comment='媒体URL'),
+    sa.ForeignKeyConstraint(['crawl_result_id'], ['crawl_result.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_page_media_url_hash', 'page_media', ['url_hash', 'crawl_result_id'], unique=False)
+    op.create_index(op.f('ix_page_media_crawl_result_id'), 'page_media', ['crawl_result_id'], unique=False)
+
+    # 按批从深度采集结果的JSON列回填
+    # 修订f1c3e5a7b924只压缩了links列，images、videos仍是普通JSON文本；
+    # load_json对三列都先按压缩格式解压（未压缩的值原样返回），列的存储方式以后变化也能正确读取
+    table = sa.table('depth_crawl_result', sa.column('id', sa.Integer), sa.column('crawl_result_id', sa.Integer),
+                     *[sa.column(name) for name in ('links', 'images', 'videos')])
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.crawl_result_id, table.c.links, table.c.images, table.c.videos)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(500)
+        ).all()
+        if not rows:
+            break
+        link_rows, media_rows = [], []
+        for row in rows:
+            links, media = page_rows(row.crawl_result_id, {
+                'links': load_json(row.links),
+                'images': load_json(row.images),
+                'videos': load_json(row.videos)
+            })
+            link_rows.extend(links)
+            media_rows.extend(media)
+        if link_rows:
+            connection.execute(page_link.insert(), link_rows)
+        if media_rows:
+            connection.execute(page_media.insert(), media_rows)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index(op.f('ix_page_media_crawl_result_id'), table_name='page_media')
+    op.drop_index('ix_page_media_url_hash', table_name='page_media')
+    op.drop_table('page_media')
+    op.drop_index(op.f('ix_page_link_crawl_result_id'), table_name='page_link')
+    op.drop_index('ix_page_link_url_hash', table_name='page_link')
+    op.drop_table('page_link')
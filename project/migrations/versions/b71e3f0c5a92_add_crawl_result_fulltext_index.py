@@ -0,0 +1,70 @@
+"""Add crawl result full-text index
+
+Revision ID: b71e3f0c5a92
+Revises: 8a4d2e6b9c13
+Create Date: 2026-10-18 16:22:09.740315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e3f0c5a92'
+down_revision = '8a4d2e6b9c13'
+branch_labels = None
+depends_on = None
+
+
+# 触发器和回填数据依赖应用在SQLite连接上注册的fts_tokens分词函数（app.warehouse.search）
+TRIGGERS = {
+    'crawl_result_fts_insert': """CREATE TRIGGER crawl_result_fts_insert AFTER INSERT ON crawl_result BEGIN
+        INSERT INTO crawl_result_fts(rowid, keyword, title, summary, content)
+        VALUES (new.id, fts_tokens(new.keyword), fts_tokens(new.title), fts_tokens(new.summary), '');
+    END""",
+    'crawl_result_fts_update': """CREATE TRIGGER crawl_result_fts_update AFTER UPDATE OF keyword, title, summary ON crawl_result BEGIN
+        UPDATE crawl_result_fts
+        SET keyword = fts_tokens(new.keyword), title = fts_tokens(new.title), summary = fts_tokens(new.summary)
+        WHERE rowid = new.id;
+    END""",
+    'crawl_result_fts_delete': """CREATE TRIGGER crawl_result_fts_delete AFTER DELETE ON crawl_result BEGIN
+        DELETE FROM crawl_result_fts WHERE rowid = old.id;
+    END""",
+    'depth_crawl_result_fts_insert': """CREATE TRIGGER depth_crawl_result_fts_insert AFTER INSERT ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = fts_tokens(new.content) WHERE rowid = new.crawl_result_id;
+    END""",
+    'depth_crawl_result_fts_update': """CREATE TRIGGER depth_crawl_result_fts_update AFTER UPDATE OF content, crawl_result_id ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = '' WHERE rowid = old.crawl_result_id AND old.crawl_result_id != new.crawl_result_id;
+        UPDATE crawl_result_fts SET content = fts_tokens(new.content) WHERE rowid = new.crawl_result_id;
+    END""",
+    'depth_crawl_result_fts_delete': """CREATE TRIGGER depth_crawl_result_fts_delete AFTER DELETE ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = '' WHERE rowid = old.crawl_result_id;
+    END""",
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("""CREATE VIRTUAL TABLE crawl_result_fts USING fts5(
+        keyword, title, summary, content, tokenize='unicode61'
+    )""")
+    for statement in TRIGGERS.values():
+        op.execute(statement)
+
+    # 回填现有数据
+    op.execute("""INSERT INTO crawl_result_fts(rowid, keyword, title, summary, content)
+        SELECT c.id, fts_tokens(c.keyword), fts_tokens(c.title), fts_tokens(c.summary),
+               fts_tokens((SELECT d.content FROM depth_crawl_result d
+                           WHERE d.crawl_result_id = c.id ORDER BY d.id DESC LIMIT 1))
+        FROM crawl_result c""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for name in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.execute('DROP TABLE IF EXISTS crawl_result_fts')
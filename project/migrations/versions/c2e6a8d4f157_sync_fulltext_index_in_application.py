@@ -0,0 +1,99 @@
+"""Sync full-text index in application
+
+Revision ID: c2e6a8d4f157
+Revises: a7d3f5b8c162
+Create Date: 2026-10-19 10:27:53.184620
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2e6a8d4f157'
+down_revision = 'a7d3f5b8c162'
+branch_labels = None
+depends_on = None
+
+
+# 新的触发器只使用SQLite内置SQL，把需要重新分词的采集结果ID记入待同步表，由应用分词后写入索引
+TRIGGERS = {
+    'crawl_result_fts_insert': """CREATE TRIGGER crawl_result_fts_insert AFTER INSERT ON crawl_result BEGIN
+        INSERT OR IGNORE INTO crawl_result_fts_pending(crawl_result_id) VALUES (new.id);
+    END""",
+    'crawl_result_fts_update': """CREATE TRIGGER crawl_result_fts_update AFTER UPDATE OF keyword, title, summary ON crawl_result BEGIN
+        INSERT OR IGNORE INTO crawl_result_fts_pending(crawl_result_id) VALUES (new.id);
+    END""",
+    'crawl_result_fts_delete': """CREATE TRIGGER crawl_result_fts_delete AFTER DELETE ON crawl_result BEGIN
+        DELETE FROM crawl_result_fts WHERE rowid = old.id;
+        DELETE FROM crawl_result_fts_pending WHERE crawl_result_id = old.id;
+    END""",
+    'depth_crawl_result_fts_insert': """CREATE TRIGGER depth_crawl_result_fts_insert AFTER INSERT ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO crawl_result_fts_pending(crawl_result_id)
+        SELECT new.crawl_result_id WHERE new.crawl_result_id IS NOT NULL;
+    END""",
+    'depth_crawl_result_fts_update': """CREATE TRIGGER depth_crawl_result_fts_update AFTER UPDATE OF content, crawl_result_id ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO crawl_result_fts_pending(crawl_result_id)
+        SELECT old.crawl_result_id WHERE old.crawl_result_id IS NOT NULL
+        UNION SELECT new.crawl_result_id WHERE new.crawl_result_id IS NOT NULL;
+    END""",
+    'depth_crawl_result_fts_delete': """CREATE TRIGGER depth_crawl_result_fts_delete AFTER DELETE ON depth_crawl_result BEGIN
+        INSERT OR IGNORE INTO crawl_result_fts_pending(crawl_result_id)
+        SELECT old.crawl_result_id WHERE old.crawl_result_id IS NOT NULL;
+    END""",
+}
+
+# 修订b71e3f0c5a92的触发器，调用应用在SQLite连接上注册的fts_tokens分词函数
+OLD_TRIGGERS = {
+    'crawl_result_fts_insert': """CREATE TRIGGER crawl_result_fts_insert AFTER INSERT ON crawl_result BEGIN
+        INSERT INTO crawl_result_fts(rowid, keyword, title, summary, content)
+        VALUES (new.id, fts_tokens(new.keyword), fts_tokens(new.title), fts_tokens(new.summary), '');
+    END""",
+    'crawl_result_fts_update': """CREATE TRIGGER crawl_result_fts_update AFTER UPDATE OF keyword, title, summary ON crawl_result BEGIN
+        UPDATE crawl_result_fts
+        SET keyword = fts_tokens(new.keyword), title = fts_tokens(new.title), summary = fts_tokens(new.summary)
+        WHERE rowid = new.id;
+    END""",
+    'crawl_result_fts_delete': """CREATE TRIGGER crawl_result_fts_delete AFTER DELETE ON crawl_result BEGIN
+        DELETE FROM crawl_result_fts WHERE rowid = old.id;
+    END""",
+    'depth_crawl_result_fts_insert': """CREATE TRIGGER depth_crawl_result_fts_insert AFTER INSERT ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = fts_tokens(new.content) WHERE rowid = new.crawl_result_id;
+    END""",
+    'depth_crawl_result_fts_update': """CREATE TRIGGER depth_crawl_result_fts_update AFTER UPDATE OF content, crawl_result_id ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = '' WHERE rowid = old.crawl_result_id AND old.crawl_result_id != new.crawl_result_id;
+        UPDATE crawl_result_fts SET content = fts_tokens(new.content) WHERE rowid = new.crawl_result_id;
+    END""",
+    'depth_crawl_result_fts_delete': """CREATE TRIGGER depth_crawl_result_fts_delete AFTER DELETE ON depth_crawl_result BEGIN
+        UPDATE crawl_result_fts SET content = '' WHERE rowid = old.crawl_result_id;
+    END""",
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    # 索引内容已由旧触发器维护，不需要回填
+    op.execute('CREATE TABLE crawl_result_fts_pending (crawl_result_id INTEGER PRIMARY KEY)')
+    for name, statement in TRIGGERS.items():
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute(statement)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for name, statement in OLD_TRIGGERS.items():
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+        op.execute(statement)
+
+    # 旧触发器在写入时直接分词，先把尚未同步的记录写入索引
+    op.execute("DELETE FROM crawl_result_fts WHERE rowid IN (SELECT crawl_result_id FROM crawl_result_fts_pending)")
+    op.execute("""INSERT INTO crawl_result_fts(rowid, keyword, title, summary, content)
+        SELECT c.id, fts_tokens(c.keyword), fts_tokens(c.title), fts_tokens(c.summary),
+               fts_tokens((SELECT d.content FROM depth_crawl_result d
+                           WHERE d.crawl_result_id = c.id ORDER BY d.id DESC LIMIT 1))
+        FROM crawl_result c WHERE c.id IN (SELECT crawl_result_id FROM crawl_result_fts_pending)""")
+    op.execute('DROP TABLE crawl_result_fts_pending')
@@ -0,0 +1,33 @@
+"""Add http cache table for conditional detail crawls
+
+Revision ID: c8e2f4a6b913
+Revises: a4c7e1f28d39
+Create Date: 2026-10-19 01:06:48.215530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8e2f4a6b913'
+down_revision = 'a4c7e1f28d39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('http_cache',
+    sa.Column('url_hash', sa.String(length=40), nullable=False, comment='URL指纹（规范化URL的SHA-1）'),
+    sa.Column('url', sa.Text(), nullable=False, comment='页面URL'),
+    sa.Column('etag', sa.String(length=255), nullable=True, comment='响应头ETag'),
+    sa.Column('last_modified', sa.String(length=64), nullable=True, comment='响应头Last-Modified'),
+    sa.Column('body', sa.LargeBinary(), nullable=True, comment='zlib压缩的页面内容'),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False, comment='最近一次下载页面的时间'),
+    sa.Column('validated_at', sa.DateTime(), nullable=False, comment='最近一次确认页面未变化的时间'),
+    sa.PrimaryKeyConstraint('url_hash')
+    )
+
+
+def downgrade():
+    op.drop_table('http_cache')
@@ -0,0 +1,40 @@
+"""Add crawl result indexes
+
+Revision ID: d2c85a7e1f46
+Revises: b71e3f0c5a92
+Create Date: 2026-10-18 18:40:51.203877
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c85a7e1f46'
+down_revision = 'b71e3f0c5a92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('crawl_result', schema=None) as batch_op:
+        batch_op.create_index('ix_crawl_result_created_at', ['created_at'], unique=False)
+        batch_op.create_index('ix_crawl_result_source_created_at', ['source', 'created_at'], unique=False)
+        batch_op.create_index('ix_crawl_result_keyword', ['keyword'], unique=False)
+        batch_op.create_index('ix_crawl_result_depth_crawled_created_at', ['depth_crawled', 'created_at'], unique=False)
+        batch_op.create_index('ix_crawl_result_is_stored_created_at', ['is_stored', 'created_at'], unique=False)
+
+    with op.batch_alter_table('depth_crawl_result', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_depth_crawl_result_crawl_result_id'), ['crawl_result_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('depth_crawl_result', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_depth_crawl_result_crawl_result_id'))
+
+    with op.batch_alter_table('crawl_result', schema=None) as batch_op:
+        batch_op.drop_index('ix_crawl_result_is_stored_created_at')
+        batch_op.drop_index('ix_crawl_result_depth_crawled_created_at')
+        batch_op.drop_index('ix_crawl_result_keyword')
+        batch_op.drop_index('ix_crawl_result_source_created_at')
+        batch_op.drop_index('ix_crawl_result_created_at')
@@ -0,0 +1,77 @@
+"""Add depth crawl result content fingerprint
+
+Revision ID: d9a1b3c5e742
+Revises: c8e2f4a6b913
+Create Date: 2026-10-19 02:21:13.640277
+
+"""
+import hashlib
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a1b3c5e742'
+down_revision = 'c8e2f4a6b913'
+branch_labels = None
+depends_on = None
+
+
+def load_json(value, default):
+    try:
+        return json.loads(value) if value else default
+    except ValueError:
+        return default
+
+
+def content_fingerprint(detailed_content):
+    # 迁移编写时app.crawler.http_cache.content_fingerprint的副本，之后应用代码的修改不影响本迁移
+    canonical = json.dumps([
+        detailed_content.get('content') or '',
+        sorted(detailed_content.get('images') or []),
+        sorted(detailed_content.get('videos') or []),
+        detailed_content.get('links') or [],
+        detailed_content.get('meta_data') or {},
+    ], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    # 不使用batch模式，避免SQLite重建表时丢失表上已有的触发器
+    op.add_column('depth_crawl_result', sa.Column('content_hash', sa.String(length=40), nullable=True, comment='提取内容的指纹，用于重新采集时判断内容是否变化'))
+    op.add_column('depth_crawl_result', sa.Column('last_verified_at', sa.DateTime(), nullable=True, comment='最近一次重新采集确认内容的时间'))
+
+    # 按批回填现有记录的内容指纹
+    table = sa.table('depth_crawl_result', sa.column('id', sa.Integer), sa.column('content_hash', sa.String),
+                     *[sa.column(name, sa.Text) for name in ('content', 'images', 'videos', 'links', 'meta_data')])
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.content, table.c.images, table.c.videos, table.c.links, table.c.meta_data)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(500)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id'))
+            .values(content_hash=sa.bindparam('fingerprint')),
+            [{
+                'row_id': row.id,
+                'fingerprint': content_fingerprint({
+                    'content': row.content,
+                    'images': load_json(row.images, []),
+                    'videos': load_json(row.videos, []),
+                    'links': load_json(row.links, []),
+                    'meta_data': load_json(row.meta_data, {})
+                })
+            } for row in rows]
+        )
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_column('depth_crawl_result', 'last_verified_at')
+    op.drop_column('depth_crawl_result', 'content_hash')
@@ -0,0 +1,26 @@
+"""Add rate limit to site rules
+
+Revision ID: e4b7c9d2a158
+Revises: d9a1b3c5e742
+Create Date: 2026-10-19 03:37:52.904416
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c9d2a158'
+down_revision = 'd9a1b3c5e742'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('site_rules', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rate_limit', sa.Float(), nullable=True, comment='站点每秒请求数上限（为空时使用爬虫配置）'))
+
+
+def downgrade():
+    with op.batch_alter_table('site_rules', schema=None) as batch_op:
+        batch_op.drop_column('rate_limit')
@@ -0,0 +1,74 @@
+"""Add crawl result daily stats rollup
+
+Revision ID: e5f19b3c7d28
+Revises: d2c85a7e1f46
+Create Date: 2026-10-18 20:13:36.582104
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f19b3c7d28'
+down_revision = 'd2c85a7e1f46'
+branch_labels = None
+depends_on = None
+
+
+ADD_ROW = """INSERT INTO crawl_result_daily_stats(stat_date, keyword, total_count, depth_crawled_count, stored_count)
+        VALUES (date(new.created_at), new.keyword, 1, coalesce(new.depth_crawled, 0) != 0, coalesce(new.is_stored, 0) != 0)
+        ON CONFLICT(stat_date, keyword) DO UPDATE SET
+            total_count = total_count + 1,
+            depth_crawled_count = depth_crawled_count + excluded.depth_crawled_count,
+            stored_count = stored_count + excluded.stored_count;"""
+REMOVE_ROW = """UPDATE crawl_result_daily_stats SET
+            total_count = total_count - 1,
+            depth_crawled_count = depth_crawled_count - (coalesce(old.depth_crawled, 0) != 0),
+            stored_count = stored_count - (coalesce(old.is_stored, 0) != 0)
+        WHERE stat_date = date(old.created_at) AND keyword = old.keyword;
+        DELETE FROM crawl_result_daily_stats WHERE stat_date = date(old.created_at) AND keyword = old.keyword AND total_count <= 0;"""
+
+TRIGGERS = {
+    'crawl_result_stats_insert': f"""CREATE TRIGGER crawl_result_stats_insert AFTER INSERT ON crawl_result BEGIN
+        {ADD_ROW}
+    END""",
+    'crawl_result_stats_update': f"""CREATE TRIGGER crawl_result_stats_update
+    AFTER UPDATE OF keyword, created_at, depth_crawled, is_stored ON crawl_result BEGIN
+        {REMOVE_ROW}
+        {ADD_ROW}
+    END""",
+    'crawl_result_stats_delete': f"""CREATE TRIGGER crawl_result_stats_delete AFTER DELETE ON crawl_result BEGIN
+        {REMOVE_ROW}
+    END""",
+}
+
+
+def upgrade():
+    op.create_table('crawl_result_daily_stats',
+    sa.Column('stat_date', sa.Date(), nullable=False, comment='统计日期(UTC)'),
+    sa.Column('keyword', sa.String(length=100), nullable=False, comment='采集关键词'),
+    sa.Column('total_count', sa.Integer(), nullable=False, comment='采集数量'),
+    sa.Column('depth_crawled_count', sa.Integer(), nullable=False, comment='已深度采集数量'),
+    sa.Column('stored_count', sa.Integer(), nullable=False, comment='已存储数量'),
+    sa.PrimaryKeyConstraint('stat_date', 'keyword')
+    )
+
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for statement in TRIGGERS.values():
+        op.execute(statement)
+
+    # 回填现有数据
+    op.execute("""INSERT INTO crawl_result_daily_stats(stat_date, keyword, total_count, depth_crawled_count, stored_count)
+        SELECT date(created_at), keyword, COUNT(*),
+               SUM(coalesce(depth_crawled, 0) != 0), SUM(coalesce(is_stored, 0) != 0)
+        FROM crawl_result GROUP BY date(created_at), keyword""")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for name in TRIGGERS:
+            op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('crawl_result_daily_stats')
@@ -0,0 +1,146 @@
+"""Compress large text columns
+
+Revision ID: f1c3e5a7b924
+Revises: e4b7c9d2a158
+Create Date: 2026-10-19 05:12:40.738215
+
+"""
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c3e5a7b924'
+down_revision = 'e4b7c9d2a158'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = {
+    'depth_crawl_result': ['content', 'links', 'meta_data'],
+    'crawler_results': ['response_body'],
+    'crawl_result': ['raw_data'],
+}
+BATCH_SIZE = 500
+
+# 迁移时的压缩格式（冻结自app.compression）：格式标记和预置字典写入后不能修改，
+# 应用代码以后增加新格式时，本迁移仍按这里的格式读写
+FORMAT_RAW = b'\x01'
+FORMAT_ZLIB = b'\x02'
+FORMAT_ZLIB_DICT = b'\x03'
+MIN_COMPRESS_SIZE = 64
+COMPRESS_LEVEL = 6
+PRESET_DICTIONARY = ''.join([
+    '<div class="content"><p></p></div><br/>&nbsp;',
+    'width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no',
+    'text/html; charset=utf-8', 'IE=edge,chrome=1', 'renderer', 'webkit', 'format-detection', 'telephone=no',
+    '"og:title": "', '"og:description": "', '"og:url": "', '"og:image": "', '"og:type": "article"',
+    '"author": "', '"publishdate": "', '"ContentSource": "', '"source": "', '"applicable-device": "pc,mobile"',
+    '"viewport": "', '"X-UA-Compatible": "IE=edge", "referrer": "always", ',
+    '"keywords": "', '"description": "',
+    '.html', '.shtml', '.htm', '.jpg', '.png', '.gif', '.js', '.css',
+    'index', 'detail', 'article', 'content', 'news', 'list', 'static',
+    '.gov.cn/', '.com.cn/', '.org.cn/', '.net/', '.cn/', '.com/',
+    'http://www.news.cn/', 'http://www.xinhuanet.com/', 'https://www.xinhuanet.com/',
+    'https://baijiahao.baidu.com/s?id=', 'http://www.baidu.com/link?url=', 'https://www.baidu.com/s?',
+    'https://www.bing.com/ck/a?', 'https://www.', 'http://www.',
+    '\\u897f\\u660c', '\\u51c9\\u5c71', '\\u65b0\\u95fb', '\\u9996\\u9875', '\\u66f4\\u591a',
+    '西昌市', '凉山州', '凉山彝族自治州', '四川省', '记者', '通讯员', '来源：', '责任编辑：', '编辑：', '发布时间：',
+    '新华社', '新华网', '人民网', '央视网', '中国', '发展', '工作', '建设', '项目', '活动', '群众', '全国', '我们',
+    '年', '月', '日', '的', '了', '和', '在', '是', '，', '。', '、', '：', '“', '”', '（', '）',
+    '", "cover": "', '", "source": "', '", "summary": "', '", "original_url": "', '{"title": "',
+    '"}, {"text": "', '", "href": "https://', '", "href": "http://', '[{"text": "',
+]).encode('utf-8')
+
+
+def compress_text(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value
+    data = value.encode('utf-8')
+    if len(data) >= MIN_COMPRESS_SIZE:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zdict=PRESET_DICTIONARY)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < len(data):
+            return FORMAT_ZLIB_DICT + compressed
+    return FORMAT_RAW + data
+
+
+def decompress_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    marker, data = value[:1], value[1:]
+    if marker == FORMAT_RAW:
+        return data.decode('utf-8')
+    if marker == FORMAT_ZLIB_DICT:
+        decompressor = zlib.decompressobj(zdict=PRESET_DICTIONARY)
+        return (decompressor.decompress(data) + decompressor.flush()).decode('utf-8')
+    if marker == FORMAT_ZLIB:
+        return zlib.decompress(data).decode('utf-8')
+    return value.decode('utf-8', 'ignore')
+
+
+def rewrite(connection, table_name, columns, convert):
+    """按批读取各列的原始值，转换后写回"""
+    table = sa.table(table_name, sa.column('id', sa.Integer), *[sa.column(name) for name in columns])
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(table.c.id, *[table.c[name] for name in columns])
+            .where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            table.update().where(table.c.id == sa.bindparam('row_id'))
+            .values({name: sa.bindparam(f'new_{name}') for name in columns}),
+            [dict(row_id=row[0], **{f'new_{name}': convert(value) for name, value in zip(columns, row[1:])})
+             for row in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def alter_types(to_binary):
+    """非SQLite数据库修改列类型（SQLite按值保存类型，不修改列以免重建表丢失触发器）"""
+    dialect = op.get_bind().dialect.name
+    for table_name, columns in COLUMNS.items():
+        for name in columns:
+            kwargs = {}
+            if dialect == 'postgresql':
+                kwargs['postgresql_using'] = (
+                    f"convert_to({name}, 'UTF8')" if to_binary else f"convert_from({name}, 'UTF8')"
+                )
+            op.alter_column(
+                table_name, name,
+                type_=sa.LargeBinary(length=2 ** 32 - 1) if to_binary else sa.Text(),
+                existing_nullable=True, **kwargs
+            )
+
+
+def upgrade():
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    if not is_sqlite:
+        alter_types(to_binary=True)
+    connection = op.get_bind()
+    for table_name, columns in COLUMNS.items():
+        rewrite(connection, table_name, columns, lambda value: compress_text(decompress_text(value)))
+
+
+def downgrade():
+    is_sqlite = op.get_bind().dialect.name == 'sqlite'
+    connection = op.get_bind()
+
+    def convert(value):
+        value = decompress_text(value)
+        if value is None or is_sqlite:
+            return value
+        return value.encode('utf-8')
+
+    for table_name, columns in COLUMNS.items():
+        rewrite(connection, table_name, columns, convert)
+    if not is_sqlite:
+        alter_types(to_binary=False)
@@ -0,0 +1,105 @@
+"""Add crawl result url hash
+
+Revision ID: f3a6c9e2b715
+Revises: e5f19b3c7d28
+Create Date: 2026-10-18 22:31:48.915236
+
+"""
+import hashlib
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a6c9e2b715'
+down_revision = 'e5f19b3c7d28'
+branch_labels = None
+depends_on = None
+
+# 迁移时的URL规范化规则（冻结自app.crawler.urls）：应用代码以后修改规则时，本迁移回填的指纹保持不变
+TRACKING_PARAMS = {'spm', 'gclid', 'fbclid'}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if url.startswith('//'):
+        url = 'http:' + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{host}:{port}'
+
+    path = parts.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    if scheme == 'https':
+        scheme = 'http'
+    return urlunsplit((scheme, netloc, path, urlencode(query), ''))
+
+
+def url_fingerprint(url):
+    normalized = normalize_url(url)
+    if not normalized:
+        return None
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    with op.batch_alter_table('crawl_result', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('url_hash', sa.String(length=40), nullable=True, comment='规范化URL的SHA-1指纹，用于去重'))
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True, comment='最后一次采集到的时间'))
+
+    # 回填指纹：已有的重复URL只有最早的一条写入指纹，其余保留为空，不删除历史数据
+    connection = op.get_bind()
+    crawl_result = sa.table('crawl_result', sa.column('id', sa.Integer), sa.column('original_url', sa.String),
+                            sa.column('created_at', sa.DateTime), sa.column('url_hash', sa.String),
+                            sa.column('last_seen_at', sa.DateTime))
+    seen = set()
+    updates = []
+    rows = connection.execute(
+        sa.select(crawl_result.c.id, crawl_result.c.original_url, crawl_result.c.created_at).order_by(crawl_result.c.id)
+    )
+    for row_id, original_url, created_at in rows:
+        url_hash = url_fingerprint(original_url)
+        if url_hash in seen:
+            url_hash = None
+        elif url_hash:
+            seen.add(url_hash)
+        updates.append({'row_id': row_id, 'url_hash': url_hash, 'last_seen_at': created_at})
+    if updates:
+        connection.execute(
+            crawl_result.update().where(crawl_result.c.id == sa.bindparam('row_id')).values(
+                url_hash=sa.bindparam('url_hash'), last_seen_at=sa.bindparam('last_seen_at')
+            ),
+            updates
+        )
+
+    with op.batch_alter_table('crawl_result', schema=None) as batch_op:
+        batch_op.create_index('ix_crawl_result_url_hash', ['url_hash'], unique=True)
+
+
+def downgrade():
+    # 不使用batch模式：SQLite下batch删除列会重建crawl_result表，表上的全文索引和统计触发器会一并丢失
+    op.drop_index('ix_crawl_result_url_hash', table_name='crawl_result')
+    op.drop_column('crawl_result', 'last_seen_at')
+    op.drop_column('crawl_result', 'url_hash')
@@ -0,0 +1,20 @@
+import pytest
+
+from app import create_app, db
+
+
+class CrawlerTestConfig:
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """使用临时SQLite数据库创建应用"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'crawler.db'}")
+    app = create_app(CrawlerTestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from app.crawler.breaker import CircuitBreaker, CircuitOpenError
+from app.crawler.config import CrawlerConfig
+
+
+def test_circuit_opens_after_consecutive_failures_and_half_opens():
+    """测试连续失败后熔断，熔断期过后只放行一个试探请求"""
+    breaker = CircuitBreaker()
+    config = CrawlerConfig(breaker_threshold=3, breaker_reset=0.05)
+    url = 'http://dead.example.com/a'
+    for _ in range(3):
+        breaker.before_request(url, config)
+        breaker.record(url, False, config)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(url, config)
+    breaker.before_request('http://alive.example.com/', config)
+
+    time.sleep(0.06)
+    breaker.before_request(url, config)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request(url, config)
+    assert breaker.stats()['dead.example.com']['state'] == 'half_open'
+
+    # 试探失败重新熔断，成功后恢复
+    breaker.record(url, False, config)
+    assert breaker.stats()['dead.example.com']['state'] == 'open'
+    time.sleep(0.06)
+    breaker.before_request(url, config)
+    breaker.record(url, True, config)
+    breaker.before_request(url, config)
+    stats = breaker.stats()['dead.example.com']
+    assert stats['state'] == 'closed' and stats['trips'] == 2 and stats['rejected'] == 2
+
+
+def test_success_resets_failure_count():
+    """测试失败次数在成功后清零"""
+    breaker = CircuitBreaker()
+    config = CrawlerConfig(breaker_threshold=2)
+    url = 'http://example.com/'
+    breaker.record(url, False, config)
+    breaker.record(url, True, config)
+    breaker.record(url, False, config)
+    breaker.before_request(url, config)
+    assert breaker.stats()['example.com']['failures'] == 1
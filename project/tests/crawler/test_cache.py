@@ -0,0 +1,89 @@
+import time
+
+from app.crawler.cache import ResultCache
+
+
+def counting_fetch(results):
+    """返回固定结果并记录调用次数的抓取函数"""
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return list(results)
+    return fetch, calls
+
+
+def test_cache_hit_and_empty_results():
+    """测试有效期内命中缓存，空结果不缓存"""
+    cache = ResultCache(ttl={'baidu': 60})
+    fetch, calls = counting_fetch([{'title': 'a'}])
+    assert cache.get_or_fetch('baidu', ('西昌', 0, None), fetch) == [{'title': 'a'}]
+    assert cache.get_or_fetch('baidu', ('西昌', 0, None), fetch) == [{'title': 'a'}]
+    assert len(calls) == 1
+
+    empty, empty_calls = counting_fetch([])
+    cache.get_or_fetch('baidu', ('凉山', 0, None), empty)
+    cache.get_or_fetch('baidu', ('凉山', 0, None), empty)
+    assert len(empty_calls) == 2
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 3
+    assert stats['hit_ratio'] == 0.25
+
+
+def test_callers_cannot_modify_cached_results():
+    """测试修改抓取结果或命中返回的结果都不影响缓存"""
+    cache = ResultCache(ttl={'baidu': 60})
+    fetch, _ = counting_fetch([{'title': 'a'}])
+    first = cache.get_or_fetch('baidu', ('西昌', 0, None), fetch)
+    first[0]['title'] = '已修改'
+    first.append({'title': 'b'})
+
+    second = cache.get_or_fetch('baidu', ('西昌', 0, None), fetch)
+    assert second == [{'title': 'a'}]
+    second[0]['source'] = 'baidu'
+    assert cache.get_or_fetch('baidu', ('西昌', 0, None), fetch) == [{'title': 'a'}]
+
+
+def test_stale_while_revalidate():
+    """测试过期后先返回旧结果并在后台刷新"""
+    cache = ResultCache(ttl={'bing': 0.05}, stale=60)
+    old, _ = counting_fetch([{'title': 'old'}])
+    cache.get_or_fetch('bing', ('西昌', 0, 10), old)
+    time.sleep(0.1)
+
+    new, calls = counting_fetch([{'title': 'new'}])
+    assert cache.get_or_fetch('bing', ('西昌', 0, 10), new) == [{'title': 'old'}]
+    deadline = time.time() + 2
+    while cache.get_or_fetch('bing', ('西昌', 0, 10), new) != [{'title': 'new'}]:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    assert len(calls) == 1
+    assert cache.stats()['refreshes'] == 1
+
+
+def test_persistent_tier_is_shared(tmp_path):
+    """测试持久层在多个缓存实例（工作进程）之间共享"""
+    path = str(tmp_path / 'crawl_cache.db')
+    first = ResultCache(ttl={'xinhua': 60}, path=path)
+    first._init_store()
+    fetch, calls = counting_fetch([{'title': '新华'}])
+    first.get_or_fetch('xinhua', ('西昌', 0, 20), fetch)
+
+    second = ResultCache(ttl={'xinhua': 60}, path=path)
+    assert second.get_or_fetch('xinhua', ('西昌', 0, 20), fetch) == [{'title': '新华'}]
+    assert len(calls) == 1
+    assert second.stats()['persistent_hits'] == 1
+
+
+def test_lru_eviction_and_uncached_sources():
+    """测试超过容量时淘汰最久未使用的条目，未配置有效期的数据源不缓存"""
+    cache = ResultCache(ttl={'baidu': 60}, max_entries=2)
+    for keyword in ('a', 'b', 'c'):
+        cache.get_or_fetch('baidu', (keyword, 0, None), counting_fetch([{'title': keyword}])[0])
+    assert cache.stats()['entries'] == 2
+
+    fetch, calls = counting_fetch([{'title': 'x'}])
+    cache.get_or_fetch('other', ('a', 0, None), fetch)
+    cache.get_or_fetch('other', ('a', 0, None), fetch)
+    assert len(calls) == 2
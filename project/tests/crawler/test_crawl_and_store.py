@@ -0,0 +1,25 @@
+from app import db
+from app.crawler import admin_routes
+from app.models import CrawlResult
+
+
+def search_result(path, title):
+    return {'title': title, 'summary': '', 'cover': '', 'original_url': f'http://news.example.com/{path}',
+            'source': 'baidu'}
+
+
+def test_crawl_reports_state_of_existing_results(app, monkeypatch):
+    """测试再次采集到已深度采集的URL时返回已有记录的状态"""
+    existing_id, = CrawlResult.upsert_rows([CrawlResult.build_row(search_result('a.html', '西昌新闻'), keyword='西昌')])
+    CrawlResult.query.filter_by(id=existing_id).update({'depth_crawled': True, 'is_stored': True})
+    db.session.commit()
+    monkeypatch.setattr(admin_routes, 'crawl_data', lambda keyword, **kwargs: [
+        search_result('a.html', '西昌新闻'), search_result('b.html', '凉山新闻')
+    ])
+
+    response = app.test_client().post('/admin/api/crawl', data={'keyword': '西昌', 'source': 'baidu'}).get_json()
+
+    assert response['success'], response
+    assert [(item['id'] == existing_id, item['depth_crawled'], item['is_stored']) for item in response['results']] == [
+        (True, True, True), (False, False, False)
+    ]
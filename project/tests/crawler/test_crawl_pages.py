@@ -0,0 +1,68 @@
+import threading
+import time
+
+from app.crawler import crawler
+from app.crawler.config import CrawlerConfig
+
+
+def fake_pages(page_sizes, delay=0.02):
+    """按页码返回指定数量结果的crawl_data替身，记录被请求的页码和最大并发数"""
+    requested = []
+    lock = threading.Lock()
+    state = {'active': 0, 'peak': 0}
+
+    def crawl_data(keyword, source='baidu', page=1, limit=20, config=None):
+        with lock:
+            requested.append(page)
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        # 靠前的页响应更慢，验证结果仍按页码排序
+        time.sleep(delay * (6 - page))
+        with lock:
+            state['active'] -= 1
+        return [{'title': f'{page}-{i}'} for i in range(page_sizes.get(page, 0))]
+
+    return crawl_data, requested, state
+
+
+def test_estimate_pages():
+    """测试按数据源估算页数"""
+    assert crawler.estimate_pages('baidu', 25) == 3
+    assert crawler.estimate_pages('bing', 100, CrawlerConfig(max_results=10)) == 5
+    assert crawler.estimate_pages('xinhua', 50) == 1
+
+
+def test_crawl_pages_concurrent_in_page_order(monkeypatch):
+    """测试并发采集的结果按页码顺序拼接，取得足够结果后不再请求后续页"""
+    fake, requested, state = fake_pages({1: 10, 2: 10, 3: 10, 4: 10, 5: 10})
+    monkeypatch.setattr(crawler, 'crawl_data', fake)
+
+    results = crawler.crawl_pages('西昌', source='bing', limit=20)
+
+    assert [item['title'] for item in results] == [f'1-{i}' for i in range(10)] + [f'2-{i}' for i in range(10)]
+    assert state['peak'] == 3
+    assert sorted(requested) == [1, 2, 3]
+
+
+def test_crawl_pages_stops_at_empty_page(monkeypatch):
+    """测试某页没有结果时停止，与逐页采集结果一致"""
+    fake, requested, _ = fake_pages({1: 10, 2: 4}, delay=0.001)
+    monkeypatch.setattr(crawler, 'crawl_data', fake)
+
+    concurrent = crawler.crawl_pages('西昌', source='baidu', limit=50)
+    sequential = crawler.crawl_pages('西昌', source='baidu', limit=50, concurrent=False)
+
+    assert len(concurrent) == 14
+    assert concurrent == sequential
+
+
+def test_crawl_pages_fetches_single_page_source_once(monkeypatch):
+    """测试没有真正分页的数据源只请求一次"""
+    fake, requested, _ = fake_pages({1: 3, 2: 3, 3: 3}, delay=0)
+    monkeypatch.setattr(crawler, 'crawl_data', fake)
+
+    for concurrent in (True, False):
+        requested.clear()
+        results = crawler.crawl_pages('西昌', source='xinhua', limit=10, concurrent=concurrent)
+        assert [item['title'] for item in results] == ['1-0', '1-1', '1-2']
+        assert requested == [1]
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import Counter
+
+from app.crawler.executor import BoundedExecutor, get_host
+
+
+def test_map_keeps_input_order_and_captures_errors():
+    """测试结果按输入顺序返回，异常不影响其他任务"""
+    def work(url):
+        if url.endswith('/bad'):
+            raise ValueError('bad page')
+        time.sleep(0.01)
+        return url.upper()
+
+    urls = ['http://a.com/1', 'http://b.com/bad', 'http://a.com/2', 'http://c.com/3']
+    outcomes = BoundedExecutor(max_workers=4, max_per_host=1).map(work, urls)
+
+    assert [result for result, _ in outcomes] == ['HTTP://A.COM/1', None, 'HTTP://A.COM/2', 'HTTP://C.COM/3']
+    assert isinstance(outcomes[1][1], ValueError)
+
+
+def test_map_respects_per_host_limit():
+    """测试单个主机的并发数不超过上限"""
+    lock = threading.Lock()
+    active = Counter()
+    peak = Counter()
+
+    def work(url):
+        host = get_host(url)
+        with lock:
+            active[host] += 1
+            peak[host] = max(peak[host], active[host])
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        return host
+
+    urls = [f'http://news.cn/{i}' for i in range(10)] + [f'http://bing.com/{i}' for i in range(10)]
+    BoundedExecutor(max_workers=8, max_per_host=2).map(work, urls)
+
+    assert peak['news.cn'] <= 2
+    assert peak['bing.com'] <= 2
+
+
+def test_imap_yields_in_order_and_stops_early():
+    """测试imap按输入顺序产出，停止迭代后不再派发剩余任务"""
+    started = []
+
+    def work(page):
+        started.append(page)
+        time.sleep(0.03 if page == 1 else 0.01)
+        return page
+
+    outcomes = BoundedExecutor(max_workers=2, max_per_host=2).imap(work, range(1, 9), url_getter=lambda page: 'bing.com')
+    assert [next(outcomes)[0], next(outcomes)[0]] == [1, 2]
+    outcomes.close()
+    time.sleep(0.05)
+
+    assert len(started) < 8
@@ -0,0 +1,49 @@
+import time
+
+from app.crawler.crawler import federated_search, merge_results, resolve_sources
+
+
+def result(title, url):
+    return {'title': title, 'summary': '', 'original_url': url, 'source': ''}
+
+
+def test_resolve_sources():
+    """测试解析数据源参数"""
+    assert resolve_sources('all') == ['baidu', 'bing', 'xinhua']
+    assert resolve_sources('bing, baidu,bing,google') == ['bing', 'baidu']
+    assert resolve_sources(['xinhua']) == ['xinhua']
+
+
+def test_merge_interleaves_and_deduplicates():
+    """测试按排名交替合并，URL或标题相同的结果只保留一条"""
+    merged = merge_results({
+        'baidu': [result('西昌火把节开幕', 'http://www.baidu.com/link?url=abc'), result('凉山新闻', 'http://a.com/2')],
+        'bing': [result('西昌 火把节开幕！', 'http://news.cn/1'), result('成都新闻', 'https://www.a.com/2/')],
+        'xinhua': [result('四川要闻', 'http://news.cn/1')],
+    }, ['baidu', 'bing', 'xinhua'])
+
+    assert [(item['title'], item['engines']) for item in merged] == [
+        ('西昌火把节开幕', ['baidu', 'bing', 'xinhua']),
+        ('凉山新闻', ['baidu', 'bing']),
+    ]
+
+
+def test_federated_search_returns_partial_results_on_timeout():
+    """测试慢数据源超时后返回其余数据源的结果，总耗时取决于最慢的数据源"""
+    delays = {'baidu': 0.1, 'bing': 0.15, 'xinhua': 2}
+
+    def crawl_source(source):
+        time.sleep(delays[source])
+        if source == 'bing':
+            raise RuntimeError('blocked')
+        return [result(f'{source}-{i}', f'http://{source}.com/{i}') for i in range(3)]
+
+    start = time.monotonic()
+    results, statuses = federated_search(crawl_source, ['baidu', 'bing', 'xinhua'], limit=10, timeout=0.3)
+    elapsed = time.monotonic() - start
+
+    assert [item['title'] for item in results] == ['baidu-0', 'baidu-1', 'baidu-2']
+    assert {source: status['status'] for source, status in statuses.items()} == {
+        'baidu': 'ok', 'bing': 'error', 'xinhua': 'timeout'
+    }
+    assert elapsed < 0.5
@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from app.crawler import fetcher
+from app.crawler.config import CrawlerConfig
+from app.crawler.fetcher import get_session, close_sessions
+
+
+def test_session_shared_for_same_pool_config():
+    """测试相同连接池配置复用同一个会话"""
+    close_sessions()
+    session1 = get_session(CrawlerConfig(timeout=5))
+    session2 = get_session(CrawlerConfig(timeout=30))
+    assert session1 is session2
+
+
+def test_session_pool_settings():
+    """测试会话按配置设置连接池大小和keep-alive"""
+    close_sessions()
+    config = CrawlerConfig(pool_connections=4, pool_maxsize=8, keep_alive=False)
+    session = get_session(config)
+    adapter = session.get_adapter('https://www.baidu.com')
+    assert adapter._pool_connections == 4
+    assert adapter._pool_maxsize == 8
+    assert session.headers['Connection'] == 'close'
+    assert get_session(CrawlerConfig()) is not session
+
+
+class FlakySession:
+    """按顺序返回预设结果（异常或状态码）的会话替身"""
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response._content = b'<html></html>'
+        response.url = url
+        return response
+
+
+def fast_config(**kwargs):
+    options = dict(retries=2, retry_backoff=0, rate_limit=0, host_rate_limits={}, breaker_threshold=0)
+    options.update(kwargs)
+    return CrawlerConfig(**options)
+
+
+def test_fetch_retries_transient_errors(monkeypatch):
+    """测试GET请求遇到超时和5xx时重试，POST请求不重试"""
+    session = FlakySession([requests.Timeout(), 502, 200])
+    monkeypatch.setattr(fetcher, 'get_session', lambda config: session)
+    assert fetcher.fetch('http://example.com/', config=fast_config()).status_code == 200
+    assert session.calls == 3
+
+    session = FlakySession([500, 500, 500])
+    monkeypatch.setattr(fetcher, 'get_session', lambda config: session)
+    assert fetcher.fetch('http://example.com/', config=fast_config()).status_code == 500
+    assert session.calls == 3
+
+    session = FlakySession([requests.ConnectionError()])
+    monkeypatch.setattr(fetcher, 'get_session', lambda config: session)
+    with pytest.raises(requests.ConnectionError):
+        fetcher.fetch('http://example.com/', config=fast_config(), method='POST')
+    assert session.calls == 1
+
+
+def test_retry_delay_is_capped_and_jittered():
+    """测试重试间隔在指数退避上限内随机分布"""
+    config = CrawlerConfig(retry_backoff=1, retry_backoff_max=4)
+    delays = [fetcher.retry_delay(5, config) for _ in range(50)]
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
@@ -0,0 +1,193 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.crawler import jobs
+from app.crawler.jobs import JobQueue, job_queue, wants_async
+from app.models import CrawlJob
+
+
+def reload_job(job_id):
+    """结束当前读事务，读取工作线程写入的任务状态"""
+    db.session.rollback()
+    return db.session.get(CrawlJob, job_id)
+
+
+def committed_progress(job_id):
+    """在独立连接中读取已提交的进度"""
+    with db.engine.connect() as connection:
+        return connection.execute(db.text('SELECT processed FROM crawl_jobs WHERE id = :id'), {'id': job_id}).scalar()
+
+
+def make_queue(app):
+    queue = JobQueue(num_workers=1)
+    queue.init_app(app)
+    return queue
+
+
+def test_job_completes_with_throttled_progress(app, monkeypatch):
+    """测试任务经过队列执行完成，进度写入按间隔节流，最后一次进度总会写入"""
+    monkeypatch.setattr(jobs, 'PROGRESS_INTERVAL', 60)
+    queue = make_queue(app)
+    seen = []
+
+    @queue.register('count')
+    def count(params, report):
+        for processed in range(1, params['total'] + 1):
+            report(processed, params['total'], f'已处理{processed}条')
+            seen.append(committed_progress(job_id))
+        return {'total': params['total']}
+
+    job = queue.submit('count', {'total': 4})
+    job_id = job.id
+    assert job.status == 'pending'
+    queue._queue.join()
+
+    job = reload_job(job_id)
+    assert seen == [1, 1, 1, 4]
+    assert job.status == 'completed'
+    assert job.progress == 100
+    assert job.get_result() == {'total': 4}
+    assert job.started_at and job.finished_at
+    assert job.message == '任务完成'
+
+
+def test_job_failure_rolls_back_and_records_error(app):
+    """测试处理函数抛出异常时回滚未提交的修改并记录错误"""
+    queue = make_queue(app)
+
+    @queue.register('broken')
+    def broken(params, report):
+        report(1, 2)
+        db.session.add(CrawlJob(job_type='leftover', status='pending'))
+        raise ValueError('页面解析失败')
+
+    job_id = queue.submit('broken', {}).id
+    queue._queue.join()
+
+    job = reload_job(job_id)
+    assert job.status == 'failed'
+    assert job.error_message == '页面解析失败'
+    assert job.finished_at is not None
+    assert job.get_result() is None
+    assert CrawlJob.query.filter_by(job_type='leftover').count() == 0
+
+
+def test_job_claimed_only_once(app):
+    """测试按状态条件更新认领任务，重复出队或已被其他进程认领的任务不再执行"""
+    queue = JobQueue()
+    queue.app = app
+    calls = []
+    queue.register('once')(lambda params, report: calls.append(1))
+
+    pending = CrawlJob(job_type='once', status='pending')
+    running = CrawlJob(job_type='once', status='running')
+    db.session.add_all([pending, running])
+    db.session.commit()
+
+    queue._run(pending.id)
+    queue._run(pending.id)
+    queue._run(running.id)
+
+    assert calls == [1]
+    assert reload_job(pending.id).status == 'completed'
+    assert reload_job(running.id).status == 'running'
+
+
+def test_submit_rejects_unknown_job_type(app):
+    """测试提交未注册的任务类型"""
+    with pytest.raises(ValueError):
+        JobQueue().submit('unknown', {})
+    assert CrawlJob.query.count() == 0
+
+
+def add_leftover_jobs():
+    """写入上次进程遗留的任务：中断的、其他进程正在执行的、等待中的"""
+    old = datetime.utcnow() - timedelta(minutes=10)
+    stale = CrawlJob(job_type='resume', status='running', started_at=old, updated_at=old)
+    recent = CrawlJob(job_type='resume', status='running', started_at=datetime.utcnow())
+    pending = CrawlJob(job_type='resume', status='pending')
+    db.session.add_all([stale, recent, pending])
+    db.session.commit()
+    return stale.id, recent.id, pending.id
+
+
+def test_recover_leftover_jobs(app):
+    """测试恢复时把长时间没有更新的执行中任务标记为失败，等待中的任务重新排队执行"""
+    stale_id, recent_id, pending_id = add_leftover_jobs()
+    queue = JobQueue(num_workers=1)
+    queue.register('resume')(lambda params, report: {'resumed': True})
+    queue.init_app(app)
+    assert queue._threads == []
+    assert reload_job(stale_id).status == 'running'
+
+    assert queue.recover() == (1, 1)
+    queue._queue.join()
+
+    assert reload_job(stale_id).status == 'failed'
+    assert reload_job(stale_id).error_message == '进程重启，任务中断'
+    assert reload_job(recent_id).status == 'running'
+    assert reload_job(pending_id).get_result() == {'resumed': True}
+
+
+def test_recover_on_first_request_of_serving_process(app, monkeypatch):
+    """测试非测试模式下在第一个请求前恢复一次，创建应用时不恢复"""
+    stale_id, recent_id, pending_id = add_leftover_jobs()
+    monkeypatch.setattr(app, 'testing', False)
+    queue = JobQueue(num_workers=1)
+    queue.register('resume')(lambda params, report: {'resumed': True})
+    queue.init_app(app)
+    assert reload_job(stale_id).status == 'running'
+
+    client = app.test_client()
+    client.get(f'/admin/api/jobs/{stale_id}')
+    client.get(f'/admin/api/jobs/{stale_id}')
+    queue._queue.join()
+
+    assert reload_job(stale_id).status == 'failed'
+    assert reload_job(recent_id).status == 'running'
+    assert reload_job(pending_id).status == 'completed'
+    assert len(queue._threads) == 1
+
+
+def test_job_status_and_stream_routes(app):
+    """测试任务查询接口和SSE进度推送"""
+    job = CrawlJob(job_type='crawl', status='completed', total=3, processed=3)
+    job.set_result({'total': 3})
+    db.session.add(job)
+    db.session.commit()
+    client = app.test_client()
+
+    data = client.get(f'/admin/api/jobs/{job.id}').get_json()
+    assert data['success'] and data['data']['status'] == 'completed'
+    assert client.get('/admin/api/jobs/999').get_json() == {'success': False, 'message': '任务不存在'}
+
+    response = client.get(f'/admin/api/jobs/{job.id}/stream')
+    assert response.mimetype == 'text/event-stream'
+    events = [line for line in response.get_data(as_text=True).split('\n\n') if line]
+    assert len(events) == 1
+    assert json.loads(events[0][len('data: '):])['progress'] == 100
+
+    missing = client.get('/admin/api/jobs/999/stream').get_data(as_text=True)
+    assert missing.startswith('event: error')
+
+
+def test_async_requests_submit_jobs(app, monkeypatch):
+    """测试async=1时采集和深度采集接口提交后台任务并立即返回任务ID"""
+    calls = []
+    monkeypatch.setitem(job_queue.handlers, 'crawl', lambda params, report: calls.append(params) or {'total': 0})
+    monkeypatch.setitem(job_queue.handlers, 'depth_crawl', lambda params, report: calls.append(params) or {'total': 1})
+    client = app.test_client()
+
+    crawl = client.post('/admin/api/crawl', data={'keyword': '西昌', 'source': 'baidu', 'async': '1'}).get_json()
+    depth = client.post('/admin/api/depth_crawl', data={'ids': '7', 'async': 'true'}).get_json()
+    job_queue._queue.join()
+
+    assert crawl['success'] and depth['success']
+    assert reload_job(crawl['job_id']).status == 'completed'
+    assert reload_job(depth['job_id']).get_result() == {'total': 1}
+    # 两个工作线程并发执行，调用顺序不确定
+    assert sorted(calls, key=json.dumps) == sorted([{'keyword': '西昌', 'source': 'baidu'}, {'crawl_ids': ['7']}], key=json.dumps)
+    assert wants_async({'async': 'yes'}) and not wants_async({'async': '0'}) and not wants_async({})
@@ -0,0 +1,58 @@
+import requests
+
+from app.crawler import crawler
+from app.crawler.parser import get_parse_stats, parse_html, parse_tree, reset_parse_stats
+
+HTML = """
+<html><body>
+<div id="nav"><a href="/home">首页</a></div>
+<ol id="b_results">
+<li class="b_algo"><h2><a href="http://a.com">结果一</a></h2></li>
+<li class="b_ad"><h2><a href="http://ad.com">广告</a></h2></li>
+<li class="b_algo"><h2><a href="http://b.com">结果二</a></h2></li>
+</ol>
+</body></html>
+"""
+
+
+def test_strainer_keeps_only_declared_nodes():
+    """测试按数据源名称只解析需要的节点"""
+    soup = parse_html(HTML, name='bing')
+
+    assert [a['href'] for a in soup.find_all('a')] == ['http://a.com', 'http://b.com']
+    assert soup.find(id='nav') is None
+
+
+def test_parse_stats_are_recorded_per_name():
+    """测试解析耗时按名称累计"""
+    reset_parse_stats()
+    parse_html(HTML, name='bing')
+    parse_tree(HTML, name='detail')
+    parse_tree('<?xml version="1.0" encoding="utf-8"?><html><body><p>正文</p></body></html>', name='detail')
+
+    stats = get_parse_stats()
+    assert stats['bing']['count'] == 1
+    assert stats['detail']['count'] == 2
+    assert stats['detail']['total_bytes'] > 0
+
+
+def test_baidu_fallback_scans_whole_document(monkeypatch):
+    """测试 #content_left 中没有结果容器时，备选方式扫描整个文档的链接"""
+    html = """
+    <html><body>
+    <div id="content_left"><span>相关搜索</span></div>
+    <div id="rs"><a href="http://www.baidu.com/link?url=abc">西昌市火把节开幕式隆重举行各族群众欢聚一堂</a></div>
+    </body></html>
+    """
+
+    def fake_fetch(url, config=None, method='GET', **kwargs):
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = html.encode('utf-8')
+        return response
+
+    monkeypatch.setattr(crawler, 'fetch', fake_fetch)
+    results = crawler.crawl_baidu_search('西昌')
+
+    assert [item['original_url'] for item in results] == ['http://www.baidu.com/link?url=abc']
@@ -0,0 +1,66 @@
+import time
+
+import requests
+
+from app.crawler.config import CrawlerConfig
+from app.crawler.ratelimit import HostRateLimiter, is_captcha
+
+
+def make_response(status_code=200, body=b'<html></html>', url='http://example.com/', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body
+    response.url = url
+    response.headers.update(headers or {})
+    return response
+
+
+def test_token_bucket_spaces_requests_per_host():
+    """测试令牌用完后按速率放行，不同主机互不影响"""
+    limiter = HostRateLimiter()
+    config = CrawlerConfig(rate_limit=20, burst=2, host_rate_limits={})
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire('http://a.example.com/x', config)
+    assert 0.08 <= time.monotonic() - start < 0.5
+
+    assert limiter.acquire('http://b.example.com/x', config) == 0
+    assert limiter.acquire('http://c.example.com/x', CrawlerConfig(rate_limit=0, host_rate_limits={})) == 0
+
+
+def test_rate_precedence():
+    """测试站点规则速率优先于配置中的主机速率和默认速率，并对子域名生效"""
+    limiter = HostRateLimiter()
+    config = CrawlerConfig(rate_limit=5, host_rate_limits={'baidu.com': 1})
+    assert limiter.rate_for('www.baidu.com', config) == 1
+    assert limiter.rate_for('example.com', config) == 5
+
+    limiter.configure_sites({'https://www.baidu.com/s': 0.5})
+    assert limiter.rate_for('news.baidu.com', config) == 0.5
+
+
+def test_throttled_responses_back_off_and_recover():
+    """测试429和验证码页面触发退避，正常响应后逐步恢复速率"""
+    limiter = HostRateLimiter()
+    config = CrawlerConfig(rate_limit=100, burst=1, host_rate_limits={})
+    url = 'http://example.com/news'
+    limiter.acquire(url, config)
+
+    assert limiter.report(url, make_response(429, headers={'Retry-After': '0.1'}))
+    stats = limiter.stats()['example.com']
+    assert stats['rate_factor'] == 0.5 and 0 < stats['blocked_for'] <= 0.1
+    assert limiter.acquire(url, config) >= 0.05
+
+    assert limiter.report(url, make_response(body='<title>百度安全验证</title>'.encode('utf-8'), headers={'Retry-After': '0'}))
+    assert limiter.stats()['example.com']['rate_factor'] == 0.25
+
+    assert not limiter.report(url, make_response())
+    assert limiter.stats()['example.com']['rate_factor'] == 0.35
+    assert limiter.stats()['example.com']['throttled'] == 2
+
+
+def test_is_captcha():
+    """测试验证码页面识别"""
+    assert is_captcha(make_response(url='https://wappass.baidu.com/static/captcha/tuxing.html'))
+    assert not is_captcha(make_response(body='<p>西昌新闻</p>'.encode('utf-8')))
+    assert not is_captcha(make_response(body=b'{"captcha": 1}', headers={'Content-Type': 'application/json'}))
@@ -0,0 +1,51 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.crawler.parser import parse_html
+from app.crawler.rules import CompiledRule, clear_rule_cache, get_compiled_rule
+
+HTML = """
+<html><body>
+<div class="nav">导航</div>
+<div class="main">
+<h1 class="title">文章标题</h1>
+<div class="content"><p>第一段</p><script>var x = 1;</script><p>第二段</p></div>
+</div>
+</body></html>
+"""
+
+
+def test_xpath_rule_matches_generated_paths():
+    """测试绝对路径形式的XPath规则可以匹配"""
+    rule = CompiledRule('/html/body/div[2]/h1', '//div[@class="content"]')
+
+    assert rule.extract(HTML) == {'title': '文章标题', 'content': '第一段\n第二段'}
+
+
+def test_css_rule_type():
+    """测试CSS选择器规则"""
+    rule = CompiledRule('h1.title', 'div.main > div.content', rule_type='css')
+
+    assert rule.extract(HTML, parse_html(HTML)) == {'title': '文章标题', 'content': '第一段\n第二段'}
+
+
+def test_invalid_expression_raises_value_error():
+    """测试无效表达式在编译时报错"""
+    with pytest.raises(ValueError):
+        CompiledRule('#main h1', None)
+
+
+def test_compiled_rule_cached_by_updated_at():
+    """测试编译结果按规则ID和更新时间缓存"""
+    clear_rule_cache()
+    site_rule = SimpleNamespace(id=1, updated_at=datetime(2026, 1, 1), rule_type='xpath',
+                                title_xpath='//h1', content_xpath='//p')
+
+    compiled = get_compiled_rule(site_rule)
+    assert get_compiled_rule(site_rule) is compiled
+
+    site_rule.title_xpath = '//h2'
+    site_rule.updated_at = datetime(2026, 1, 2)
+    assert get_compiled_rule(site_rule) is not compiled
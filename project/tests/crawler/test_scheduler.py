@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import requests
+
+from app import db
+from app.crawler import scheduler
+from app.crawler.scheduler import TaskScheduler, execute_task, extract_fields
+from app.models import CrawlerResult, CrawlerTask
+
+
+HTML = '''
+<html><body>
+<h1 class="title">测试标题</h1>
+<div class="content">测试内容</div>
+<a href="/a">A</a><a href="/b">B</a>
+</body></html>
+'''
+
+
+def test_extract_fields_with_rule_dict():
+    """测试按采集规则提取字段"""
+    rule = {
+        'title': {'selector': 'h1.title'},
+        'content': 'div.content',
+        'links': {'selector': 'a', 'attr': 'href', 'multiple': True},
+        'date': {'selector': '.date'}
+    }
+    extracted = extract_fields(HTML, rule)
+    assert extracted == {
+        'title': '测试标题',
+        'content': '测试内容',
+        'links': ['/a', '/b'],
+        'date': ''
+    }
+
+
+def test_extract_fields_skips_invalid_rules():
+    """测试忽略无效的规则项"""
+    assert extract_fields(HTML, {'title': {}, 'other': 1}) == {}
+    assert extract_fields(HTML, None) == {}
+
+
+def add_task(next_run_time, interval=60, url='http://news.example.com/list'):
+    task = CrawlerTask(name=f'任务{url}', url=url, rule='{"title": "h1.title"}',
+                       interval=interval, next_run_time=next_run_time)
+    db.session.add(task)
+    db.session.commit()
+    return task.id
+
+
+def outcome(error_message=None, execution_time=0.25):
+    return {
+        'status_code': 500 if error_message else 200,
+        'response_headers': {},
+        'response_body': HTML,
+        'extracted_data': {} if error_message else {'title': '测试标题'},
+        'execution_time': execution_time,
+        'error_message': error_message
+    }
+
+
+def test_execute_task_claimed_once_by_concurrent_calls(app, monkeypatch):
+    """测试两个调度进程同时执行同一次到期任务时只有认领成功的一方执行"""
+    due = datetime.utcnow() - timedelta(seconds=1)
+    task_id = add_task(due)
+    calls = []
+    monkeypatch.setattr(scheduler, 'run_crawler_task', lambda task, config=None: calls.append(task.id) or outcome())
+    barrier = threading.Barrier(2)
+    next_times = []
+
+    def run():
+        with app.app_context():
+            try:
+                barrier.wait()
+                next_times.append(execute_task(task_id, due))
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=run) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [task_id]
+    assert next_times == [due + timedelta(seconds=60)] * 2
+    assert CrawlerResult.query.filter_by(task_id=task_id).count() == 1
+    task = db.session.get(CrawlerTask, task_id)
+    assert task.total_runs == 1 and task.next_run_time == due + timedelta(seconds=60)
+
+
+def test_execute_task_counts_in_database(app, monkeypatch):
+    """测试执行计数在数据库中自增，不使用会话中过期的值；执行结果记录耗时"""
+    due = datetime.utcnow() - timedelta(seconds=1)
+    task_id = add_task(due)
+    task = db.session.get(CrawlerTask, task_id)
+    assert task.total_runs == 0
+    db.session.execute(db.update(CrawlerTask).where(CrawlerTask.id == task_id).values(total_runs=5, success_runs=5))
+    db.session.commit()
+
+    results = iter([outcome(execution_time=0.25), outcome('HTTP 500', execution_time=0.5)])
+    monkeypatch.setattr(scheduler, 'run_crawler_task', lambda task, config=None: next(results))
+    next_run_time = execute_task(task_id, due)
+    assert execute_task(task_id, due) == next_run_time
+    assert execute_task(task_id, next_run_time) == next_run_time + timedelta(seconds=60)
+
+    db.session.expire_all()
+    task = db.session.get(CrawlerTask, task_id)
+    assert (task.total_runs, task.success_runs, task.failed_runs) == (7, 6, 1)
+    assert task.status == 'failed' and task.last_run_time is not None
+    results = CrawlerResult.query.filter_by(task_id=task_id).order_by(CrawlerResult.id).all()
+    assert [result.execution_time for result in results] == [0.25, 0.5]
+    assert results[0].get_extracted_data() == {'title': '测试标题'}
+    assert results[1].error_message == 'HTTP 500'
+
+
+def test_execute_task_records_fetch_time(app, monkeypatch):
+    """测试实际执行时记录请求和提取的耗时"""
+    def fake_fetch(url, **kwargs):
+        time.sleep(0.02)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = HTML.encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        return response
+
+    monkeypatch.setattr(scheduler, 'fetch', fake_fetch)
+    task_id = add_task(None)
+    assert execute_task(task_id, None) is not None
+
+    result = CrawlerResult.query.filter_by(task_id=task_id).one()
+    assert result.status_code == 200
+    assert result.execution_time >= 0.02
+    assert result.get_extracted_data() == {'title': '测试标题'}
+    assert db.session.get(CrawlerTask, task_id).status == 'completed'
+
+
+class RecordingPool:
+    """只记录提交的任务，由测试决定何时结束"""
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, task_id, expected, host):
+        self.submitted.append(task_id)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_scheduler_dispatches_by_due_time_and_host_limit(app, monkeypatch):
+    """测试按到期时间顺序分发，同一主机超过并发上限的任务排队，主机空闲后优先执行"""
+    monkeypatch.setattr(scheduler, 'execute_task', lambda task_id, expected, config=None: datetime.utcnow() + timedelta(hours=1))
+    task_scheduler = TaskScheduler(max_per_host=2)
+    task_scheduler.app = app
+    task_scheduler._pool = pool = RecordingPool()
+    task_scheduler._next_refresh = time.monotonic() + 3600
+
+    now = datetime.utcnow()
+    task_scheduler.schedule(1, now - timedelta(seconds=3), 'http://a.example.com/1')
+    task_scheduler.schedule(2, now - timedelta(seconds=2), 'http://a.example.com/2')
+    task_scheduler.schedule(3, now - timedelta(seconds=1), 'http://b.example.com/3')
+    task_scheduler.schedule(4, now - timedelta(seconds=4), 'http://a.example.com/4')
+    task_scheduler.schedule(5, now + timedelta(hours=1), 'http://b.example.com/5')
+    task_scheduler._thread = threading.Thread(target=task_scheduler._loop, daemon=True)
+    task_scheduler._thread.start()
+    try:
+        wait_for(lambda: len(pool.submitted) == 3)
+        assert pool.submitted == [4, 1, 3]
+        assert task_scheduler._waiting == {2}
+
+        task_scheduler._execute(4, now - timedelta(seconds=4), 'a.example.com')
+        assert pool.submitted == [4, 1, 3, 2]
+        assert task_scheduler._waiting == set()
+        # 执行完的任务按新的next_run_time重新排期，不会立即再次分发
+        assert task_scheduler._expected[4] > now + timedelta(minutes=59)
+        assert 4 in task_scheduler._entries
+    finally:
+        task_scheduler.stop()
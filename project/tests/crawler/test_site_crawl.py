@@ -0,0 +1,119 @@
+import hashlib
+
+from app.crawler.config import CrawlerConfig
+from app.crawler.site_crawl import BloomFilter, CrawlState, SiteCrawler, extract_links
+
+# 假站点：页面URL -> 页面中的链接
+SITE = {
+    'http://news.example.com/': ['/list/1.html', '/list/2.html', 'http://other.example.org/x.html'],
+    'http://news.example.com/list/1.html': ['/a/1.html', '/a/2.html', '/'],
+    'http://news.example.com/list/2.html': ['/a/2.html', '/a/3.html', '/logo.png'],
+    'http://news.example.com/a/1.html': ['/a/4.html'],
+    'http://news.example.com/a/2.html': [],
+    'http://news.example.com/a/3.html': [],
+    'http://news.example.com/a/4.html': [],
+}
+
+
+def fake_fetch(fetched):
+    def fetch_page(url):
+        fetched.append(url)
+        is_article = '/a/' in url
+        return {
+            'title': url if is_article else '',
+            'content': '正文' if is_article else '',
+            'links': [{'text': '', 'href': href} for href in SITE.get(url, [])]
+        }
+    return fetch_page
+
+
+def make_crawler(tmp_path, fetched, stored, **kwargs):
+    state = CrawlState(str(tmp_path / 'state.db'))
+    crawler = SiteCrawler(
+        'http://news.example.com/', state, fake_fetch(fetched),
+        lambda pages: stored.extend(pages) or len(pages),
+        config=CrawlerConfig(max_workers=1), **kwargs
+    )
+    return crawler, state
+
+
+def test_bloom_filter():
+    """测试布隆过滤器没有漏判，误判率接近设定值"""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [hashlib.sha1(str(i).encode()).hexdigest() for i in range(2000)]
+    for key in keys[:1000]:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys[:1000])
+    assert sum(key in bloom for key in keys[1000:]) < 50
+
+
+def test_extract_links_same_site_only():
+    """测试只跟踪同站点的网页链接"""
+    links = extract_links('http://news.example.com/list/1.html', {'links': [
+        {'href': '../a/1.html#top'}, {'href': 'http://m.news.example.com/a/2.html'},
+        {'href': 'http://other.example.org/'}, {'href': 'javascript:void(0)'}, {'href': '/files/report.PDF'}
+    ]}, 'news.example.com')
+
+    assert links == ['http://news.example.com/a/1.html', 'http://m.news.example.com/a/2.html']
+
+
+def test_breadth_first_within_depth(tmp_path):
+    """测试按层次采集，不超过最大深度，同一URL只采集一次"""
+    fetched, stored = [], []
+    crawler, state = make_crawler(tmp_path, fetched, stored, max_depth=2)
+    result = crawler.run()
+    state.close()
+
+    assert fetched == [
+        'http://news.example.com/',
+        'http://news.example.com/list/1.html', 'http://news.example.com/list/2.html',
+        'http://news.example.com/a/1.html', 'http://news.example.com/a/2.html', 'http://news.example.com/a/3.html',
+    ]
+    assert [url for url, _, _ in stored] == fetched[3:]
+    assert result['pages'] == 6 and result['stored'] == 3 and result['frontier'] == 0
+    assert result['max_depth_reached'] == 2
+
+
+def test_page_budget_and_resume(tmp_path):
+    """测试达到页面数上限后保存检查点，继续采集时不重复已采集的页面"""
+    fetched, stored = [], []
+    crawler, state = make_crawler(tmp_path, fetched, stored, max_depth=3, max_pages=3, batch_size=2)
+    result = crawler.run()
+    state.close()
+    assert result['pages'] == 3 and result['frontier'] > 0
+
+    crawler, state = make_crawler(tmp_path, fetched, stored, max_depth=3, max_pages=10, batch_size=2)
+    result = crawler.run(resume=True)
+    state.close()
+
+    assert result['resumed']
+    assert len(fetched) == len(set(fetched)) == 7
+    assert result['pages'] == 7 and result['frontier'] == 0
+    assert fetched[-1] == 'http://news.example.com/a/4.html'
+
+    # 采集结束后继续时重新开始
+    crawler, state = make_crawler(tmp_path, fetched, stored, max_depth=0)
+    assert not crawler.run(resume=True)['resumed']
+    state.close()
+
+
+def test_fetch_errors_counted_as_failed(tmp_path):
+    """测试采集失败的页面计为失败，不写入也不跟踪其中的链接"""
+    fetched, stored = [], []
+    fetch_page = fake_fetch(fetched)
+
+    def flaky_fetch(url):
+        if url.endswith(('/list/2.html', '/a/1.html')):
+            raise ConnectionError('连接被重置')
+        return fetch_page(url)
+
+    state = CrawlState(str(tmp_path / 'state.db'))
+    crawler = SiteCrawler('http://news.example.com/', state, flaky_fetch,
+                          lambda pages: stored.extend(pages) or len(pages),
+                          config=CrawlerConfig(max_workers=1), max_depth=2)
+    result = crawler.run()
+    state.close()
+
+    assert result['pages'] == 5 and result['failed'] == 2 and result['stored'] == 1
+    assert [url for url, _, _ in stored] == ['http://news.example.com/a/2.html']
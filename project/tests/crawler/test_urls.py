@@ -0,0 +1,15 @@
+from app.crawler.urls import normalize_url, url_fingerprint
+
+
+def test_normalize_url():
+    """测试URL规范化"""
+    assert normalize_url('HTTPS://WWW.Example.com:443/a/b/?z=1&a=2&utm_medium=x#frag') == 'http://example.com/a/b?a=2&z=1'
+    assert normalize_url('//example.com') == 'http://example.com/'
+    assert normalize_url('http://example.com:8080/') == 'http://example.com:8080/'
+
+
+def test_url_fingerprint():
+    """测试URL指纹"""
+    assert url_fingerprint('http://example.com/a') == url_fingerprint('https://www.example.com/a/')
+    assert url_fingerprint('http://example.com/a') != url_fingerprint('http://example.com/b')
+    assert url_fingerprint('') is None
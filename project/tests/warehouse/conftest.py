@@ -0,0 +1,26 @@
+import pytest
+
+from app import create_app, db
+from app.warehouse.dedup import create_minhash_index
+from app.warehouse.search import create_search_index
+from app.warehouse.stats import create_stats_rollup
+
+
+class WarehouseTestConfig:
+    TESTING = True
+    WTF_CSRF_ENABLED = False
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """使用临时SQLite数据库创建应用，包含全文索引、统计汇总表和近似重复段表"""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'warehouse.db'}")
+    app = create_app(WarehouseTestConfig)
+    with app.app_context():
+        db.create_all()
+        create_search_index()
+        create_stats_rollup()
+        create_minhash_index()
+        yield app
+        db.session.remove()
+        db.drop_all()
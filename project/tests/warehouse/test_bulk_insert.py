@@ -0,0 +1,59 @@
+from app import db
+from app.models import CrawlResult
+from app.warehouse.stats import get_crawl_stats
+
+
+def test_bulk_insert_returns_ids_in_order(app):
+    """测试批量写入按输入顺序返回ID，并触发统计汇总"""
+    rows = [
+        CrawlResult.build_row({'title': f'标题{i}', 'original_url': f'http://example.com/{i}'}, keyword='西昌')
+        for i in range(25)
+    ]
+
+    ids = CrawlResult.bulk_insert(rows, chunk_size=10)
+
+    assert len(ids) == 25
+    assert [db.session.get(CrawlResult, row_id).original_url for row_id in ids] == [row['original_url'] for row in rows]
+    assert get_crawl_stats()['total_count'] == 25
+
+
+def test_upsert_rows_deduplicates_by_url(app):
+    """测试同一URL的不同写法只保存一条记录，重复采集返回已有记录的ID"""
+    urls = ['http://www.example.com/news/1/', 'https://example.com/news/1?utm_source=feed#top', 'http://example.com/news/2']
+    rows = [CrawlResult.build_row({'title': f'标题{i}', 'original_url': url}, keyword='西昌') for i, url in enumerate(urls)]
+
+    first_ids = CrawlResult.upsert_rows(rows)
+    second_ids = CrawlResult.upsert_rows(rows)
+
+    assert first_ids[0] == first_ids[1] != first_ids[2]
+    assert second_ids == first_ids
+    assert CrawlResult.query.count() == 2
+    assert get_crawl_stats()['total_count'] == 2
+
+
+def test_upsert_rows_without_returning(app, monkeypatch):
+    """测试数据库不支持RETURNING时先查询再写入，按冲突列查回ID并更新已有记录"""
+    monkeypatch.setattr(db.engine.dialect, 'insert_returning', False)
+    urls = ['http://example.com/news/1', 'http://www.example.com/news/1/', 'http://example.com/news/2']
+    rows = [CrawlResult.build_row({'title': f'标题{i}', 'original_url': url}, keyword='西昌') for i, url in enumerate(urls)]
+
+    first_ids = CrawlResult.upsert_rows(rows[:1])
+    rows[0]['title'] = '新标题'
+    ids = CrawlResult.upsert_rows(rows, update_columns=('title',))
+
+    assert ids[0] == ids[1] == first_ids[0] != ids[2]
+    assert db.session.get(CrawlResult, ids[0]).title == '新标题'
+    assert db.session.get(CrawlResult, ids[2]).original_url == urls[2]
+    assert CrawlResult.bulk_insert([CrawlResult.build_row({'title': '标题', 'original_url': 'http://example.com/3'})]) \
+        == [ids[2] + 1]
+    assert get_crawl_stats()['total_count'] == 3
+
+
+def test_mysql_upsert_statement():
+    """测试MySQL使用ON DUPLICATE KEY UPDATE写入"""
+    from sqlalchemy.dialects import mysql
+
+    statement = CrawlResult._bulk_insert_statement('mysql', ['url_hash'], ['last_seen_at'])
+    sql = str(statement.compile(dialect=mysql.dialect()))
+    assert 'ON DUPLICATE KEY UPDATE last_seen_at = ' in sql
+    assert 'RETURNING' not in sql
@@ -0,0 +1,46 @@
+from sqlalchemy import text
+
+from app import db
+from app.compression import FORMAT_RAW, FORMAT_ZLIB_DICT, compress_text, decompress_text
+from app.models import CrawlResult, DepthCrawlResult
+
+
+def test_compress_round_trip():
+    """测试压缩和解压，短文本不压缩，未压缩的旧数据原样读取"""
+    long_text = '西昌市召开新闻发布会，介绍城市建设情况。' * 20
+    assert compress_text(long_text)[:1] == FORMAT_ZLIB_DICT
+    assert len(compress_text(long_text)) < len(long_text.encode('utf-8')) / 4
+    assert compress_text('西昌')[:1] == FORMAT_RAW
+    for value in (long_text, '西昌', '', None):
+        assert decompress_text(compress_text(value)) == value
+    assert decompress_text('旧数据') == '旧数据'
+
+
+def test_compressed_columns_are_transparent(app):
+    """测试ORM读写透明压缩，全文索引使用解压后的正文"""
+    crawl_result = CrawlResult(keyword='西昌', title='新闻', original_url='http://example.com/1', source='bing',
+                               raw_data='{"title": "新闻"}' * 10)
+    db.session.add(crawl_result)
+    db.session.flush()
+    content = '西昌市召开新闻发布会，介绍城市建设情况。' * 20
+    db.session.add(DepthCrawlResult(crawl_result_id=crawl_result.id, content=content))
+    db.session.commit()
+    db.session.expire_all()
+
+    stored = db.session.execute(text('SELECT content FROM depth_crawl_result')).scalar()
+    assert isinstance(stored, bytes) and len(stored) < len(content.encode('utf-8'))
+    assert DepthCrawlResult.query.one().content == content
+    assert CrawlResult.query.one().raw_data == '{"title": "新闻"}' * 10
+
+    data = app.test_client().get('/api/warehouse/data?keyword=发布会').get_json()
+    assert [item['id'] for item in data['data']] == [crawl_result.id]
+
+
+def test_legacy_text_values_are_readable(app):
+    """测试迁移重写之前的未压缩文本可以正常读取"""
+    db.session.execute(text(
+        "INSERT INTO crawl_result(keyword, title, original_url, source, raw_data, is_active, created_at, updated_at) "
+        "VALUES ('西昌', '新闻', 'http://example.com/2', 'bing', '旧的原始数据', 1, '2026-01-01', '2026-01-01')"
+    ))
+    db.session.commit()
+    assert CrawlResult.query.one().raw_data == '旧的原始数据'
@@ -0,0 +1,85 @@
+from app import db
+from app.models import CrawlResult, DepthCrawlResult
+from app.warehouse import dedup
+
+SUMMARY = '7月20日晚，西昌市火把节开幕式在火把广场隆重举行，数万名各族群众和游客齐聚一堂，共同欢度佳节。'
+
+
+def add_results(app, items):
+    """写入采集结果，返回ID列表"""
+    rows = [
+        CrawlResult.build_row({'title': title, 'summary': summary, 'original_url': f'http://example.com/{i}'}, keyword='西昌')
+        for i, (title, summary) in enumerate(items)
+    ]
+    return CrawlResult.bulk_insert(rows)
+
+
+def test_minhash_similarity():
+    """测试转载稿的签名相似度高于同题材的不同新闻"""
+    original = dedup.text_minhash('西昌市举办火把节开幕式 各族群众共庆佳节', SUMMARY)
+    reposted = dedup.text_minhash('西昌举办火把节开幕式，各族群众共庆佳节-新华网', SUMMARY)
+    related = dedup.text_minhash('西昌市火把节期间交通管制通告', '火把节期间，西昌市火把广场周边道路实行交通管制')
+
+    assert dedup.similarity(original, reposted) >= dedup.MIN_SIMILARITY
+    assert dedup.similarity(original, related) < dedup.MIN_SIMILARITY
+    assert dedup.text_minhash('', None) is None
+
+
+def test_near_duplicates_use_band_index(app, monkeypatch):
+    """测试按段索引查找近似重复，与逐条比较结果一致"""
+    ids = add_results(app, [
+        ('西昌市举办火把节开幕式 各族群众共庆佳节', SUMMARY),
+        ('凉山州召开全州经济工作会议', '会议总结了过去一年经济工作，部署了下一阶段重点任务'),
+        ('西昌举办火把节开幕式，各族群众共庆佳节', SUMMARY),
+    ])
+    db.session.add(DepthCrawlResult(crawl_result_id=ids[1], content='正文' * 50,
+                                    content_minhash=dedup.text_minhash('正文' * 50)))
+    db.session.commit()
+
+    found = dedup.find_near_duplicates(ids)
+    assert set(found[ids[0]]) == {ids[2]}
+    assert found[ids[1]] == {}
+    assert dedup.cluster_ids(ids) == {ids[0]: ids[0], ids[1]: ids[1], ids[2]: ids[0]}
+
+    dedup._bands_available[str(db.engine.url)] = False
+    assert dedup.find_near_duplicates(ids) == found
+
+    # 逐条比较只与最近的记录比较
+    monkeypatch.setattr(dedup, 'FALLBACK_SCAN_LIMIT', 1)
+    found = dedup.find_near_duplicates(ids)
+    assert set(found[ids[0]]) == {ids[2]}
+    assert found[ids[2]] == {}
+
+
+def test_apply_detailed_content_uses_worker_minhash(app):
+    """测试写入详细内容时使用采集线程计算的正文签名，并从结果中取出"""
+    signature = dedup.text_minhash(SUMMARY)
+    detailed_content = {'content': SUMMARY, 'fingerprint': 'a', 'content_minhash': signature}
+    depth_result = DepthCrawlResult()
+
+    assert depth_result.apply_detailed_content(detailed_content)
+    assert depth_result.content_minhash == signature
+    assert 'content_minhash' not in detailed_content
+
+    assert depth_result.apply_detailed_content({'content': '凉山州新闻', 'fingerprint': 'b'})
+    assert depth_result.content_minhash == dedup.text_minhash('凉山州新闻')
+
+
+def test_collapse_near_duplicates(app):
+    """测试数据列表折叠近似重复数据，删除后段表同步清理"""
+    ids = add_results(app, [
+        ('西昌市举办火把节开幕式 各族群众共庆佳节', SUMMARY),
+        ('西昌举办火把节开幕式，各族群众共庆佳节', SUMMARY),
+        ('凉山州召开全州经济工作会议', '会议总结了过去一年经济工作，部署了下一阶段重点任务'),
+    ])
+    client = app.test_client()
+
+    data = client.get('/api/warehouse/data?collapse=1').get_json()['data']
+    assert [(item['id'], item['cluster_id'], item['duplicate_count']) for item in data] == [
+        (ids[2], ids[2], 0), (ids[1], ids[0], 1)
+    ]
+    duplicates = client.get(f'/api/warehouse/data/{ids[0]}/duplicates').get_json()['data']
+    assert [item['id'] for item in duplicates] == [ids[1]]
+
+    client.delete(f'/api/warehouse/data/{ids[1]}')
+    assert client.get(f'/api/warehouse/data/{ids[0]}/duplicates').get_json()['data'] == []
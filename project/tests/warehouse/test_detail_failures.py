@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+from app import db
+from app.crawler import crawler
+from app.models import CrawlResult, DepthCrawlResult
+from app.warehouse.routes import batch_detailed_crawl
+
+ARTICLE = '<html><body><h1>西昌新闻</h1><div class="content"><p>{body}</p></div></body></html>'
+
+
+@pytest.fixture
+def stored_pages(monkeypatch):
+    """写入两条已深度采集的结果，其中down.example.com的请求失败"""
+    def fake_fetch(url, config=None, method='GET', **kwargs):
+        if 'down.example.com' in url:
+            raise requests.ConnectionError('连接被拒绝')
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response._content = ARTICLE.format(body='凉山州举办民族文化活动。' * 5).encode('utf-8')
+        return response
+
+    monkeypatch.setattr(crawler, 'fetch', fake_fetch)
+    pages = []
+    for url in ('http://up.example.com/a.html', 'http://down.example.com/b.html'):
+        crawl_result = CrawlResult(keyword='西昌', title='西昌新闻', original_url=url, source='示例',
+                                   depth_crawled=True, is_stored=True)
+        crawl_result.depth_results = [DepthCrawlResult(content='已有内容', content_hash='old')]
+        pages.append(crawl_result)
+    db.session.add_all(pages)
+    db.session.commit()
+    return [page.id for page in pages]
+
+
+def depth_content(data_id):
+    db.session.expire_all()
+    return DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one().content
+
+
+def test_batch_detailed_crawl_counts_fetch_errors_as_failures(app, stored_pages):
+    """测试批量采集时请求失败的页面计为失败，已有的详细内容保持不变"""
+    up_id, down_id = stored_pages
+
+    assert batch_detailed_crawl(stored_pages) == {'total': 2, 'success_count': 1, 'fail_count': 1}
+    assert depth_content(up_id).startswith('凉山州')
+    assert depth_content(down_id) == '已有内容'
+
+
+def test_detailed_crawl_reports_fetch_error(app, stored_pages):
+    """测试单条采集请求失败时返回失败，不覆盖已有内容"""
+    down_id = stored_pages[1]
+
+    response = app.test_client().post(f'/api/warehouse/detailed_crawl/{down_id}').get_json()
+
+    assert response['success'] is False
+    assert depth_content(down_id) == '已有内容'
+
+
+def test_apply_detailed_content_ignores_empty_result(app):
+    """测试没有内容指纹和内容的结果不覆盖已有内容，也不更新确认时间"""
+    depth_result = DepthCrawlResult(content='已有内容', content_hash='old')
+    empty = {'title': '', 'content': '', 'images': [], 'videos': [], 'links': [], 'meta_data': {}}
+
+    assert depth_result.apply_detailed_content(empty) is False
+    assert depth_result.content == '已有内容' and depth_result.content_hash == 'old'
+    assert depth_result.last_verified_at is None
+
+    assert depth_result.apply_detailed_content({'not_modified': True}) is False
+    assert depth_result.last_verified_at is not None
+    assert depth_result.apply_detailed_content({'fingerprint': 'new', 'content': '新内容'}) is True
+    assert depth_result.content == '新内容'
@@ -0,0 +1,97 @@
+import pytest
+import requests
+
+from app import db
+from app.crawler import crawler
+from app.models import CrawlResult, DepthCrawlResult, HttpCacheEntry
+from app.warehouse.routes import batch_detailed_crawl
+
+PAGE = '<html><body><h1>西昌新闻</h1><p>{}</p></body></html>'.format('西昌今日召开新闻发布会，介绍城市建设情况。' * 3)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """支持ETag的假服务器，记录每次请求的条件请求头"""
+    requests_seen = []
+
+    def fake_fetch(url, config=None, method='GET', **kwargs):
+        headers = kwargs.get('headers', {})
+        requests_seen.append(headers.get('If-None-Match'))
+        response = requests.Response()
+        response.url = url
+        if headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = PAGE.encode('utf-8')
+            response.headers['ETag'] = '"v1"'
+        return response
+
+    monkeypatch.setattr(crawler, 'fetch', fake_fetch)
+    return requests_seen
+
+
+def add_result(url):
+    crawl_result = CrawlResult(keyword='西昌', title='西昌新闻', original_url=url, source='bing')
+    db.session.add(crawl_result)
+    db.session.commit()
+    return crawl_result.id
+
+
+def test_not_modified_page_reuses_depth_result(app, server):
+    """测试304时跳过解析，沿用已有的详细采集结果"""
+    data_id = add_result('http://example.com/news/1')
+    assert batch_detailed_crawl([data_id])['success_count'] == 1
+    entry = HttpCacheEntry.query.one()
+    assert entry.etag == '"v1"' and entry.body
+
+    depth_result = DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one()
+    depth_result.content = '已有内容'
+    db.session.commit()
+
+    assert batch_detailed_crawl([data_id])['success_count'] == 1
+    assert server == [None, '"v1"']
+    assert DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one().content == '已有内容'
+
+
+def test_not_modified_page_without_depth_result_uses_cached_body(app, server):
+    """测试没有详细采集结果的页面在304时用缓存的页面内容解析"""
+    data_id = add_result('http://example.com/news/2')
+    batch_detailed_crawl([data_id])
+    DepthCrawlResult.query.delete()
+    db.session.commit()
+
+    client = app.test_client()
+    data = client.post(f'/api/warehouse/detailed_crawl/{data_id}').get_json()
+    assert data['success'] and data['data']['title'] == '西昌新闻'
+    assert server == [None, '"v1"']
+    assert '新闻发布会' in DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one().content
+
+
+def test_unchanged_content_only_updates_verified_time(app, monkeypatch):
+    """测试没有校验值的页面内容指纹相同时只更新确认时间"""
+    def fake_fetch(url, config=None, method='GET', **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = PAGE.encode('utf-8')
+        return response
+
+    monkeypatch.setattr(crawler, 'fetch', fake_fetch)
+    data_id = add_result('http://example.com/news/3')
+    batch_detailed_crawl([data_id])
+    depth_result = DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one()
+    first_verified_at = depth_result.last_verified_at
+    assert depth_result.content_hash and HttpCacheEntry.query.count() == 0
+
+    updates = []
+    listen = lambda mapper, connection, target: updates.append(set(
+        attr.key for attr in db.inspect(target).attrs if attr.history.has_changes()
+    ))
+    db.event.listen(DepthCrawlResult, 'before_update', listen)
+    try:
+        batch_detailed_crawl([data_id])
+    finally:
+        db.event.remove(DepthCrawlResult, 'before_update', listen)
+    assert updates == [{'last_verified_at'}]
+    assert DepthCrawlResult.query.filter_by(crawl_result_id=data_id).one().last_verified_at > first_verified_at
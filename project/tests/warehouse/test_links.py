@@ -0,0 +1,101 @@
+from sqlalchemy import text
+
+from app import db
+from app.models import CrawlResult, DepthCrawlResult, PageLink, PageMedia
+from app.warehouse.links import index_pages, rebuild_page_links
+
+
+def add_article(index, links=(), images=(), videos=()):
+    """写入一篇带深度采集结果的文章"""
+    crawl_result = CrawlResult(
+        keyword='西昌',
+        title=f'西昌新闻 {index}',
+        original_url=f'http://news.example.com/{index}.html',
+        source='baidu'
+    )
+    db.session.add(crawl_result)
+    db.session.flush()
+    detailed_content = {
+        'links': [{'text': f'链接 {url}', 'href': url} for url in links],
+        'images': list(images),
+        'videos': list(videos)
+    }
+    depth_result = DepthCrawlResult(crawl_result_id=crawl_result.id, content='正文')
+    depth_result.set_links(detailed_content['links'])
+    depth_result.set_images(detailed_content['images'])
+    depth_result.set_videos(detailed_content['videos'])
+    db.session.add(depth_result)
+    index_pages([(crawl_result.id, detailed_content)])
+    db.session.commit()
+    return crawl_result.id
+
+
+def test_inbound_links(app):
+    """测试按URL查找链接到它的文章"""
+    target = add_article(0)
+    first = add_article(1, links=['http://news.example.com/0.html', 'http://www.news.example.com/0.html'])
+    second = add_article(2, links=['http://news.example.com/0.html#top', 'http://other.example.com/'])
+    add_article(3, links=['http://other.example.com/'])
+    client = app.test_client()
+
+    response = client.get('/api/warehouse/links/inbound?url=http://NEWS.example.com/0.html').get_json()
+    assert [item['id'] for item in response['data']] == [second, first]
+    assert response['data'][1]['link_text'] == '链接 http://news.example.com/0.html'
+
+    response = client.get(f'/api/warehouse/links/inbound?data_id={target}').get_json()
+    assert [item['id'] for item in response['data']] == [second, first]
+
+    # 同一页面中重复的链接只保存一行
+    assert PageLink.query.filter_by(crawl_result_id=first).count() == 1
+
+
+def test_shared_media(app):
+    """测试查找共用图片的文章"""
+    logo = 'http://news.example.com/logo.png'
+    photo = 'http://news.example.com/photo.jpg'
+    article = add_article(0, images=[logo, photo])
+    both = add_article(1, images=[photo, logo])
+    only_logo = add_article(2, images=[logo], videos=['http://video.example.com/embed/1'])
+    add_article(3, images=['http://news.example.com/other.jpg'])
+    client = app.test_client()
+
+    response = client.get(f'/api/warehouse/media/shared?url={logo}').get_json()
+    assert [item['id'] for item in response['data']] == [only_logo, both, article]
+
+    response = client.get(f'/api/warehouse/media/shared?data_id={article}').get_json()
+    assert [(item['id'], item['shared_count']) for item in response['data']] == [(both, 2), (only_logo, 1)]
+    assert response['data'][1]['shared_media'] == [logo]
+
+
+def test_reindex_and_delete(app):
+    """测试重新写入替换原有的行，删除数据时一并删除"""
+    article = add_article(0, links=['http://a.example.com/'], images=['http://a.example.com/a.jpg'])
+    index_pages([(article, {'links': [{'text': '', 'href': 'http://b.example.com/'}], 'images': [], 'videos': []})])
+    db.session.commit()
+    assert [link.url for link in PageLink.query.filter_by(crawl_result_id=article)] == ['http://b.example.com/']
+    assert PageMedia.query.filter_by(crawl_result_id=article).count() == 0
+
+    response = app.test_client().delete(f'/api/warehouse/data/{article}').get_json()
+    assert response['success']
+    assert PageLink.query.count() == 0
+
+
+def test_rebuild_from_json(app):
+    """测试按深度采集结果的JSON重建"""
+    add_article(0, links=['http://a.example.com/'], images=['http://a.example.com/a.jpg'])
+    add_article(1, links=['http://a.example.com/', 'http://b.example.com/'])
+    db.session.execute(db.delete(PageLink))
+    db.session.commit()
+
+    assert rebuild_page_links(batch_size=1) == 2
+    assert PageLink.query.count() == 3
+    assert PageMedia.query.count() == 1
+
+
+def test_lookups_use_url_hash_index(app):
+    """测试反查使用URL指纹索引"""
+    for table in ('page_link', 'page_media'):
+        plan = db.session.execute(text(
+            f'EXPLAIN QUERY PLAN SELECT crawl_result_id FROM {table} WHERE url_hash = :url_hash'
+        ), {'url_hash': 'x'}).all()
+        assert f'ix_{table}_url_hash' in plan[0][-1]
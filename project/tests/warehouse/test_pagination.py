@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import CrawlResult
+from app.warehouse.pagination import (
+    cached_count, clear_count_cache, decode_cursor, encode_cursor, keyset_paginate, offset_paginate
+)
+
+
+def test_cursor_round_trip():
+    """测试游标编码后可以还原排序键"""
+    created_at = datetime(2026, 3, 1, 8, 30, 15, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+def test_invalid_cursor():
+    """测试无效游标"""
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def add_results(count, tied=3):
+    """写入采集结果，最新的tied条创建时间相同；返回按(created_at, id)倒序排列的ID"""
+    base = datetime(2026, 3, 1, 8, 0, 0)
+    for i in range(count):
+        created_at = base + timedelta(minutes=min(i, count - tied))
+        db.session.add(CrawlResult(keyword='西昌', title=f'标题{i}', original_url=f'http://example.com/{i}',
+                                   source='baidu', created_at=created_at))
+    db.session.commit()
+    rows = CrawlResult.query.with_entities(CrawlResult.id, CrawlResult.created_at).all()
+    return [row_id for row_id, _ in sorted(rows, key=lambda row: (row[1], row[0]), reverse=True)]
+
+
+def test_keyset_paginate_walks_ties_without_gaps(app):
+    """测试游标分页在创建时间相同的行之间稳定翻页，最后一页没有下一页游标"""
+    expected = add_results(7)
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = keyset_paginate(CrawlResult.query, CrawlResult, 3, cursor)
+        seen.extend(row.id for row in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == 3
+
+    # 总数恰好是每页数量的整数倍时，最后一页也不返回游标
+    rows, cursor = keyset_paginate(CrawlResult.query, CrawlResult, 7)
+    assert [row.id for row in rows] == expected and cursor is None
+
+
+def test_offset_paginate_matches_keyset_order(app):
+    """测试页码分页先取ID再加载整行时保持排序，下一页游标可切换到游标分页"""
+    expected = add_results(7)
+    query = CrawlResult.query
+
+    first, cursor = offset_paginate(query, CrawlResult, 1, 3)
+    second, _ = offset_paginate(query, CrawlResult, 2, 3)
+    last, last_cursor = offset_paginate(query, CrawlResult, 3, 3)
+    assert [row.id for row in first + second + last] == expected
+    assert last_cursor is None
+    assert offset_paginate(query, CrawlResult, 4, 3) == ([], None)
+
+    continued, _ = keyset_paginate(query, CrawlResult, 3, cursor)
+    assert [row.id for row in continued] == [row.id for row in second]
+
+    excluded = CrawlResult.query.filter_by(title='标题6').one().id
+    filtered, _ = offset_paginate(query.filter(CrawlResult.id != excluded), CrawlResult, 1, 3)
+    assert [row.id for row in filtered] == [row_id for row_id in expected if row_id != excluded][:3]
+
+
+def test_cached_count_until_cleared(app):
+    """测试总数缓存在有效期内复用，数据修改后清空缓存重新统计"""
+    clear_count_cache()
+    add_results(4)
+    query = CrawlResult.query.filter(CrawlResult.keyword == '西昌')
+    assert cached_count(query, ttl=60) == 4
+
+    db.session.add(CrawlResult(keyword='西昌', title='新标题', original_url='http://example.com/new', source='baidu'))
+    db.session.commit()
+    assert cached_count(query, ttl=60) == 4
+    assert cached_count(CrawlResult.query.filter(CrawlResult.keyword == '凉山'), ttl=60) == 0
+
+    clear_count_cache()
+    assert cached_count(query, ttl=60) == 5
@@ -0,0 +1,98 @@
+import json
+
+from sqlalchemy import event
+
+from app import db
+from app.models import CrawlResult
+
+
+def seed(app):
+    """写入带原始数据的测试数据"""
+    with app.app_context():
+        for i in range(6):
+            db.session.add(CrawlResult(
+                keyword='西昌',
+                title=f'西昌新闻 {i}',
+                summary='测试摘要' * 50,
+                original_url=f'http://example.com/{i}',
+                source='baidu',
+                raw_data=json.dumps({'title': f'西昌新闻 {i}', 'body': '正文' * 500}, ensure_ascii=False)
+            ))
+        db.session.commit()
+
+
+def capture(app, client, url):
+    """请求接口，返回响应JSON和执行的SELECT语句"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url).get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return response, statements
+
+
+def test_list_does_not_load_raw_data(app):
+    """测试默认字段的列表查询不读取原始数据"""
+    seed(app)
+    client = app.test_client()
+
+    for url in ['/api/warehouse/data?page=1&limit=5', '/api/warehouse/data?limit=5&cursor=',
+                '/admin/api/crawl_results?page=1&limit=5']:
+        response, statements = capture(app, client, url)
+        assert len(response['data']) == 5
+        assert 'summary' in response['data'][0]
+        assert not [statement for statement in statements if "raw_data" in statement], url
+
+
+def test_fields_selects_only_requested_columns(app):
+    """测试fields参数只查询并返回指定字段"""
+    seed(app)
+    client = app.test_client()
+
+    for url in ['/api/warehouse/data?page=2&limit=2&fields=title,source',
+                '/api/warehouse/data?limit=2&cursor=&fields=title,source',
+                '/admin/api/crawl_results?page=1&limit=2&fields=title,source']:
+        response, statements = capture(app, client, url)
+        assert [set(item) for item in response['data']] == [{'id', 'title', 'source'}] * 2
+        row_selects = [statement for statement in statements if 'crawl_result.title' in statement]
+        assert row_selects, url
+        assert not any('summary' in statement or 'original_url' in statement for statement in row_selects), url
+
+    # 游标分页仍然可用
+    response, _ = capture(app, client, '/api/warehouse/data?limit=4&cursor=&fields=title')
+    response, _ = capture(app, client, f"/api/warehouse/data?limit=4&cursor={response['next_cursor']}&fields=title")
+    assert [item['title'] for item in response['data']] == ['西昌新闻 1', '西昌新闻 0']
+
+
+def test_fields_with_keyword_highlights_requested_columns(app):
+    """测试全文检索时只高亮请求的字段"""
+    seed(app)
+    response = app.test_client().get('/api/warehouse/data?keyword=西昌&fields=title').get_json()
+
+    assert response['data']
+    assert set(response['data'][0]['highlight']) == {'title'}
+
+
+def test_invalid_field(app):
+    """测试不支持的字段"""
+    response = app.test_client().get('/api/warehouse/data?fields=title,raw_data').get_json()
+
+    assert response['success'] is False
+
+
+def test_detail_includes_raw_data(app):
+    """测试详情接口仍返回原始数据"""
+    seed(app)
+    with app.app_context():
+        data_id = CrawlResult.query.first().id
+    response = app.test_client().get(f'/api/warehouse/data/{data_id}').get_json()
+
+    assert json.loads(response['data']['raw_data'])['body'] == '正文' * 500
@@ -0,0 +1,79 @@
+import re
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import CrawlResult, DepthCrawlResult
+
+# 没有使用索引的整表扫描，例如 "SCAN crawl_result"；"SCAN ... USING COVERING INDEX" 只扫描索引，不计入
+FULL_SCAN = re.compile(r'^SCAN (crawl_result|depth_crawl_result)(?! USING (COVERING )?INDEX)\b')
+
+
+@pytest.fixture
+def seeded_app(app):
+    """写入测试数据"""
+    for i in range(20):
+        crawl_result = CrawlResult(
+            keyword='西昌' if i % 2 else '凉山',
+            title=f'西昌新闻 {i}',
+            summary='测试摘要',
+            original_url=f'http://example.com/{i}',
+            source='baidu' if i % 2 else 'bing',
+            depth_crawled=i % 3 == 0,
+            is_stored=i % 4 == 0
+        )
+        db.session.add(crawl_result)
+        db.session.flush()
+        db.session.add(DepthCrawlResult(crawl_result_id=crawl_result.id, content='正文'))
+    db.session.commit()
+    return app
+
+
+def capture_selects(app, client, urls):
+    """请求各接口并记录执行的SELECT语句"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for url in urls:
+            assert client.get(url).status_code == 200
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def test_hot_queries_do_not_scan_tables(seeded_app):
+    """测试列表、详情和统计接口的查询都使用索引"""
+    app = seeded_app
+    client = app.test_client()
+    first_page = client.get('/api/warehouse/data?limit=5&cursor=').get_json()
+    urls = [
+        '/api/warehouse/data?page=3&limit=5',
+        '/api/warehouse/data?page=2&limit=5&source=baidu',
+        f"/api/warehouse/data?limit=5&cursor={first_page['next_cursor']}",
+        '/api/warehouse/data?keyword=西昌',
+        '/api/warehouse/data/3',
+        '/api/warehouse/data?limit=5&collapse=1',
+        '/api/warehouse/data/3/duplicates',
+        '/admin/api/crawl_results?page=2&limit=5',
+        '/admin/api/stats',
+    ]
+    statements = capture_selects(app, client, urls)
+    assert statements
+
+    with app.app_context():
+        connection = db.engine.raw_connection()
+        try:
+            for statement, parameters in statements:
+                plan = connection.cursor().execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                scans = [row[-1] for row in plan if FULL_SCAN.match(row[-1])]
+                assert not scans, f'{statement}\n{scans}'
+        finally:
+            connection.close()
@@ -0,0 +1,127 @@
+import sqlite3
+import time
+
+from sqlalchemy import text
+
+from app import db
+from app.models import CrawlResult, DepthCrawlResult
+from app.warehouse import search
+from app.warehouse.search import (
+    FTS_TABLE, PENDING_TABLE, SearchIndexSyncer, _index_available, apply_search, build_match_query,
+    create_search_index, highlight, sync_search_index, tokenize
+)
+
+
+def test_tokenize_chinese_bigrams():
+    """测试中文二元分词，英文按单词切分"""
+    assert tokenize('西昌市 Hello世界') == ['西昌', '昌市', '市', 'hello', '世界', '界']
+
+
+def test_build_match_query():
+    """测试中文短语和前缀查询"""
+    assert build_match_query('西昌市') == '"西昌 昌市"'
+    assert build_match_query('西 Py') == '"西"* "py"*'
+    assert build_match_query('"*') == ''
+
+
+def test_highlight_escapes_html():
+    """测试高亮时转义原文"""
+    assert highlight('<b>西昌</b> Python', '西昌 python') == '&lt;b&gt;<em>西昌</em>&lt;/b&gt; <em>Python</em>'
+
+
+def add_result(title, summary='', keyword='西昌', content=None):
+    """写入一条采集结果，content不为空时同时写入深度采集正文"""
+    crawl_result = CrawlResult(keyword=keyword, title=title, summary=summary,
+                               original_url=f'http://news.example.com/{title}.html', source='baidu')
+    db.session.add(crawl_result)
+    db.session.flush()
+    if content is not None:
+        db.session.add(DepthCrawlResult(crawl_result_id=crawl_result.id, content=content))
+    db.session.commit()
+    return crawl_result.id
+
+
+def search_ids(keyword):
+    """按相关度返回检索到的采集结果ID"""
+    query, score = apply_search(CrawlResult.query, keyword)
+    if score is not None:
+        query = query.order_by(score, CrawlResult.id)
+    return [crawl_result.id for crawl_result in query.all()]
+
+
+def test_fulltext_search_ranks_title_matches_first(app):
+    """测试全文检索按bm25排序：标题命中优先于摘要和正文命中，压缩存储的正文也被索引"""
+    in_content = add_result('凉山新闻', content='今天月城广场举行了火把节活动。' * 10)
+    in_summary = add_result('凉山动态', summary='火把节开幕')
+    in_title = add_result('火把节开幕式')
+    add_result('无关新闻', summary='邛海湿地')
+
+    assert search_ids('火把节') == [in_title, in_summary, in_content]
+    assert search_ids('邛海 湿地') == [in_title + 1]
+    assert search_ids('月城广场') == [in_content]
+
+
+def test_index_follows_changes_made_outside_the_app(app):
+    """测试不经过应用连接写入时触发器不依赖应用注册的函数，由下一次同步收录"""
+    crawl_result_id = add_result('西昌新闻', summary='邛海')
+    assert sync_search_index() == 0
+
+    connection = sqlite3.connect(db.engine.url.database)
+    connection.execute("UPDATE crawl_result SET title = '火把节' WHERE id = ?", (crawl_result_id,))
+    connection.execute(
+        "INSERT INTO crawl_result (keyword, title, summary, original_url, source, is_stored, is_active, created_at, updated_at) "
+        "VALUES ('西昌', '火把节开幕', '', 'http://news.example.com/x.html', 'baidu', 0, 1, datetime('now'), datetime('now'))"
+    )
+    connection.commit()
+    connection.close()
+
+    assert search_ids('火把节') == []
+    assert sync_search_index() == 2
+    assert sorted(search_ids('火把节')) == [crawl_result_id, crawl_result_id + 1]
+    assert search_ids('西昌新闻') == []
+
+    db.session.delete(db.session.get(CrawlResult, crawl_result_id))
+    db.session.commit()
+    assert search_ids('火把节') == [crawl_result_id + 1]
+
+
+def test_commit_notifies_background_sync(app, monkeypatch):
+    """测试提交采集结果的修改后由后台线程同步索引，与采集结果无关的提交不触发同步"""
+    syncer = SearchIndexSyncer(interval=3600)
+    syncer.init_app(app)
+    syncer.in_background = True
+    monkeypatch.setattr(search, 'search_index_syncer', syncer)
+
+    def pending_count():
+        return db.session.execute(text(f'SELECT count(*) FROM {PENDING_TABLE}')).scalar()
+
+    crawl_result_id = add_result('火把节开幕式')
+    deadline = time.monotonic() + 5
+    while pending_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert search_ids('火把节') == [crawl_result_id]
+
+    db.session.execute(text(f"INSERT INTO {PENDING_TABLE}(crawl_result_id) VALUES (:id)"), {'id': crawl_result_id})
+    db.session.commit()
+    assert not syncer._wakeup.is_set()
+    assert pending_count() == 1
+
+
+def test_rebuild_and_like_fallback(app):
+    """测试重建索引，以及索引表不存在时退回LIKE查询"""
+    crawl_result_id = add_result('火把节开幕式')
+    sync_search_index()
+    db.session.execute(text(f'DELETE FROM {FTS_TABLE}'))
+    db.session.commit()
+    assert search_ids('火把节') == []
+
+    create_search_index(rebuild=True)
+    assert search_ids('火把节') == [crawl_result_id]
+
+    db.session.execute(text(f'DROP TABLE {FTS_TABLE}'))
+    db.session.commit()
+    _index_available.clear()
+    query, score = apply_search(CrawlResult.query, '火把')
+    assert score is None
+    assert 'LIKE' in str(query.statement)
+    assert [crawl_result.id for crawl_result in query.all()] == [crawl_result_id]
@@ -0,0 +1,52 @@
+import requests
+
+from app import db
+from app.crawler import crawler
+from app.models import CrawlResult, DepthCrawlResult, PageLink, SiteRule
+
+ARTICLE = '<html><body><h1>{title}</h1><div class="content">{body}</div><a href="/list/index.html">列表</a></body></html>'
+PAGES = {
+    'http://news.example.com/': '<html><body><a href="/a/1.html">一</a><a href="a/2.html">二</a>'
+                                '<a href="http://other.example.org/">外站</a></body></html>',
+    'http://news.example.com/a/1.html': ARTICLE.format(title='西昌新闻一', body='西昌今日召开新闻发布会。' * 5),
+    'http://news.example.com/a/2.html': ARTICLE.format(title='西昌新闻二', body='凉山州举办民族文化活动。' * 5),
+}
+
+
+def test_site_crawl_stores_articles(app, tmp_path, monkeypatch):
+    """测试从站点首页广度优先采集并写入采集结果和深度采集结果"""
+    requested = []
+
+    def fake_fetch(url, config=None, method='GET', **kwargs):
+        requested.append(url)
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200 if url in PAGES else 404
+        response._content = PAGES.get(url, '').encode('utf-8')
+        return response
+
+    monkeypatch.setattr(crawler, 'fetch', fake_fetch)
+    app.config['SITE_CRAWL_DIR'] = str(tmp_path / 'site_crawl')
+    site_rule = SiteRule(site_name='示例新闻', site_url='http://news.example.com/',
+                         title_xpath='//h1', content_xpath='//div[@class="content"]')
+    db.session.add(site_rule)
+    db.session.commit()
+
+    response = app.test_client().post('/admin/api/site_crawl', data={'rule_id': site_rule.id, 'max_depth': 1}).get_json()
+
+    assert response['success'], response
+    assert response['data']['pages'] == 3 and response['data']['stored'] == 2
+    assert sorted(requested) == sorted(PAGES)
+
+    results = CrawlResult.query.order_by(CrawlResult.original_url).all()
+    assert [(result.title, result.source, result.depth_crawled) for result in results] == [
+        ('西昌新闻一', '示例新闻', True), ('西昌新闻二', '示例新闻', True)
+    ]
+    assert DepthCrawlResult.query.count() == 2
+    assert PageLink.query.filter_by(url='http://news.example.com/list/index.html').count() == 2
+    assert (tmp_path / 'site_crawl' / f'site_{site_rule.id}.db').exists()
+
+    # 再次采集时内容未变化，不重复写入
+    response = app.test_client().post('/admin/api/site_crawl', data={'rule_id': site_rule.id, 'max_depth': 1}).get_json()
+    assert response['data']['stored'] == 2
+    assert CrawlResult.query.count() == 2 and DepthCrawlResult.query.count() == 2
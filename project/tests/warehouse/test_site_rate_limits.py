@@ -0,0 +1,44 @@
+from app import db
+from app.crawler.config import CrawlerConfig
+from app.crawler.ratelimit import HostRateLimiter
+from app.models import SiteRule
+
+
+def add_rule(name, site_url, rate_limit, is_active=True):
+    rule = SiteRule(site_name=name, site_url=site_url, title_xpath='//h1', content_xpath='//div',
+                    rate_limit=rate_limit, is_active=is_active)
+    db.session.add(rule)
+    db.session.commit()
+    return rule
+
+
+def test_site_rates_loaded_on_first_request(app):
+    """测试重启后首次请求即按采集规则限速，不依赖先访问规则管理或深度采集"""
+    add_rule('西昌新闻网', 'http://www.xcxww.com/', 50)
+    add_rule('停用站点', 'http://off.example.com/', 50, is_active=False)
+    config = CrawlerConfig(rate_limit=0, host_rate_limits={})
+
+    limiter = HostRateLimiter()
+    limiter.init_app(app)
+    assert limiter.rate_for('news.xcxww.com', config) is None
+    limiter.acquire('http://news.xcxww.com/a.html', config)
+    assert limiter.rate_for('news.xcxww.com', config) == 50
+    assert limiter.rate_for('off.example.com', config) is None
+
+
+def test_site_rates_refresh_after_interval(app, monkeypatch):
+    """测试超过刷新间隔后重新加载其他进程修改的规则"""
+    rule = add_rule('西昌新闻网', 'http://www.xcxww.com/', 50)
+    config = CrawlerConfig(rate_limit=0, host_rate_limits={})
+    limiter = HostRateLimiter()
+    limiter.init_app(app)
+    limiter.acquire('http://www.xcxww.com/a.html', config)
+
+    rule.rate_limit = 5
+    db.session.commit()
+    limiter.acquire('http://www.xcxww.com/b.html', config)
+    assert limiter.rate_for('xcxww.com', config) == 50
+
+    monkeypatch.setattr('app.crawler.ratelimit.SITE_RATES_REFRESH', 0)
+    limiter.acquire('http://www.xcxww.com/c.html', config)
+    assert limiter.rate_for('xcxww.com', config) == 5
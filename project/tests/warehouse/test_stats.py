@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import CrawlResult
+from app.warehouse import stats
+
+
+def test_rollup_matches_direct_aggregation(app):
+    """测试触发器维护的汇总表与直接聚合结果一致"""
+    today = datetime(2026, 5, 10).date()
+    for i in range(30):
+        db.session.add(CrawlResult(
+            keyword=f'关键词{i % 4}',
+            title='标题',
+            original_url=f'http://example.com/{i}',
+            depth_crawled=i % 3 == 0,
+            is_stored=i % 2 == 0,
+            created_at=datetime(2026, 5, 9, 12) - timedelta(days=i % 9)
+        ))
+    db.session.commit()
+    CrawlResult.query.filter(CrawlResult.id <= 5).update({'is_stored': True, 'keyword': '关键词9'})
+    CrawlResult.query.filter(CrawlResult.id > 25).delete()
+    db.session.commit()
+
+    rolled_up = stats.get_crawl_stats(today=today)
+    stats._rollup_available[str(db.engine.url)] = False
+    direct = stats.get_crawl_stats(today=today)
+
+    assert rolled_up == direct
+    assert rolled_up['total_count'] == 25
+    assert sum(item['count'] for item in rolled_up['date_stats']) == 25 - CrawlResult.query.filter(
+        CrawlResult.created_at < datetime(2026, 5, 3)
+    ).count()
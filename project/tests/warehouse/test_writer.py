@@ -0,0 +1,63 @@
+import threading
+
+from sqlalchemy import text
+
+from app import db
+from app.crawler.writer import CrawlWriter
+from app.models import CrawlResult
+
+
+def test_sqlite_connections_use_wal(app):
+    """测试SQLite连接启用WAL和busy_timeout"""
+    assert db.session.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+    assert db.session.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+
+
+def test_concurrent_writes_are_group_committed(app):
+    """测试多个线程的写入合并为一次提交，各自得到对应的记录ID"""
+    writer = CrawlWriter(linger=0.2)
+    results = {}
+
+    def write(i):
+        with app.app_context():
+            rows = [
+                CrawlResult.build_row({'title': f'标题{i}-{j}', 'original_url': f'http://example.com/{i}/{j}'}, keyword='西昌')
+                for j in range(3)
+            ]
+            results[i] = (rows, writer.upsert_rows(rows))
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writer.commits == 1
+    for rows, ids in results.values():
+        assert [db.session.get(CrawlResult, row_id).original_url for row_id in ids] == [row['original_url'] for row in rows]
+    assert CrawlResult.query.count() == 15
+
+
+def test_failed_request_does_not_fail_batch(app):
+    """测试合并提交失败时逐个重写，只有出错的请求收到异常"""
+    writer = CrawlWriter(linger=0.2)
+    errors = []
+
+    def write(row):
+        with app.app_context():
+            try:
+                writer.upsert_rows([row])
+            except Exception as e:
+                errors.append(e)
+
+    good = CrawlResult.build_row({'title': '标题', 'original_url': 'http://example.com/ok'}, keyword='西昌')
+    bad = CrawlResult.build_row({'title': '标题', 'original_url': 'http://example.com/bad'}, keyword='西昌')
+    bad['original_url'] = None
+    threads = [threading.Thread(target=write, args=(row,)) for row in (good, bad)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 1
+    assert CrawlResult.query.count() == 1